@@ -1,29 +1,121 @@
+import json
 import os
-from openai import OpenAI
-from typing import List, Dict, Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional
 from dotenv import load_dotenv
 
+from categorization_cache import cache_key, get_categorization_cache
+from fetcher import TokenBucket
+from metrics import Counter, Histogram
+
 # Load environment variables
 load_dotenv()
 
-# Initialize the OpenAI client
-# It will automatically pick up the OPENAI_API_KEY from environment variables
-try:
-    client = OpenAI()
-    # Test the client to see if the key is valid
-    if not os.getenv("OPENAI_API_KEY"):
-         raise ValueError("OPENAI_API_KEY not found in environment variables")
-    client.models.list() 
-    CLIENT_AVAILABLE = True
-    print("OpenAI client initialized successfully.")
-except Exception as e:
-    client = None
-    CLIENT_AVAILABLE = False
-    print(f"Failed to initialize OpenAI client: {e}")
+# The OpenAI client is built on first use, and validated with a models.list()
+# call at most once per HEALTH_REFRESH_INTERVAL, so importing this module never
+# waits on the openai package or the network.
+HEALTH_REFRESH_INTERVAL = float(os.getenv("OPENAI_HEALTH_REFRESH", "300"))
+HEALTH_CHECK_TIMEOUT = 10.0
+
+_client = None
+_client_lock = threading.Lock()
+_health: Dict[str, Any] = {"healthy": None, "checked_at": None, "error": None}
+_health_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def get_client():
+    """Builds the OpenAI client on first use. It picks up OPENAI_API_KEY from the environment."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI()
+    return _client
+
+
+def retryable_errors() -> tuple:
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    return (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def _health_is_fresh(max_age: float) -> bool:
+    checked_at = _health["checked_at"]
+    return checked_at is not None and time.time() - checked_at < max_age
+
+
+def check_health(max_age: float = HEALTH_REFRESH_INTERVAL) -> Dict[str, Any]:
+    """
+    Returns the client's health, validating it with models.list() if the last
+    check is older than `max_age` seconds. Concurrent callers share one check.
+    """
+    with _refresh_lock:
+        if not _health_is_fresh(max_age):
+            try:
+                if not os.getenv("OPENAI_API_KEY"):
+                    raise ValueError("OPENAI_API_KEY not found in environment variables")
+                get_client().with_options(timeout=HEALTH_CHECK_TIMEOUT, max_retries=0).models.list()
+                healthy, error = True, None
+            except Exception as e:
+                healthy, error = False, str(e)
+            with _health_lock:
+                if healthy != _health["healthy"]:
+                    print("OpenAI client initialized successfully." if healthy else f"Failed to initialize OpenAI client: {error}")
+                _health.update(healthy=healthy, checked_at=time.time(), error=error)
+    with _health_lock:
+        return dict(_health)
+
+
+def warm_up() -> threading.Thread:
+    """Builds and validates the client in a background thread."""
+    thread = threading.Thread(target=check_health, daemon=True)
+    thread.start()
+    return thread
+
+
+def health_status() -> Dict[str, Any]:
+    """
+    The last known health without blocking. A stale result is returned as-is
+    and a refresh is started in the background.
+    """
+    with _health_lock:
+        status = dict(_health)
+    if not _health_is_fresh(HEALTH_REFRESH_INTERVAL) and not _refresh_lock.locked():
+        warm_up()
+    status["refresh_interval"] = HEALTH_REFRESH_INTERVAL
+    return status
 
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 
+# Batching and throughput limits for categorization requests
+BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", "20"))        # articles per prompt
+MAX_WORKERS = int(os.getenv("OPENAI_MAX_WORKERS", "4"))       # concurrent requests
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM", "60000"))     # estimated prompt + completion tokens
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# Part of the categorization cache key; bump when a prompt changes so old answers stop matching
+CATEGORY_PROMPT_VERSION = 1
+SUGGESTIONS_PROMPT_VERSION = 1
+
+# Shared across workers so the budget holds for the whole process
+token_budget = TokenBucket(rate=TOKENS_PER_MINUTE / 60.0, capacity=TOKENS_PER_MINUTE)
+
+# --- Metrics ---
+OPENAI_REQUEST_SECONDS = Histogram("openai_request_duration_seconds", "Latency of single OpenAI API attempts.",
+                                   buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60))
+OPENAI_BUDGET_WAIT_SECONDS = Histogram("openai_budget_wait_seconds", "Time spent waiting on the tokens-per-minute budget.",
+                                       buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 15, 30, 60))
+OPENAI_REQUESTS = Counter("openai_requests_total", "OpenAI API attempts by outcome (ok, retried, failed).", ["outcome"])
+OPENAI_TOKENS = Counter("openai_tokens_total", "Tokens reported by the OpenAI API, by type.", ["type"])
+CATEGORIZATION_ANSWERS = Counter("categorization_answers_total", "Batch categorization answers by source.", ["source"])
+
 # Predefined categories for consistency
 PREDEFINED_CATEGORIES = [
     "world", "politics", "business", "sports", "entertainment", "technology", 
@@ -31,10 +123,107 @@ PREDEFINED_CATEGORIES = [
     "opinion", "general", "crime", "education", "environment"
 ]
 
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Rough token count for a request (about 4 characters per token) plus its completion allowance."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Honours Retry-After on rate limit responses, otherwise exponential backoff with jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def chat_completion(messages: List[Dict], max_tokens: int, temperature: float, **kwargs):
+    """
+    Sends a chat completion within the tokens-per-minute budget, retrying
+    rate limits, connection errors and 5xx responses with backoff. Every
+    attempt draws from the budget, since a retried request costs it again.
+    """
+    tokens = estimate_tokens(messages, max_tokens)
+    for attempt in range(MAX_RETRIES + 1):
+        with OPENAI_BUDGET_WAIT_SECONDS.time():
+            token_budget.acquire(tokens)
+        started = time.perf_counter()
+        try:
+            # Retries are handled here so they also go through the budget
+            response = get_client().with_options(max_retries=0).chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+        except retryable_errors() as e:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started)
+            if attempt == MAX_RETRIES:
+                OPENAI_REQUESTS.labels("failed").inc()
+                raise
+            OPENAI_REQUESTS.labels("retried").inc()
+            delay = retry_delay(e, attempt)
+            print(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+        except Exception:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started)
+            OPENAI_REQUESTS.labels("failed").inc()
+            raise
+        else:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started)
+            OPENAI_REQUESTS.labels("ok").inc()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                OPENAI_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+                OPENAI_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+            return response
+
+
+def build_batch_prompt(articles: List[Dict]) -> str:
+    lines = []
+    for number, article in enumerate(articles, start=1):
+        lines.append(f"{number}. Title: {article.get('title', '')}")
+        if article.get('description'):
+            lines.append(f"   Description: {article['description']}")
+    return (
+        "Categorize each of the following news articles into exactly one of these predefined categories:\n"
+        f"{', '.join(PREDEFINED_CATEGORIES)}\n\n"
+        "Articles:\n"
+        + "\n".join(lines)
+        + "\n\nRespond with a JSON object of the form "
+        '{"categories": [{"id": 1, "category": "<category>"}, ...]} '
+        "with one entry per article, using the article numbers above as ids."
+    )
+
+
+def parse_batch_response(content: str, count: int) -> List[Optional[str]]:
+    """
+    Maps a batch response back onto the articles by id. Entries that are
+    missing or name an unknown category come back as None.
+    """
+    data = json.loads(content)
+    entries = data.get("categories", []) if isinstance(data, dict) else data
+    categories: List[Optional[str]] = [None] * count
+    for entry in entries:
+        try:
+            index = int(entry["id"]) - 1
+            category = str(entry["category"]).strip().lower()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < count and category in PREDEFINED_CATEGORIES:
+            categories[index] = category
+    return categories
+
+
 class AICategorizer:
     def is_configured(self) -> bool:
-        """Checks if the OpenAI client is available and configured."""
-        return CLIENT_AVAILABLE
+        """Checks if the OpenAI client is available and configured (validating it first if the last check is stale)."""
+        return bool(check_health()["healthy"])
 
     def categorize_article(self, title: str, description: Optional[str] = None) -> str:
         """
@@ -49,7 +238,13 @@ class AICategorizer:
         """
         if not self.is_configured():
             return "general"
-            
+
+        cache = get_categorization_cache()
+        key = cache_key(OPENAI_MODEL, CATEGORY_PROMPT_VERSION, "category", title, description)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             content = f"Title: {title}"
             if description:
@@ -65,8 +260,7 @@ class AICategorizer:
             Return only the category name, nothing else. Choose the most appropriate category from the list above.
             """
             
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
+            response = chat_completion(
                 messages=[
                     {"role": "system", "content": "You are a news categorization expert. Always respond with only the category name from the provided list."},
                     {"role": "user", "content": prompt}
@@ -78,59 +272,118 @@ class AICategorizer:
             category = response.choices[0].message.content.strip().lower()
             
             # Validate the response is in our predefined categories
-            if category in PREDEFINED_CATEGORIES:
-                return category
-            else:
+            if category not in PREDEFINED_CATEGORIES:
                 # Fallback to a default category if AI response is not in our list
-                return "general"
+                category = "general"
+            cache.put(key, category)
+            return category
                 
         except Exception as e:
             print(f"Error categorizing article: {e}")
             return "general"
     
+    def categorize_chunk(self, articles: List[Dict]) -> List[Optional[str]]:
+        """
+        Categorizes up to BATCH_SIZE articles with a single request.
+
+        Returns one category per article, or None where the model gave no
+        usable answer. If the response is not valid JSON the articles are
+        categorized one at a time instead.
+        """
+        messages = [
+            {"role": "system", "content": "You are a news categorization expert. Always respond with JSON using only categories from the provided list."},
+            {"role": "user", "content": build_batch_prompt(articles)}
+        ]
+        response = chat_completion(
+            messages=messages,
+            max_tokens=20 + 15 * len(articles),
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        try:
+            return parse_batch_response(response.choices[0].message.content, len(articles))
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"Unparseable batch response ({e}), falling back to per-article requests")
+            return [self.categorize_article(a.get('title', ''), a.get('description')) for a in articles]
+
     def categorize_articles_batch(self, articles: List[Dict]) -> List[Dict]:
         """
         Categorize multiple articles in batch.
-        
+
+        Articles without a predefined category are answered from the
+        categorization cache where possible, then by the local classifier
+        when it is confident enough. The rest are packed BATCH_SIZE to a
+        prompt and the prompts are sent by up to MAX_WORKERS threads.
+
         Args:
             articles: List of article dictionaries
-            
+
         Returns:
             List[Dict]: Articles with updated categories
         """
+        # Skip articles that already have a good category
+        pending = [a for a in articles if a.get('category', '').lower() not in PREDEFINED_CATEGORIES]
+        if not pending:
+            return articles
+
+        # Answer what the cache already knows, and ask about each distinct article only once
+        cache = get_categorization_cache()
+        by_key: Dict[str, List[Dict]] = {}
+        for article in pending:
+            key = cache_key(OPENAI_MODEL, CATEGORY_PROMPT_VERSION, "category", article.get('title', ''), article.get('description'))
+            by_key.setdefault(key, []).append(article)
+        cached = cache.get_many(by_key)
+        for key, category in cached.items():
+            for article in by_key.pop(key):
+                article['category'] = category
+                article['ai_categorized'] = True
+        CATEGORIZATION_ANSWERS.labels("cache").inc(len(cached))
+
+        # Confident local predictions never reach the API. Imported here so
+        # NumPy is only loaded when there is something to categorize.
+        import local_classifier
+        classifier = local_classifier.get_local_classifier()
+        if classifier is not None and by_key:
+            representatives = [group[0] for group in by_key.values()]
+            predictions = classifier.predict([local_classifier.article_text(a.get('title', ''), a.get('description')) for a in representatives])
+            for key, (category, confidence) in zip(list(by_key), predictions):
+                if confidence >= local_classifier.CONFIDENCE_THRESHOLD and category in PREDEFINED_CATEGORIES:
+                    for article in by_key.pop(key):
+                        article['category'] = category
+                        article['ai_categorized'] = False
+                    CATEGORIZATION_ANSWERS.labels("local").inc()
+
         if not self.is_configured():
             print("Skipping AI batch categorization: Client not configured.")
-            return articles # Return original articles
+            return articles # Return articles without an LLM answer unchanged
 
-        categorized_articles = []
-        
-        for article in articles:
+        keys = list(by_key)
+        chunks = [keys[i:i + BATCH_SIZE] for i in range(0, len(keys), BATCH_SIZE)]
+        if not chunks:
+            return articles
+
+        def run_chunk(chunk: List[str]) -> List[Optional[str]]:
             try:
-                # Skip if already has a good category
-                current_category = article.get('category', '').lower()
-                if current_category in PREDEFINED_CATEGORIES:
-                    categorized_articles.append(article)
-                    continue
-                
-                # Categorize using AI
-                ai_category = self.categorize_article(
-                    title=article.get('title', ''),
-                    description=article.get('description')
-                )
-                
-                # Update article with AI category
-                article['category'] = ai_category
-                article['ai_categorized'] = True
-                categorized_articles.append(article)
-                
+                return self.categorize_chunk([by_key[key][0] for key in chunk])
             except Exception as e:
-                print(f"Error processing article '{article.get('title', 'Unknown')}': {e}")
-                article['category'] = 'general'
-                article['ai_categorized'] = False
-                categorized_articles.append(article)
-        
-        return categorized_articles
-    
+                print(f"Error categorizing batch of {len(chunk)} articles: {e}")
+                return [None] * len(chunk)
+
+        answers: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as pool:
+            for chunk, categories in zip(chunks, pool.map(run_chunk, chunks)):
+                for key, category in zip(chunk, categories):
+                    if category is not None:
+                        answers[key] = category
+                    for article in by_key[key]:
+                        article['category'] = category or 'general'
+                        article['ai_categorized'] = category is not None
+        CATEGORIZATION_ANSWERS.labels("llm").inc(len(answers))
+        CATEGORIZATION_ANSWERS.labels("fallback").inc(len(keys) - len(answers))
+        cache.put_many(answers)
+
+        return articles
+
     def get_category_suggestions(self, title: str, description: Optional[str] = None) -> List[str]:
         """
         Get multiple category suggestions for an article.
@@ -145,6 +398,12 @@ class AICategorizer:
         if not self.is_configured():
             return ["general"]
 
+        cache = get_categorization_cache()
+        key = cache_key(OPENAI_MODEL, SUGGESTIONS_PROMPT_VERSION, "suggestions", title, description)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             content = f"Title: {title}"
             if description:
@@ -160,8 +419,7 @@ class AICategorizer:
             Return only the category names separated by commas, in order of relevance.
             """
             
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
+            response = chat_completion(
                 messages=[
                     {"role": "system", "content": "You are a news categorization expert. Return only category names separated by commas."},
                     {"role": "user", "content": prompt}
@@ -173,7 +431,9 @@ class AICategorizer:
             suggestions = response.choices[0].message.content.strip().lower().split(',')
             suggestions = [s.strip() for s in suggestions if s.strip() in PREDEFINED_CATEGORIES]
             
-            return suggestions[:3]  # Return top 3 suggestions
+            suggestions = suggestions[:3]  # Return top 3 suggestions
+            cache.put(key, suggestions)
+            return suggestions
             
         except Exception as e:
             print(f"Error getting category suggestions: {e}")
@@ -0,0 +1,117 @@
+"""
+Offline AI categorization benchmark against the local OpenAI-compatible stub.
+
+Categorizes --articles uncategorized articles twice: once one article per
+request, sequentially (the old behaviour), and once through
+categorize_articles_batch with the configured batch size and worker pool.
+Every request waits --latency seconds, so the wall time reflects how many
+round trips are made and how well they overlap. --rate-limit answers that
+fraction of requests with 429 to exercise the retry path, and --tpm sets the
+tokens-per-minute budget. The batched results are checked against the
+sequential ones. A final batched pass over the same articles shows the cost
+of a re-run scrape once the categorization cache is warm.
+
+Usage (from the backend directory):
+    python benchmarks/categorize_bench.py --articles 300 --latency 0.3
+    python benchmarks/categorize_bench.py --articles 300 --rate-limit 0.2
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import categorization_cache
+import database
+import local_classifier
+from fixtures import headline
+from stub_openai import StubOpenAIServer
+
+
+def make_articles(count: int):
+    rng = random.Random(0)
+    return [{"title": f"{headline(rng)} ({i})", "description": f"Description of article {i}.", "category": "top-stories"}
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=300, help="articles to categorize")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the stub waits before each response")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--batch-size", type=int, default=None, help="articles per prompt")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent requests")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens-per-minute budget")
+    parser.add_argument("--skip-sequential", action="store_true", help="only run the batched pass")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubOpenAIServer(latency=args.latency, rate_limit_rate=args.rate_limit) as server:
+        database.DB_FILE = os.path.join(tmp, "categorize.db")
+        # Measure the API path only; no trained model means the local classifier answers nothing
+        local_classifier.MODEL_FILE = os.path.join(tmp, "no-model.npz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        with contextlib.redirect_stdout(io.StringIO()):
+            import ai_categorizer
+        if args.batch_size:
+            ai_categorizer.BATCH_SIZE = args.batch_size
+        if args.workers:
+            ai_categorizer.MAX_WORKERS = args.workers
+        if args.tpm:
+            ai_categorizer.token_budget = ai_categorizer.TokenBucket(rate=args.tpm / 60.0, capacity=args.tpm)
+        ai_categorizer.BACKOFF_BASE = 0.05
+        categorizer = ai_categorizer.get_ai_categorizer()
+
+        cache = ai_categorizer.get_categorization_cache()
+
+        expected = None
+        if not args.skip_sequential:
+            articles = make_articles(args.articles)
+            requests_before, started = server.requests, time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = [categorizer.categorize_article(a["title"], a["description"]) for a in articles]
+            elapsed = time.perf_counter() - started
+            print(f"sequential: {elapsed:.2f}s, {server.requests - requests_before} requests")
+            cache.clear()
+
+        articles = make_articles(args.articles)
+        requests_before, limited_before, started = server.requests, server.rate_limited, time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            categorizer.categorize_articles_batch(articles)
+        elapsed = time.perf_counter() - started
+        print(f"batched:    {elapsed:.2f}s, {server.requests - requests_before} requests "
+              f"({server.rate_limited - limited_before} rate limited), batch size {ai_categorizer.BATCH_SIZE}, "
+              f"{ai_categorizer.MAX_WORKERS} workers")
+
+        failed = sum(1 for a in articles if not a["ai_categorized"])
+        if failed:
+            print(f"FAIL: {failed} articles fell back to 'general'")
+            sys.exit(1)
+        if expected is not None:
+            mismatches = sum(1 for a, e in zip(articles, expected) if a["category"] != e)
+            if mismatches:
+                print(f"FAIL: {mismatches} articles categorized differently from the sequential pass")
+                sys.exit(1)
+            print("batched categories match the sequential pass")
+
+        # Same articles again, as on a re-run scrape; fresh cache object so the answers come from SQLite
+        categorization_cache.categorization_cache_instance = None
+        articles = make_articles(args.articles)
+        requests_before, started = server.requests, time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            categorizer.categorize_articles_batch(articles)
+        elapsed = time.perf_counter() - started
+        print(f"re-run:     {elapsed:.3f}s, {server.requests - requests_before} requests, "
+              f"cache {categorization_cache.get_categorization_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Accuracy and latency of the local classifier against the labels in news.db.
+
+Runs --folds shuffled train/test splits over every article whose category is
+one of PREDEFINED_CATEGORIES. For each threshold it reports how many held-out
+articles the classifier would answer on its own (coverage) and how often
+those answers match the stored category; the rest would go to the LLM. Also
+reports training time and the time to classify a batch of --batch articles.
+
+Usage (from the backend directory):
+    python benchmarks/classifier_bench.py
+    python benchmarks/classifier_bench.py --db /path/to/news.db --thresholds 0.5 0.8 0.95
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import local_classifier
+from local_classifier import LocalClassifier, evaluate, load_training_data, split_holdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=database.DB_FILE, help="database holding the labelled articles")
+    parser.add_argument("--folds", type=int, default=5, help="shuffled train/test splits to average over")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.8, local_classifier.CONFIDENCE_THRESHOLD, 0.95])
+    parser.add_argument("--batch", type=int, default=300, help="articles per classification batch for the latency test")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from ai_categorizer import PREDEFINED_CATEGORIES
+    database.DB_FILE = args.db
+    texts, labels = load_training_data(PREDEFINED_CATEGORIES)
+    print(f"{len(texts)} labelled articles, {len(set(labels))} categories")
+
+    train_times = []
+    results = {threshold: [] for threshold in args.thresholds}
+    for fold in range(args.folds):
+        train_texts, train_labels, test_texts, test_labels = split_holdout(texts, labels, seed=fold)
+        started = time.perf_counter()
+        model = LocalClassifier.train(train_texts, train_labels)
+        train_times.append(time.perf_counter() - started)
+        for threshold in args.thresholds:
+            results[threshold].append(evaluate(model, test_texts, test_labels, threshold))
+
+    print(f"held-out accuracy (top prediction): {statistics.mean(r['accuracy'] for r in results[args.thresholds[0]]):.1%}")
+    for threshold in args.thresholds:
+        coverage = statistics.mean(r["coverage"] for r in results[threshold])
+        accuracy = statistics.mean(r["confident_accuracy"] for r in results[threshold])
+        print(f"  threshold {threshold:.2f}: answers {coverage:6.1%} locally at {accuracy:6.1%} accuracy")
+
+    model = LocalClassifier.train(texts, labels)
+    batch = (texts * (args.batch // max(1, len(texts)) + 1))[:args.batch]
+    timings = []
+    for _ in range(20):
+        started = time.perf_counter()
+        model.predict(batch)
+        timings.append(time.perf_counter() - started)
+    print(f"training: {statistics.median(train_times) * 1000:.1f}ms; "
+          f"classifying {len(batch)} articles: {statistics.median(timings) * 1000:.2f}ms median")
+
+
+if __name__ == "__main__":
+    main()
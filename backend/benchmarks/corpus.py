@@ -0,0 +1,134 @@
+"""
+Synthetic article corpus for the benchmarks.
+
+make_article(i) deterministically generates the i-th article. Titles and
+descriptions draw from a vocabulary with a Zipf-like word distribution, so
+full-text queries match realistic fractions of the corpus; categories are
+skewed the way real sections are; publishedAt values spread evenly over
+CORPUS_DAYS ending at CORPUS_END. build_corpus writes a database of any size
+through the normal schema and insert path, and corpus_db caches built
+databases between runs, since a million-row corpus takes a while to build.
+
+    from corpus import corpus_db
+    database.DB_FILE = corpus_db(100_000)
+"""
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import database
+from fixtures import WORDS
+from migrations import SCHEMA_VERSION
+
+CORPUS_END = datetime.datetime(2025, 6, 30, tzinfo=datetime.timezone.utc)
+CORPUS_DAYS = 365
+CORPUS_SPACING = datetime.timedelta(minutes=1)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "news-bench-corpus")
+INSERT_BATCH = 5000
+
+# Section weights, roughly how often each appears on the live site
+CATEGORY_WEIGHTS = {
+    "top-stories": 12, "world": 14, "politics": 14, "business": 10, "sports": 10, "entertainment": 8,
+    "technology": 7, "health": 6, "style": 4, "travel": 4, "science": 4, "climate": 4, "weather": 3,
+}
+
+_SYLLABLES = ("ba", "ko", "ri", "tan", "mel", "vor", "shi", "lu", "den", "pra", "gos", "nim", "te", "zar", "qua", "fel")
+
+
+def _vocabulary(size: int = 4000):
+    # The real fixture words are the most frequent, so queries like "election" hit many rows
+    rng = random.Random(1234)
+    words = list(WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cumulative = list(itertools.accumulate(1.0 / rank for rank in range(1, size + 1)))
+    return words, cumulative
+
+
+VOCABULARY, _CUMULATIVE_WEIGHTS = _vocabulary()
+_CATEGORIES = list(CATEGORY_WEIGHTS)
+_CATEGORY_CUMULATIVE = list(itertools.accumulate(CATEGORY_WEIGHTS.values()))
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=_CUMULATIVE_WEIGHTS, k=count))
+
+
+def make_article(i: int, seed: int = 0, rows: int = 0) -> dict:
+    """
+    The i-th synthetic article. With `rows` given, publishedAt values for
+    articles 0..rows-1 spread over CORPUS_DAYS; otherwise they are one minute
+    apart, counting forward from CORPUS_END - CORPUS_DAYS.
+    """
+    rng = random.Random(seed * 1_000_003 + i)
+    start = CORPUS_END - datetime.timedelta(days=CORPUS_DAYS)
+    if rows:
+        published = start + datetime.timedelta(days=CORPUS_DAYS) * (i / rows)
+    else:
+        published = start + CORPUS_SPACING * i
+    published += datetime.timedelta(seconds=rng.randint(0, 59))
+    return {
+        'title': _words(rng, rng.randint(6, 14)).capitalize(),
+        'url': f"https://www.cnn.com/{published:%Y/%m/%d}/synthetic/story-{seed}-{i}/index.html",
+        'source': 'CNN',
+        'category': rng.choices(_CATEGORIES, cum_weights=_CATEGORY_CUMULATIVE)[0],
+        'imageUrl': f"https://media.cnn.com/synthetic/{seed}/{i}.jpg",
+        'description': _words(rng, rng.randint(20, 45)).capitalize() + ".",
+        'publishedAt': published.isoformat(),
+    }
+
+
+def seed(rows: int, first_id: int = 0, corpus_seed: int = 0, spread: bool = False):
+    """Inserts articles first_id..first_id+rows-1 into database.DB_FILE through add_article_batch."""
+    conn = database.get_db_connection()
+    try:
+        for start in range(first_id, first_id + rows, INSERT_BATCH):
+            end = min(start + INSERT_BATCH, first_id + rows)
+            database.add_article_batch(
+                [make_article(i, corpus_seed, rows if spread else 0) for i in range(start, end)], conn
+            )
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_corpus(db_file: str, rows: int, corpus_seed: int = 0):
+    """Creates a fresh, fully migrated database at `db_file` holding `rows` synthetic articles."""
+    previous = database.DB_FILE
+    database.DB_FILE = db_file
+    try:
+        database.init_db()
+        seed(rows, corpus_seed=corpus_seed, spread=True)
+    finally:
+        database.DB_FILE = previous
+
+
+def corpus_db(rows: int, corpus_seed: int = 0, cache_dir: str = CACHE_DIR) -> str:
+    """Path to a cached corpus database of `rows` articles, building it on first use."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"corpus-{rows}-seed{corpus_seed}-schema{SCHEMA_VERSION}.db")
+    if os.path.exists(path):
+        return path
+    print(f"Building {rows:,}-row corpus at {path}...")
+    started = time.perf_counter()
+    partial = path + ".partial"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(partial + suffix):
+            os.remove(partial + suffix)
+    build_corpus(partial, rows, corpus_seed)
+    # Fold the WAL back in before renaming, so the cached file is self-contained
+    conn = sqlite3.connect(partial)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    os.replace(partial, path)
+    print(f"Built in {time.perf_counter() - started:.1f}s")
+    return path
@@ -0,0 +1,117 @@
+"""
+Load test: API read latency while a scrape is writing.
+
+Builds a throwaway database, then drives the list and search endpoints through
+the ASGI app twice: once with the database idle and once while a writer thread
+inserts article batches the way run_full_scrape does. With WAL mode and the
+read pool, p99 latency should stay roughly flat between the two runs.
+
+Both runs go to the database: the response cache is disabled for them, since
+every write bumps the data generation and would turn the busy run into misses
+against an idle run of hits. A third run, idle with the cache on, measures
+the cache hit path on its own.
+
+Usage (from the backend directory):
+    python benchmarks/db_load.py --rows 20000 --requests 2000 --concurrency 32 --write-interval 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import database
+from corpus import make_article, seed
+
+PATHS = ["/api/news", "/api/news/category/politics", "/api/search?q=election%20market",
+         "/api/news?sort_by=publishedAt_asc"]
+
+
+def writer(stop: threading.Event, first_id: int, interval: float, counter: list):
+    """Mimics a scrape: small batches committed every `interval` seconds until told to stop."""
+    conn = database.get_db_connection()
+    next_id = first_id
+    while not stop.wait(interval):
+        database.add_article_batch([make_article(i) for i in range(next_id, next_id + 20)], conn)
+        next_id += 20
+        counter[0] += 20
+    conn.close()
+
+
+async def drive(app, total: int, concurrency: int) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(PATHS[i % len(PATHS)])
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text}")
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def report(label: str, latencies: list):
+    print(f"{label:<18} p50={percentile(latencies, 0.50):7.2f}ms  "
+          f"p95={percentile(latencies, 0.95):7.2f}ms  p99={percentile(latencies, 0.99):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-interval", type=float, default=0.05,
+                        help="seconds between writer batches of 20 articles")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "load.db")
+        database.init_db()
+        seed(args.rows)
+
+        import main
+        app = main.app
+        max_entries, main.response_cache.max_entries = main.response_cache.max_entries, 0
+        main.response_cache.clear()
+
+        idle = asyncio.run(drive(app, args.requests, args.concurrency))
+        report("idle", idle)
+
+        stop = threading.Event()
+        written = [0]
+        thread = threading.Thread(target=writer, args=(stop, args.rows, args.write_interval, written))
+        thread.start()
+        try:
+            busy = asyncio.run(drive(app, args.requests, args.concurrency))
+        finally:
+            stop.set()
+            thread.join()
+        report("during scrape", busy)
+        print(f"writer inserted {written[0]} articles during the run")
+
+        main.response_cache.max_entries = max_entries
+        # One request per path first, so the timed run sees only hits
+        asyncio.run(drive(app, len(PATHS), 1))
+        cached = asyncio.run(drive(app, args.requests, args.concurrency))
+        report("idle, cached", cached)
+        database.close_read_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Extraction microbenchmark: time and peak memory per page for each parser backend.
+
+Runs every backend in extraction.py over the same synthetic CNN fixtures
+(article pages and listing pages, see fixtures.py), checks that they all return
+identical results, and reports the median parse time and the tracemalloc peak
+for one page. 'soup' is the full-tree parse the scraper used originally.
+
+Usage (from the backend directory):
+    python benchmarks/extraction_bench.py --pages 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extraction
+from fixtures import article_page, listing_page
+
+
+def measure(extract, pages):
+    timings = []
+    results = []
+    for page in pages:
+        started = time.perf_counter()
+        results.append(extract(page))
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    extract(pages[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, results
+
+
+def run(kind: str, extractors: dict, pages: list):
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"\n{kind} pages ({len(pages)} pages, {size_kb:.0f} KB each on average)")
+    print(f"  {'backend':<10} {'median':>10} {'peak mem':>12} {'speedup':>9}")
+    baseline_time = None
+    reference = None
+    for name in ('soup', 'strainer', 'stream'):
+        median, peak, results = measure(extractors[name], pages)
+        if reference is None:
+            reference = results
+        elif results != reference:
+            raise SystemExit(f"backend '{name}' disagrees with 'soup' on {kind} pages")
+        baseline_time = baseline_time or median
+        print(f"  {name:<10} {median * 1000:>8.2f}ms {peak / 1024:>9.0f} KB {baseline_time / median:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    articles = [article_page(f"/2025/06/20/world/story-{i}/index.html").encode() for i in range(args.pages)]
+    listings = [listing_page(f"section-{i}").encode() for i in range(args.pages)]
+    run("article", extraction.ARTICLE_EXTRACTORS, articles)
+    run("listing", extraction.LISTING_EXTRACTORS, listings)
+
+
+if __name__ == "__main__":
+    main()
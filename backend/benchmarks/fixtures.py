@@ -0,0 +1,70 @@
+"""
+Synthetic CNN-shaped HTML used by the offline benchmarks and the stub server.
+
+The pages mirror the markup the scraper relies on (article links with
+`data-link-type="article"`, `container__headline-text` spans, an
+`image__container` image and `paragraph` text) and pad it with the kind of
+navigation, script and related-content markup real CNN pages carry, so parse
+costs are in the same range as the live site.
+"""
+import random
+
+WORDS = ("election", "market", "storm", "court", "climate", "team", "film", "study",
+         "minister", "economy", "health", "travel", "space", "trade", "vote", "police",
+         "summit", "border", "energy", "record", "rescue", "startup", "museum", "league")
+
+
+def headline(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))).capitalize()
+
+
+def article_path(category: str, index: int) -> str:
+    return f"/2025/06/20/{category}/story-{category}-{index}/index.html"
+
+
+def _filler(rng: random.Random, blocks: int) -> str:
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f'<div class="zone__item zone-{i}" data-uri="cms.cnn.com/_components/card/{rng.getrandbits(40):x}">'
+            f'<ul class="nav__list">' +
+            ''.join(f'<li class="nav__item"><a class="nav__link" href="/section/{rng.choice(WORDS)}">{rng.choice(WORDS)}</a></li>'
+                    for _ in range(8)) +
+            '</ul>'
+            f'<script type="application/json">{{"id": "{rng.getrandbits(64):x}", "tags": ["{rng.choice(WORDS)}"]}}</script>'
+            '</div>'
+        )
+    return ''.join(parts)
+
+
+def listing_page(category: str, links: int = 60, seed: int = 0) -> str:
+    """A section front with `links` article cards, a few with headlines too short to keep."""
+    rng = random.Random(f"{category}-{seed}")
+    cards = []
+    for i in range(links):
+        title = headline(rng) if i % 10 else "Short"
+        cards.append(
+            f'<div class="card container__item">'
+            f'<a href="{article_path(category, i)}" class="container__link" data-link-type="article">'
+            f'<div class="container__text"><span class="container__headline-text">{title}</span></div></a></div>'
+        )
+    return (f'<!DOCTYPE html><html><head><title>{category}</title></head><body>'
+            f'<header>{_filler(rng, 20)}</header><main>{"".join(cards)}</main>'
+            f'<footer>{_filler(rng, 20)}</footer></body></html>')
+
+
+def article_page(path: str, has_image: bool = True) -> str:
+    """An article page of a few hundred KB with the image and summary paragraph after the page chrome."""
+    rng = random.Random(path)
+    image = (f'<div class="image__container"><picture class="image__picture">'
+             f'<img src="https://media.cnn.com/api/v1/images/stellar/prod/{rng.getrandbits(48):x}.jpg" alt=""></picture></div>'
+             if has_image else '')
+    paragraphs = ''.join(
+        f'<p class="paragraph inline-placeholder vossi-paragraph">{" ".join(rng.choice(WORDS) for _ in range(40))}.</p>'
+        for _ in range(25)
+    )
+    return (f'<!DOCTYPE html><html><head><title>{headline(rng)}</title></head><body>'
+            f'<header>{_filler(rng, 120)}</header>'
+            f'<article><h1 class="headline__text">{headline(rng)}</h1>{image}'
+            f'<div class="article__content">{paragraphs}</div></article>'
+            f'<aside>{_filler(rng, 150)}</aside></body></html>')
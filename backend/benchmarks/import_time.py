@@ -0,0 +1,77 @@
+"""
+Startup budget check: how long `import main` takes, measured with
+`python -X importtime` in a fresh interpreter.
+
+The server imports main on every worker boot, and `python scraper.py` pulls in
+most of the same modules, so nothing on that path should touch the network or
+load heavy packages that are only needed later. This runs the import --runs
+times with an API key set and OPENAI_BASE_URL pointing at an unroutable
+address (a network call at import time would hang until the subprocess
+timeout), reports the median total and the slowest top-level imports, and
+exits non-zero if the median is over --budget milliseconds or if any of the
+lazily loaded packages (openai, numpy) were imported.
+
+Usage (from the backend directory):
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module scraper --budget 600
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_PACKAGES = ("openai", "numpy")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(module: str, timeout: float):
+    """Returns {module name: (cumulative microseconds, nesting depth)} for one cold import."""
+    env = dict(os.environ, OPENAI_API_KEY="sk-import-time-check", OPENAI_BASE_URL="http://10.255.255.1/v1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(2)), (len(match.group(3)) - 1) // 2)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--budget", type=float, default=1000.0, help="maximum median import time in milliseconds")
+    parser.add_argument("--runs", type=int, default=5, help="cold imports to take the median of")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before an import counts as hung")
+    args = parser.parse_args()
+
+    runs = [measure(args.module, args.timeout) for _ in range(args.runs)]
+    total = statistics.median(run[args.module][0] for run in runs) / 1000
+    last = runs[-1]
+
+    print(f"import {args.module}: {total:.0f}ms median over {args.runs} runs (budget {args.budget:.0f}ms)")
+    top_level = sorted(((us, name) for name, (us, depth) in last.items() if depth == 1), reverse=True)
+    for us, name in top_level[:args.top]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+
+    failures = []
+    if total > args.budget:
+        failures.append(f"import took {total:.0f}ms, over the {args.budget:.0f}ms budget")
+    for package in LAZY_PACKAGES:
+        if package in last:
+            failures.append(f"{package} is imported at startup; it should only load on first use")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
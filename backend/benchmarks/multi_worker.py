@@ -0,0 +1,249 @@
+"""
+Multi-worker check: several uvicorn workers, one scraper, consistent reads.
+
+Starts the API with `uvicorn --workers N` on a throwaway database, with the
+scraper pointed at the local CNN stub, and checks that:
+
+- exactly one worker reports itself as the writer, and the startup full
+  scrape fetched each listing page once rather than once per worker;
+- a scrape requested through any worker runs once, in the writer, and every
+  worker serves the new articles within a few poll intervals (the time it
+  took is reported);
+- after the writer is killed, another worker takes over within the lease
+  retry interval and the next scrape again runs exactly once.
+
+Exits non-zero if any check fails.
+
+Usage (from the backend directory):
+    python benchmarks/multi_worker.py --workers 4
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import database
+from stub_cnn import StubCNNServer
+
+# Short intervals so the check runs in seconds; see workers.py
+POLL_INTERVAL = "0.2"
+LEASE_RETRY = "1"
+# Persistent connections held open; each stays with whichever worker accepted it
+CONNECTIONS = 16
+
+
+def create_app():
+    """uvicorn --factory entry point for each worker: the API, scraping the stub instead of CNN."""
+    import scheduler
+    import scraper
+
+    database.DB_FILE = os.environ["MULTI_WORKER_DB"]
+    scraper.CNN_BASE_URL = os.environ["MULTI_WORKER_CNN"]
+    scheduler.scheduler_instance = scheduler.ScrapeScheduler(
+        [scraper.HOMEPAGE_CATEGORY] + list(scraper.CATEGORIES), use_ai_categorization=False
+    )
+    import main
+    return main.app
+
+
+class Checks:
+    def __init__(self):
+        self.failures = 0
+
+    def expect(self, ok: bool, message: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            self.failures += 1
+
+
+def get_json(conn: http.client.HTTPConnection, path: str):
+    conn.request("GET", path)
+    response = conn.getresponse()
+    return json.loads(response.read())
+
+
+def open_connections(port: int, count: int) -> list:
+    """Opens `count` keep-alive connections and returns (pid, connection) for each."""
+    connections = []
+    for _ in range(count):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        connections.append((get_json(conn, "/api/scrape/status")["worker"]["pid"], conn))
+    return connections
+
+
+def listing_hits(stub: StubCNNServer) -> Counter:
+    return Counter({path: hits for path, hits in stub.paths.items() if not path.endswith("/index.html")})
+
+
+def wait_for(condition, timeout: float, interval: float = 0.1) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def newest_ids(conn: http.client.HTTPConnection) -> list:
+    return [article["id"] for article in get_json(conn, "/api/news?limit=5&fields=id")]
+
+
+def stored_newest_ids() -> list:
+    return [article["id"] for article in database.get_articles(limit=5, fields=["id"])["articles"]]
+
+
+def writer_connection(port: int, writer_pid: int) -> http.client.HTTPConnection:
+    """A keep-alive connection that landed on the writer worker."""
+    for _ in range(100):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        if get_json(conn, "/api/scrape/status")["worker"]["pid"] == writer_pid:
+            return conn
+        conn.close()
+    raise RuntimeError(f"no connection reached writer {writer_pid}")
+
+
+def wait_for_scrapes(writer: http.client.HTTPConnection, runs: int, timeout: float = 120) -> dict:
+    """Waits until the writer has finished `runs` scrapes and has nothing running or queued."""
+    status = {}
+
+    def idle():
+        status.update(get_json(writer, "/api/scrape/status"))
+        last_run = status.get("last_run") or {}
+        return not status["running"] and not status["pending"] and last_run.get("id", 0) >= runs
+
+    wait_for(idle, timeout, 0.2)
+    return status
+
+
+def check_convergence(checks: Checks, connections: list, label: str):
+    expected = stored_newest_ids()
+    started = time.time()
+    pending = {index for index in range(len(connections))}
+
+    def converged():
+        for index in list(pending):
+            if newest_ids(connections[index][1]) == expected:
+                pending.discard(index)
+        return not pending
+
+    ok = wait_for(converged, 10, 0.02)
+    workers = len({pid for pid, _ in connections})
+    checks.expect(ok, f"{label}: all {workers} workers serve the newest articles "
+                      f"{(time.time() - started) * 1000:.0f} ms after the scrape settled")
+
+
+def run(args) -> int:
+    checks = Checks()
+    with tempfile.TemporaryDirectory() as tmp, StubCNNServer(links_per_page=20) as stub:
+        database.DB_FILE = os.path.join(tmp, "news.db")
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = {
+            **os.environ,
+            "MULTI_WORKER_DB": database.DB_FILE,
+            "MULTI_WORKER_CNN": stub.base_url,
+            "WORKER_POLL_INTERVAL": POLL_INTERVAL,
+            "WRITER_LEASE_RETRY": LEASE_RETRY,
+            "OPENAI_WARMUP": "0",
+            "OPENAI_API_KEY": "",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "multi_worker:create_app", "--factory", "--app-dir", BENCHMARKS_DIR,
+             "--port", str(port), "--workers", str(args.workers), "--timeout-keep-alive", "120",
+             "--timeout-graceful-shutdown", "2", "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            wait_for(lambda: socket.socket().connect_ex(("127.0.0.1", port)) == 0, 30)
+            connections = open_connections(port, CONNECTIONS)
+            statuses = [get_json(conn, "/api/scrape/status")["worker"] for _, conn in connections]
+            writers = {status["pid"] for status in statuses if status["role"] == "writer"}
+            named = {status["writer_pid"] for status in statuses}
+            checks.expect(len(named) == 1 and writers <= named,
+                          f"{len({status['pid'] for status in statuses})} workers answered; all name writer {named}")
+            writer_pid = statuses[0]["writer_pid"]
+            writer = writer_connection(port, writer_pid)
+
+            # The writer's startup full scrape
+            wait_for_scrapes(writer, 1)
+            hits = listing_hits(stub)
+            checks.expect(set(hits.values()) == {1},
+                          f"startup: {len(hits)} listing pages fetched once each (max {max(hits.values(), default=0)})")
+            check_convergence(checks, connections, "startup")
+
+            # A scrape requested through every connection, with new links on the stub
+            stub.links_per_page += 10
+            stub.page_for.cache_clear()
+            before = database.get_latest_article_id()
+            answers = Counter()
+            for _, conn in connections:
+                conn.request("POST", "/api/scrape-and-categorize")
+                answers[json.loads(conn.getresponse().read())["status"]] += 1
+            status = wait_for_scrapes(writer, 2)
+            hits = listing_hits(stub)
+            # The startup scrape, then the requests, coalesced into one or two runs
+            checks.expect(database.get_latest_article_id() > before and max(hits.values()) <= 3,
+                          f"requested: {dict(answers)}; {status['last_run']['id'] - 1} runs, "
+                          f"listing pages fetched {max(hits.values())} times in total")
+            check_convergence(checks, connections, "requested scrape")
+
+            # Failover: new links on the stub, so the new writer's first run, a full scrape, stores articles
+            stub.links_per_page += 10
+            stub.page_for.cache_clear()
+            before_hits = listing_hits(stub)
+            before = database.get_latest_article_id()
+            os.kill(writer_pid, signal.SIGKILL)
+            killed_at = time.time()
+            new_writer = []
+
+            def elected():
+                try:
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                    worker = get_json(conn, "/api/scrape/status")["worker"]
+                    conn.close()
+                except (OSError, http.client.HTTPException, ValueError):
+                    return False
+                if worker["writer_pid"] not in (None, writer_pid):
+                    new_writer.append(worker["writer_pid"])
+                    return True
+                return False
+
+            checks.expect(wait_for(elected, 30, 0.1),
+                          f"failover: writer {writer_pid} killed, {new_writer[-1] if new_writer else 'none'} took over "
+                          f"after {(time.time() - killed_at) * 1000:.0f} ms")
+            if new_writer:
+                wait_for_scrapes(writer_connection(port, new_writer[-1]), 1)
+            hits = listing_hits(stub) - before_hits
+            checks.expect(database.get_latest_article_id() > before and set(hits.values()) == {1},
+                          f"after failover: {len(hits)} listing pages fetched once each")
+            connections = open_connections(port, CONNECTIONS)
+            check_convergence(checks, connections, "after failover")
+        finally:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    print("all checks passed" if not checks.failures else f"{checks.failures} checks failed")
+    return 1 if checks.failures else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
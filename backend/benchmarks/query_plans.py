@@ -0,0 +1,150 @@
+"""
+Query plan check: fails if any API query shape falls back to a table scan.
+
+Seeds a throwaway database, calls the real database functions for every
+combination of endpoint, sort, date filter and page direction, captures the
+SQL they run, and inspects EXPLAIN QUERY PLAN for each statement. It then
+archives the older half of the rows and checks the shapes whose from_ts
+reaches into the archive tier, which read both databases. A query fails
+the check if it reads `articles` with a full SCAN, or if an unfiltered list
+query (whose ORDER BY an index should satisfy) sorts in a temp B-tree. With a
+date range the planner may rightly seek the range and sort just those rows.
+
+Usage (from the backend directory), exits non-zero on any regression:
+    python benchmarks/query_plans.py
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import retention
+from db_load import seed
+from migrations import epoch_seconds
+
+
+def day(date: str) -> int:
+    """Midnight UTC at the start of `date`, as the Unix seconds the date filters take."""
+    return epoch_seconds(f"{date}T00:00:00+00:00")
+
+
+DATE_FILTERS = (
+    {},
+    {'from_ts': day('2025-01-02')},
+    {'from_ts': day('2025-01-02'), 'to_ts': day('2025-01-04')},
+)
+
+# The seeded rows start on 2024-06-30; everything before ARCHIVE_NOW - 1 day is archived
+ARCHIVE_NOW = datetime.datetime(2024, 7, 3, tzinfo=datetime.timezone.utc)
+ARCHIVE_DATE_FILTERS = (
+    {'from_ts': day('2024-06-30')},
+    {'from_ts': day('2024-06-30'), 'to_ts': day('2024-07-03')},
+)
+
+
+def query_shapes(date_filters=DATE_FILTERS):
+    """Yields (label, callable, allow_sort) for every query shape the API can issue."""
+    for sort_by in database.LIST_SORTS:
+        for filters in date_filters:
+            label = f"sort={sort_by} {filters or ''}".strip()
+            yield (f"get_articles {label}",
+                   lambda cursor, s=sort_by, f=filters: database.get_articles(sort_by=s, limit=5, cursor=cursor, **f), bool(filters))
+            yield (f"get_articles_by_category {label}",
+                   lambda cursor, s=sort_by, f=filters: database.get_articles_by_category('politics', sort_by=s, limit=5, cursor=cursor, **f), bool(filters))
+    for sort_by in database.SEARCH_SORTS:
+        for filters in date_filters:
+            label = f"sort={sort_by} {filters or ''}".strip()
+            # Matches are ranked or ordered after the full-text lookup, so sorting is expected
+            yield (f"search_articles {label}",
+                   lambda cursor, s=sort_by, f=filters: database.search_articles('election', sort_by=s, limit=5, cursor=cursor, **f), True)
+    if date_filters is DATE_FILTERS:
+        # Each category is its own index seek; only the few rows returned are sorted
+        yield ("get_feed", lambda cursor: database.get_feed(['world', 'politics', 'sports'], per_category=5), True)
+        # Live stream catch-up and Last-Event-ID replay walk the rowid upwards
+        yield ("get_articles_after",
+               lambda cursor: {"articles": database.get_articles_after(10, limit=5)}, False)
+        yield ("get_articles_after categories",
+               lambda cursor: {"articles": database.get_articles_after(10, ['world', 'politics'], limit=5, up_to=500)}, False)
+        # Related-article lookups read their neighbours by primary key
+        yield ("get_articles_by_ids",
+               lambda cursor: {"articles": list(database.get_articles_by_ids([40, 7, 300]).values())}, False)
+
+
+def plan_problems(conn, sql: str, allow_sort: bool) -> list:
+    problems = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[3]
+        if detail == "SCAN articles" or (detail.startswith("SCAN articles ") and "USING" not in detail):
+            problems.append(detail)
+        if not allow_sort and "USE TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append(detail)
+    return problems
+
+
+def check(conn, captured: list, shapes) -> tuple:
+    """Runs every shape's first, next and previous page. Returns (statements checked, failures)."""
+    failures = 0
+    checked = 0
+    for label, run, allow_sort in shapes:
+        captured.clear()
+        page = run(None)
+        pages = [("first page", list(captured))]
+        if page.get("next_cursor"):
+            captured.clear()
+            page = run(page["next_cursor"])
+            pages.append(("next page", list(captured)))
+        if page.get("prev_cursor"):
+            captured.clear()
+            run(page["prev_cursor"])
+            pages.append(("previous page", list(captured)))
+
+        for page_label, statements in pages:
+            for sql in statements:
+                if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                    continue
+                checked += 1
+                problems = plan_problems(conn, sql, allow_sort)
+                if problems:
+                    failures += 1
+                    print(f"FAIL {label} ({page_label}): {'; '.join(problems)}")
+    return checked, failures
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "plans.db")
+        database.READ_POOL_SIZE = 1
+        database.init_db()
+        seed(5000)
+        conn = database.get_db_connection()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        # With a single pooled connection, tracing it captures every read the API makes
+        captured = []
+        pool = database.get_read_pool()
+        with pool.connection() as pooled:
+            pooled.set_trace_callback(captured.append)
+
+        checked, failures = check(conn, captured, query_shapes())
+
+        retention.archive_old_articles(hot_days=1, now=ARCHIVE_NOW)
+        database.attach_archive(conn)
+        conn.execute("ANALYZE archive")
+        conn.commit()
+        archive_checked, archive_failures = check(conn, captured, query_shapes(ARCHIVE_DATE_FILTERS))
+        checked += archive_checked
+        failures += archive_failures
+
+        conn.close()
+        database.close_read_pool()
+
+    print(f"{checked} statements checked, {failures} regressed to a table scan or sort.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Date-range queries on large tables: integer published_ts vs ISO publishedAt text.
+
+For each --rows size, copies the synthetic corpus (see corpus.py), adds back
+the publishedAt text indexes the date filters used before published_ts, and
+times the same query shapes both ways over windows of 1, 7 and 30 days
+ending at CORPUS_END:
+
+- page: the newest 101 rows of the window, as /api/news?from_date=&to_date=
+- page_category: the same for one category
+- oldest: the oldest 101 rows of the window (sort_by=publishedAt_asc)
+- count: every index entry of the window, where comparison cost dominates
+
+It also times database.get_articles over each window, the whole API-side
+query path, and reports the size of both kinds of index.
+
+Usage (from the backend directory):
+    python benchmarks/range_bench.py
+    python benchmarks/range_bench.py --rows 100000 1000000 --iterations 50
+"""
+import argparse
+import datetime
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from corpus import CORPUS_END, corpus_db
+
+WINDOW_DAYS = (1, 7, 30)
+PAGE = database.DEFAULT_PAGE_SIZE + 1
+CATEGORY = "politics"
+
+# The shapes, filtered on the ISO text column (as before) and on the integer column
+SHAPES = {
+    "page": (
+        "SELECT id, title, url FROM articles WHERE publishedAt >= ? AND publishedAt <= ? ORDER BY publishedAt DESC, id DESC LIMIT ?",
+        "SELECT id, title, url FROM articles WHERE published_ts >= ? AND published_ts < ? ORDER BY published_ts DESC, id DESC LIMIT ?",
+    ),
+    "page_category": (
+        f"SELECT id, title, url FROM articles WHERE category = '{CATEGORY}' AND publishedAt >= ? AND publishedAt <= ? "
+        "ORDER BY publishedAt DESC, id DESC LIMIT ?",
+        f"SELECT id, title, url FROM articles WHERE category = '{CATEGORY}' AND published_ts >= ? AND published_ts < ? "
+        "ORDER BY published_ts DESC, id DESC LIMIT ?",
+    ),
+    "oldest": (
+        "SELECT id, title, url FROM articles WHERE publishedAt >= ? AND publishedAt <= ? ORDER BY publishedAt, id LIMIT ?",
+        "SELECT id, title, url FROM articles WHERE published_ts >= ? AND published_ts < ? ORDER BY published_ts, id LIMIT ?",
+    ),
+    "count": (
+        "SELECT count(*) FROM articles WHERE publishedAt >= ? AND publishedAt <= ? AND ? > 0",
+        "SELECT count(*) FROM articles WHERE published_ts >= ? AND published_ts < ? AND ? > 0",
+    ),
+}
+
+
+def median_ms(fn: Callable[[], Any], iterations: int) -> float:
+    for _ in range(3):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def index_bytes(conn: sqlite3.Connection, name: str) -> int:
+    try:
+        return conn.execute("SELECT sum(pgsize) FROM dbstat WHERE name = ?", (name,)).fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        # SQLite built without the dbstat table
+        return 0
+
+
+def bench(rows: int, iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    source = corpus_db(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "range.db")
+        shutil.copyfile(source, path)
+        conn = database.get_db_connection(path)
+        conn.execute("CREATE INDEX legacy_published ON articles (publishedAt)")
+        conn.execute("CREATE INDEX legacy_category_published ON articles (category, publishedAt)")
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"{rows:,} rows: publishedAt index {index_bytes(conn, 'legacy_published') / 1e6:.1f} MB, "
+              f"published_ts index {index_bytes(conn, 'idx_articles_published_ts') / 1e6:.1f} MB")
+
+        database.DB_FILE = path
+        database.close_read_pool()
+        for days in WINDOW_DAYS:
+            start = CORPUS_END - datetime.timedelta(days=days)
+            text_range = (start.strftime("%Y-%m-%d"), f"{CORPUS_END - datetime.timedelta(days=1):%Y-%m-%d}T23:59:59Z")
+            ts_range = (int(start.timestamp()), int(CORPUS_END.timestamp()))
+            for shape, (text_sql, ts_sql) in SHAPES.items():
+                text_rows = conn.execute(text_sql, (*text_range, PAGE)).fetchall()
+                ts_rows = conn.execute(ts_sql, (*ts_range, PAGE)).fetchall()
+                results.append({
+                    "rows": rows, "days": days, "shape": shape,
+                    "text_ms": median_ms(lambda: conn.execute(text_sql, (*text_range, PAGE)).fetchall(), iterations),
+                    "ts_ms": median_ms(lambda: conn.execute(ts_sql, (*ts_range, PAGE)).fetchall(), iterations),
+                    "same_rows": len(text_rows) == len(ts_rows),
+                })
+            results.append({
+                "rows": rows, "days": days, "shape": "get_articles", "text_ms": None,
+                "ts_ms": median_ms(lambda: database.get_articles(from_ts=ts_range[0], to_ts=ts_range[1]), iterations),
+                "same_rows": True,
+            })
+        database.close_read_pool()
+        conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'days':>4} {'shape':<14} {'text ms':>9} {'int ms':>9} {'speedup':>8}")
+    for rows in args.rows:
+        for result in bench(rows, args.iterations):
+            text = f"{result['text_ms']:9.3f}" if result["text_ms"] is not None else f"{'-':>9}"
+            speedup = f"{result['text_ms'] / result['ts_ms']:7.1f}x" if result["text_ms"] is not None else f"{'':>8}"
+            mismatch = "" if result["same_rows"] else "  (row counts differ)"
+            print(f"{result['rows']:>10,} {result['days']:>4} {result['shape']:<14} {text} {result['ts_ms']:9.3f} {speedup}{mismatch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Related-articles index: build, incremental update, lookup and memory.
+
+For each --rows size, copies the synthetic corpus (see corpus.py) and:
+
+- builds the index from scratch and reports the time and bytes per article;
+- stores --new more articles, as one scrape would, and times update(), with
+  the peak memory numpy allocated while it ran;
+- times lookups, both the index alone (RelatedIndex.related) and with the
+  neighbours' rows read from the database (related.related_articles);
+- checks the stored neighbour lists of --sample random articles against a
+  brute-force product over every vector. Incremental updates should give the
+  same lists as comparing everything (up to float16 ties).
+
+The synthetic text is random words, so similarities are low and the
+MIN_SCORE cut would hide most neighbours; lookups are timed with it off.
+
+Usage (from the backend directory):
+    python benchmarks/related_bench.py
+    python benchmarks/related_bench.py --rows 10000 100000 --new 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import related
+from corpus import corpus_db, seed
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def time_calls(fn, args_list) -> list:
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def neighbour_overlap(index: related.RelatedIndex, sample: int, rng: np.random.Generator) -> float:
+    """Mean overlap between stored neighbour lists and a brute-force top-NEIGHBORS."""
+    state = index._read_state()
+    rows = state["rows"]
+    vectors = np.memmap(index._path("vectors.f16"), dtype=np.float16, mode="r", shape=(rows, related.DIMENSIONS))
+    neighbors = np.memmap(index._path("neighbors.i32"), dtype=np.int32, mode="r", shape=(rows, related.NEIGHBORS))
+    picked = rng.choice(rows, size=min(sample, rows), replace=False)
+    queries = np.asarray(vectors[picked], dtype=np.float32)
+    similarity = np.concatenate([
+        np.asarray(vectors[start:start + related.CHUNK_ROWS], dtype=np.float32) @ queries.T
+        for start in range(0, rows, related.CHUNK_ROWS)
+    ]).T
+    similarity[np.arange(len(picked)), picked] = -np.inf
+    expected = np.argpartition(-similarity, related.NEIGHBORS - 1, axis=1)[:, :related.NEIGHBORS]
+    return float(np.mean([len(set(e) & set(neighbors[row])) / related.NEIGHBORS for e, row in zip(expected, picked)]))
+
+
+def bench(rows: int, new: int, lookups: int, sample: int):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "related.db")
+        shutil.copyfile(corpus_db(rows), database.DB_FILE)
+        database.close_read_pool()
+        index = related.RelatedIndex()
+
+        started = time.perf_counter()
+        index.rebuild()
+        build_s = time.perf_counter() - started
+        status = index.status()
+
+        seed(new, first_id=rows, corpus_seed=1)
+        tracemalloc.start()
+        started = time.perf_counter()
+        added = index.update()
+        update_ms = (time.perf_counter() - started) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ids = np.memmap(index._path("ids.i64"), dtype=np.int64, mode="r")
+        picks = [(int(ids[i]), related.DEFAULT_LIMIT) for i in rng.integers(0, len(ids), lookups)]
+        min_score, related.MIN_SCORE = related.MIN_SCORE, -1.0
+        try:
+            index_ms = time_calls(index.related, picks)
+            related.related_index_instance = index
+            full_ms = time_calls(lambda article_id, limit: related.related_articles(article_id, limit), picks)
+        finally:
+            related.MIN_SCORE = min_score
+        overlap = neighbour_overlap(index, sample, rng)
+        database.close_read_pool()
+
+    print(f"{rows:,} rows: built in {build_s:.1f}s, {status['bytes'] / status['rows']:.0f} bytes per article "
+          f"({status['bytes'] / 1e6:.1f} MB)")
+    print(f"  update with {added} new articles: {update_ms:.0f} ms, peak numpy memory {peak / 1e6:.1f} MB")
+    print(f"  lookup, index only: p50 {statistics.median(index_ms) * 1000:.0f} us, p99 {percentile(index_ms, 0.99) * 1000:.0f} us")
+    print(f"  lookup with article rows: p50 {statistics.median(full_ms):.3f} ms, p99 {percentile(full_ms, 0.99):.3f} ms")
+    print(f"  stored neighbours vs brute force: {overlap:.1%} overlap over {sample} articles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--new", type=int, default=100, help="articles added by the simulated scrape")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--sample", type=int, default=200, help="articles whose neighbours are checked")
+    args = parser.parse_args()
+    for rows in args.rows:
+        bench(rows, args.new, args.lookups, args.sample)
+
+
+if __name__ == "__main__":
+    main()
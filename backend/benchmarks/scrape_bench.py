@@ -0,0 +1,76 @@
+"""
+Offline scrape benchmark: runs run_full_scrape against the local stub server.
+
+Every page is served with an artificial network latency, so the wall time shows
+how well the fetcher overlaps requests; compare against --concurrency 1 for
+the old one-request-at-a-time behaviour. Use --failure-rate to exercise retries.
+With --runs 2 the second scrape shows the cost of a re-scrape when nothing has
+changed (conditional GETs, or link-set comparison with --no-etags).
+
+Usage (from the backend directory):
+    python benchmarks/scrape_bench.py --latency 0.2 --links 20
+    python benchmarks/scrape_bench.py --latency 0.2 --links 20 --concurrency 1
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import fetcher
+import scraper
+from stub_cnn import StubCNNServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the stub waits before each response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--links", type=int, default=40, help="article links per listing page")
+    parser.add_argument("--concurrency", type=int, default=fetcher.MAX_CONCURRENCY, help="global and per-host request limit")
+    parser.add_argument("--rate", type=float, default=fetcher.RATE_PER_HOST, help="requests per second allowed per host")
+    parser.add_argument("--runs", type=int, default=1, help="scrapes to run back to back")
+    parser.add_argument("--no-etags", action="store_true", help="stub sends no validators on listing pages")
+    args = parser.parse_args()
+
+    fetcher.fetcher_instance = fetcher.Fetcher(
+        max_concurrency=args.concurrency,
+        max_per_host=args.concurrency,
+        rate_per_host=args.rate,
+        burst_per_host=max(1, int(args.rate)),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubCNNServer(latency=args.latency, failure_rate=args.failure_rate, links_per_page=args.links,
+                          etags=not args.no_etags) as server:
+        database.DB_FILE = os.path.join(tmp, "scrape.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_db()
+        scraper.CNN_BASE_URL = server.base_url
+
+        for run in range(1, args.runs + 1):
+            requests_before = server.requests
+            log = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(log):
+                scraper.run_full_scrape(use_ai_categorization=False)
+            elapsed = time.perf_counter() - started
+
+            conn = database.get_db_connection()
+            stored = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            conn.close()
+            lines = log.getvalue().splitlines()
+            stats_line = next((line for line in lines if line.startswith("Fetch stats")), "")
+            pages_line = next((line.strip() for line in lines if line.strip().endswith("failed")), "")
+            print(f"run {run}: scrape took {elapsed:.2f}s, {server.requests - requests_before} HTTP requests, "
+                  f"{stored} articles stored")
+            print(f"  pages: {pages_line}")
+            print(f"  {stats_line}")
+
+if __name__ == "__main__":
+    main()
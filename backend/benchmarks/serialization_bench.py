@@ -0,0 +1,121 @@
+"""
+Bytes-on-wire and CPU per request for the list endpoints' response paths.
+
+Requests /api/news pages of each --rows size against a synthetic corpus
+(see corpus.py) through an in-process ASGI client, and reports the bytes
+sent and the process CPU time per request for:
+
+- legacy: the previous path, response_model=List[Dict[str, Any]] validation
+  and the stock JSON encoder, all fields, uncompressed
+- full: the orjson path with all fields
+- cards: fields=title,url,imageUrl,source,publishedAt, as the homepage uses
+- each of those again with gzip and br (when Brotli is installed)
+
+"uncached" clears the response cache before every request, so it includes
+the query, serialization and compression; "cached" is a warm cache hit.
+
+Usage (from the backend directory):
+    python benchmarks/serialization_bench.py
+    python benchmarks/serialization_bench.py --rows 100 1000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from compression import ENCODINGS
+from corpus import corpus_db
+
+CARD_FIELDS = "title,url,imageUrl,source,publishedAt"
+
+
+def legacy_app():
+    """The list endpoint as it was before the orjson path and fields= projection."""
+    from fastapi import FastAPI
+    from starlette.concurrency import run_in_threadpool
+
+    app = FastAPI()
+
+    @app.get("/api/news", response_model=List[Dict[str, Any]])
+    async def get_all_news(limit: int = 100):
+        page = await run_in_threadpool(database.get_articles, limit=limit)
+        return page["articles"]
+
+    return app
+
+
+async def measure(client, path: str, encoding: str, requests: int, clear_cache) -> Dict[str, float]:
+    headers = {"Accept-Encoding": encoding}
+    sizes = []
+    for _ in range(3):
+        clear_cache()
+        await client.get(path, headers=headers)
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        clear_cache()
+        response = await client.get(path, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} -> {response.status_code}: {response.text}")
+        sizes.append(response.num_bytes_downloaded)
+    cpu, wall = time.process_time() - cpu_started, time.perf_counter() - wall_started
+    return {
+        "bytes": sizes[-1],
+        "cpu_ms": cpu / requests * 1000,
+        "wall_ms": wall / requests * 1000,
+        "encoding": response.headers.get("content-encoding", "identity"),
+    }
+
+
+async def run(rows_list: List[int], requests: int):
+    import httpx
+    import main
+
+    apps = {"legacy": legacy_app(), "main": main.app}
+    clients = {name: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+               for name, app in apps.items()}
+    print(f"{'case':<34} {'encoding':>9} {'bytes':>10} {'vs legacy':>10} {'cpu/req':>10} {'vs legacy':>10}")
+    try:
+        for rows in rows_list:
+            cases = [("legacy", "legacy", f"/api/news?limit={rows}", "identity", "uncached")]
+            for name, fields in (("full", ""), ("cards", f"&fields={CARD_FIELDS}")):
+                path = f"/api/news?limit={rows}{fields}"
+                for encoding in ("identity",) + tuple(reversed(ENCODINGS)):
+                    cases.append(("main", name, path, encoding, "uncached"))
+                cases.append(("main", name, path, ENCODINGS[0], "cached"))
+
+            baseline = None
+            for app_name, name, path, encoding, mode in cases:
+                clear = main.response_cache.clear if mode == "uncached" else (lambda: None)
+                result = await measure(clients[app_name], path, encoding, requests, clear)
+                baseline = baseline or result
+                label = f"{rows} rows {name} ({mode})"
+                print(f"{label:<34} {result['encoding']:>9} {result['bytes']:>10,} "
+                      f"{result['bytes'] / baseline['bytes']:>9.1%} {result['cpu_ms']:>8.3f}ms "
+                      f"{result['cpu_ms'] / baseline['cpu_ms']:>9.1%}")
+            print()
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000], help="page sizes to request")
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per case")
+    parser.add_argument("--corpus", type=int, default=10_000, help="synthetic corpus size")
+    args = parser.parse_args()
+
+    database.DB_FILE = corpus_db(args.corpus)
+    try:
+        asyncio.run(run(args.rows, args.requests))
+    finally:
+        database.close_read_pool()
+
+
+if __name__ == "__main__":
+    main()
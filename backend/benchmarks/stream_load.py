@@ -0,0 +1,176 @@
+"""
+Load test: many idle /api/stream connections, then fan-out latency.
+
+Starts the API under uvicorn in a child process on a throwaway database,
+opens --clients Server-Sent Events connections to it, and reports the
+server's resident memory per open connection. It then has the child insert
+--batches batches of 20 articles, the way a scrape commits them, and reports
+how long articles took to reach a sample of the clients and whether every
+client got every article.
+
+Usage (from the backend directory):
+    python benchmarks/stream_load.py --clients 2000 --batches 10 --write-interval 0.5
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from corpus import make_article, seed
+
+BATCH = 20
+# Every n-th client parses events and records latency; the rest just count them
+TIMED_EVERY = 50
+
+
+def serve(db_file: str, port: int, batches: int, interval: float):
+    """Child process: the API without the scraper, plus a writer that starts on SIGUSR1."""
+    import uvicorn
+
+    database.DB_FILE = db_file
+    import main
+    from broadcaster import get_broadcaster
+
+    go = threading.Event()
+
+    def writer():
+        go.wait()
+        conn = database.get_db_connection()
+        first = database.get_latest_article_id() + 1
+        for batch in range(batches):
+            now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            articles = [{**make_article(i), 'publishedAt': now} for i in range(first + batch * BATCH, first + (batch + 1) * BATCH)]
+            database.add_article_batch(articles, conn)
+            time.sleep(interval)
+        conn.close()
+
+    async def run():
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, go.set)
+        await get_broadcaster().start()
+        server = uvicorn.Server(uvicorn.Config(main.app, port=port, lifespan="off", log_level="warning",
+                                               backlog=4096, timeout_graceful_shutdown=1))
+        await server.serve()
+
+    threading.Thread(target=writer, daemon=True).start()
+    asyncio.run(run())
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def client(port: int, connected: asyncio.Event, latencies: list, counts: list, index: int, timed: bool):
+    """One stream. Counts article events; if `timed`, also records how long each took to arrive."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /api/stream HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+    await writer.drain()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    connected.set()
+    try:
+        if not timed:
+            # Most clients only count events, so the client side stays cheaper than the server
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                counts[index] += data.count(b"event: article")
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: "):
+                article = json.loads(line[6:])
+                sent = datetime.datetime.fromisoformat(article['publishedAt'])
+                latencies.append((datetime.datetime.now(datetime.timezone.utc) - sent).total_seconds())
+                counts[index] += 1
+    finally:
+        writer.close()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+async def drive(args, port: int, child: subprocess.Popen):
+    baseline = rss_kb(child.pid)
+    latencies, counts = [], [0] * args.clients
+    tasks = []
+    for index in range(args.clients):
+        connected = asyncio.Event()
+        tasks.append(asyncio.create_task(client(port, connected, latencies, counts, index, index % TIMED_EVERY == 0)))
+        await connected.wait()
+    await asyncio.sleep(1)
+    loaded = rss_kb(child.pid)
+    print(f"server RSS {baseline / 1024:.1f} MB idle, {loaded / 1024:.1f} MB with {args.clients} streams "
+          f"({(loaded - baseline) / args.clients:.1f} KB per connection)")
+
+    expected = args.batches * BATCH
+    child.send_signal(signal.SIGUSR1)
+    deadline = time.time() + args.batches * args.write_interval + 30
+    while min(counts) < expected and time.time() < deadline:
+        await asyncio.sleep(0.2)
+    complete = sum(1 for count in counts if count == expected)
+    print(f"{complete}/{args.clients} clients received all {expected} articles")
+    if latencies:
+        print(f"insert-to-client latency p50={percentile(latencies, 0.50):.1f}ms "
+              f"p99={percentile(latencies, 0.99):.1f}ms max={max(latencies) * 1000:.1f}ms")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--write-interval", type=float, default=0.5, help="seconds between batches of 20 articles")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--serve", nargs=2, metavar=("DB", "PORT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]), args.batches, args.write_interval)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "stream.db")
+        database.init_db()
+        seed(args.rows)
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", database.DB_FILE, str(port),
+                                  "--batches", str(args.batches), "--write-interval", str(args.write_interval)])
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            asyncio.run(drive(args, port, child))
+        finally:
+            child.terminate()
+            child.wait(10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+A local stub of the CNN site for exercising the scraper offline.
+
+Serves fixtures.listing_page for the homepage and every section in
+scraper.CATEGORIES, and fixtures.article_page for article URLs. Latency and
+transient failures can be injected to exercise the fetcher's concurrency,
+rate limiting and retries. With `etags` on, listing pages carry an ETag and
+answer a matching If-None-Match with 304; with it off, the scraper has to fall
+back to comparing link sets.
+
+    with StubCNNServer(latency=0.05) as server:
+        scraper.CNN_BASE_URL = server.base_url
+        scraper.run_full_scrape()
+"""
+import random
+from collections import Counter
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import article_page, listing_page
+
+
+class StubCNNServer:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, links_per_page: int = 60, seed: int = 0,
+                 etags: bool = True):
+        self.latency = latency
+        self.etags = etags
+        self.failure_rate = failure_rate
+        self.links_per_page = links_per_page
+        self.seed = seed
+        self.requests = 0
+        # Requests per path
+        self.paths = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @lru_cache(maxsize=4096)
+    def page_for(self, path: str):
+        """Returns (status, html) for a request path."""
+        if path in ("", "/"):
+            return 200, listing_page("top-stories", self.links_per_page, self.seed)
+        if path.endswith("/index.html"):
+            # Every seventh article has no lead image, so the scraper skips it
+            return 200, article_page(path, has_image=zlib.crc32(path.encode()) % 7 != 0)
+        return 200, listing_page(path.strip("/"), self.links_per_page, self.seed)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    stub.paths[self.path] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.failure_rate and random.random() < stub.failure_rate:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                status, html = stub.page_for(self.path)
+                body = html.encode()
+                etag = f'"{zlib.crc32(body):08x}"'
+                if stub.etags and not self.path.endswith("/index.html"):
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.end_headers()
+                        return
+                self.send_response(status)
+                if stub.etags and not self.path.endswith("/index.html"):
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,123 @@
+"""
+A local OpenAI-compatible stub for exercising AI categorization offline.
+
+Implements GET /v1/models and POST /v1/chat/completions. Single-article
+prompts get a bare category name back; batch prompts (response_format
+json_object) get {"categories": [{"id": n, "category": ...}]} with one entry
+per numbered article. The category is derived from a checksum of the title,
+so answers are stable across runs. Latency and 429 responses can be injected
+to exercise the worker pool, retries and the token budget.
+
+    with StubOpenAIServer(latency=0.2) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        import ai_categorizer
+"""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = [
+    "world", "politics", "business", "sports", "entertainment", "technology",
+    "style", "travel", "science", "climate", "weather", "health",
+    "opinion", "general", "crime", "education", "environment"
+]
+
+TITLE_LINE = re.compile(r"^\s*(\d+)\. Title: (.*)$", re.MULTILINE)
+SINGLE_TITLE = re.compile(r"^\s*Title: (.*)$", re.MULTILINE)
+
+
+def category_for(title: str) -> str:
+    return CATEGORIES[zlib.crc32(title.encode()) % len(CATEGORIES)]
+
+
+class StubOpenAIServer:
+    def __init__(self, latency: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 0.1):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def complete(self, body: dict) -> str:
+        prompt = body["messages"][-1]["content"]
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            entries = [{"id": int(n), "category": category_for(title.strip())} for n, title in TITLE_LINE.findall(prompt)]
+            return json.dumps({"categories": entries})
+        match = SINGLE_TITLE.search(prompt)
+        return category_for(match.group(1).strip() if match else prompt)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model", "created": 0, "owned_by": "stub"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.rate_limit_rate and random.random() < stub.rate_limit_rate:
+                    with stub._lock:
+                        stub.rate_limited += 1
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                                    {"Retry-After": str(stub.retry_after)})
+                    return
+                content = stub.complete(body)
+                prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+                with stub._lock:
+                    stub.prompt_tokens += prompt_tokens
+                self._send_json(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub-model"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4},
+                })
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
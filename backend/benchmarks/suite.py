@@ -0,0 +1,305 @@
+"""
+Offline benchmark suite for the project's hot paths, with baseline comparison.
+
+Groups (select with --groups):
+- db: database.get_articles, get_articles_by_category, get_feed, search_articles
+  stats.get_stats and the near-duplicate lookup
+  against synthetic corpora of each --sizes row count (see corpus.py; built
+  corpora are cached between runs).
+- parse: listing and article extraction on the fixture HTML, plus
+  scrape_cnn_page and get_article_details end to end against the local stub
+  server (no injected latency).
+- api: FastAPI endpoint latency (response cache cleared before every request,
+  and warm for the /cached case) and throughput at --concurrency, through an
+  in-process ASGI client over the smallest corpus.
+
+Results are written as JSON (--output). With --baseline, each result's median
+is compared against the stored run and the suite exits non-zero if any is
+more than --tolerance slower. --save-baseline writes this run as the new
+baseline. Baselines are machine-specific; record one on the machine that
+runs the comparison.
+
+Usage (from the backend directory):
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --output results.json
+    python benchmarks/suite.py --groups db --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import scraper
+import stats
+from corpus import CORPUS_END, corpus_db
+from fixtures import article_page, listing_page
+
+# Differences below this are noise whatever the ratio
+MIN_REGRESSION_MS = 0.05
+# The homepage sections
+FEED_CATEGORIES = ["world", "politics", "business", "sports", "entertainment", "technology"]
+
+
+def summarize(samples: List[float], batch: int = 1) -> Dict[str, float]:
+    """Latency statistics in milliseconds for per-call timings in seconds."""
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    return {
+        "median_ms": round(median * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 4),
+        "ops_per_s": round(batch / median, 1) if median else None,
+        "iterations": len(ordered),
+    }
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# --- Database ---
+
+def bench_db(sizes: List[int], iterations: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    # The last week of the corpus, through the end of its final day, as the date filters take it
+    week_ago = int((CORPUS_END - datetime.timedelta(days=7)).timestamp())
+    today = int((CORPUS_END + datetime.timedelta(days=1)).timestamp())
+    for rows in sizes:
+        database.DB_FILE = corpus_db(rows)
+        second_page = database.get_articles()["next_cursor"]
+        stored_headline = database.get_articles(limit=1)["articles"][0]["title"]
+        write_conn = database.get_db_connection()
+        cases = {
+            "get_articles": lambda: database.get_articles(),
+            "get_articles/page2": lambda: database.get_articles(cursor=second_page),
+            "get_articles/oldest": lambda: database.get_articles(sort_by="publishedAt_asc"),
+            "get_articles/title": lambda: database.get_articles(sort_by="relevancy"),
+            "get_articles/last_week": lambda: database.get_articles(from_ts=week_ago, to_ts=today),
+            "get_articles_by_category": lambda: database.get_articles_by_category("politics"),
+            "get_articles_by_category/last_week": lambda: database.get_articles_by_category("politics", from_ts=week_ago, to_ts=today),
+            "get_feed": lambda: database.get_feed(FEED_CATEGORIES),
+            "get_stats": lambda: stats.get_stats(today=CORPUS_END.date()),
+            "find_near_duplicate/hit": lambda: database.find_near_duplicate("Analysis: " + stored_headline, write_conn),
+            "find_near_duplicate/miss": lambda: database.find_near_duplicate("Museum rescue storm energy film league vote", write_conn),
+            "search_articles/common": lambda: database.search_articles("election"),
+            "search_articles/relevancy": lambda: database.search_articles("election market", sort_by="relevancy"),
+            "search_articles/prefix": lambda: database.search_articles("elec*"),
+            "search_articles/rare": lambda: database.search_articles("museum rescue"),
+        }
+        for name, fn in cases.items():
+            results[f"db/{rows}/{name}"] = measure(fn, iterations)
+            print(f"  db/{rows}/{name}: {results[f'db/{rows}/{name}']['median_ms']:.3f}ms")
+        write_conn.close()
+        database.close_read_pool()
+    return results
+
+
+# --- Parsing ---
+
+def bench_parse(iterations: int) -> Dict[str, Dict[str, float]]:
+    from extraction import extract_listing_links
+    from fetcher import Fetcher
+    import fetcher
+    from stub_cnn import StubCNNServer
+
+    results = {}
+    listing = listing_page("world", 60).encode()
+    article = article_page("/2025/06/20/world/story-world-1/index.html").encode()
+    results["parse/extract_listing_links"] = measure(lambda: extract_listing_links(listing), iterations)
+    results["parse/parse_article_details"] = measure(lambda: scraper.parse_article_details(article), iterations)
+
+    previous_fetcher, previous_base = fetcher.fetcher_instance, scraper.CNN_BASE_URL
+    with tempfile.TemporaryDirectory() as tmp, StubCNNServer(links_per_page=20) as server, \
+            contextlib.redirect_stdout(io.StringIO()):
+        database.DB_FILE = os.path.join(tmp, "parse.db")
+        database.init_db()
+        # No rate limit: this measures the scraper's own cost, not the politeness delay
+        fetcher.fetcher_instance = Fetcher(rate_per_host=1e6, burst_per_host=1000)
+        scraper.CNN_BASE_URL = server.base_url
+        conn = database.get_db_connection()
+        try:
+            # Nothing is stored, so every call fetches and parses the listing and all of its article pages
+            results["parse/scrape_cnn_page"] = measure(
+                lambda: scraper.scrape_cnn_page(server.base_url + "/world", "world", conn), max(5, iterations // 10))
+            detail_url = server.base_url + "/2025/06/20/world/story-world-1/index.html"
+            results["parse/get_article_details"] = measure(lambda: scraper.get_article_details(detail_url), iterations)
+        finally:
+            conn.close()
+            fetcher.fetcher_instance.close()
+            fetcher.fetcher_instance, scraper.CNN_BASE_URL = previous_fetcher, previous_base
+    for name in results:
+        print(f"  {name}: {results[name]['median_ms']:.3f}ms")
+    return results
+
+
+# --- API ---
+
+API_PATHS = {
+    "news": "/api/news",
+    "news/title": "/api/news?sort_by=relevancy",
+    "news/category": "/api/news/category/politics",
+    "feed": "/api/feed",
+    "search": "/api/search?q=election%20market",
+    "categories": "/api/categories",
+}
+
+
+async def _api(rows: int, iterations: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+    import main
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def get(path: str):
+            response = await client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} -> {response.status_code}: {response.text}")
+
+        for name, path in API_PATHS.items():
+            samples = []
+            for i in range(iterations + 3):
+                main.response_cache.clear()
+                started = time.perf_counter()
+                await get(path)
+                if i >= 3:
+                    samples.append(time.perf_counter() - started)
+            results[f"api/{rows}/{name}"] = summarize(samples)
+
+        samples = []
+        for i in range(iterations + 3):
+            started = time.perf_counter()
+            await get(API_PATHS["news"])
+            if i >= 3:
+                samples.append(time.perf_counter() - started)
+        results[f"api/{rows}/news/cached"] = summarize(samples)
+
+        # Throughput: uncached requests over every path, `concurrency` at a time
+        paths = list(API_PATHS.values())
+        total = iterations * len(paths)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int):
+            async with semaphore:
+                main.response_cache.clear()
+                await get(paths[i % len(paths)])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+        results[f"api/{rows}/throughput"] = {
+            "median_ms": round(elapsed / total * 1000, 4),
+            "ops_per_s": round(total / elapsed, 1),
+            "iterations": total,
+            "concurrency": concurrency,
+        }
+    return results
+
+
+def bench_api(rows: int, iterations: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    database.DB_FILE = corpus_db(rows)
+    try:
+        results = asyncio.run(_api(rows, iterations, concurrency))
+    finally:
+        database.close_read_pool()
+    for name in results:
+        print(f"  {name}: {results[name]['median_ms']:.3f}ms ({results[name]['ops_per_s']} ops/s)")
+    return results
+
+
+# --- Baselines ---
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Prints current vs baseline medians and returns the names of results that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<58} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or not before.get("median_ms"):
+            continue
+        old, new = before["median_ms"], result["median_ms"]
+        change = new / old - 1
+        flag = ""
+        if change > tolerance and new - old > MIN_REGRESSION_MS:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<58} {old:>9.3f}ms {new:>9.3f}ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": database.sqlite3.sqlite_version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", nargs="+", choices=["db", "parse", "api"], default=["db", "parse", "api"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="corpus sizes for the db group")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per benchmark")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight for the api throughput test")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against the results stored in this file")
+    parser.add_argument("--save-baseline", help="write this run's results to this file as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a result counts as regressed")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    if "db" in args.groups:
+        print("db:")
+        results.update(bench_db(args.sizes, args.iterations))
+    if "parse" in args.groups:
+        print("parse:")
+        results.update(bench_parse(args.iterations))
+    if "api" in args.groups:
+        print("api:")
+        results.update(bench_api(min(args.sizes), args.iterations, args.concurrency))
+
+    report = {"meta": {**metadata(), "args": vars(args)}, "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} benchmarks more than {args.tolerance:.0%} slower than the baseline")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
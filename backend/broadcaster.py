@@ -0,0 +1,209 @@
+"""
+Live article stream behind the /api/stream Server-Sent Events endpoint.
+
+One ArticleBroadcaster per process fans newly stored articles out to every
+connected client. The scraper's writes bump the data generation (see
+database.add_generation_listener); the broadcaster then reads the articles
+inserted since the last one it saw, encodes each event once, and puts it on
+the queue of every client whose category filter matches.
+
+Each client's queue holds at most CLIENT_QUEUE_SIZE events. A client that
+falls that far behind is dropped rather than allowed to buffer without bound.
+Event ids are article ids, which only ever grow, so when the client's
+EventSource reconnects with Last-Event-ID, it is sent what it missed straight
+from the database. Dropping a slow client therefore loses nothing. An idle
+client costs a coroutine and an empty queue; one task sends heartbeat comments
+to all of them every HEARTBEAT_INTERVAL seconds, so proxies keep the
+connections open.
+"""
+import asyncio
+from typing import AsyncIterator, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+import database
+from metrics import Counter
+
+# Seconds between heartbeat comments on every open stream
+HEARTBEAT_INTERVAL = 15.0
+# Events buffered per client before it counts as too slow and is disconnected
+CLIENT_QUEUE_SIZE = 256
+# Most missed articles replayed on reconnect; past that, the client is told to reload
+MAX_REPLAY = 500
+# Articles read per query when catching up after a write
+FETCH_LIMIT = 1000
+# Reconnection delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 5000
+
+HEARTBEAT = b": heartbeat\n\n"
+# Queue item that ends a client's stream
+_CLOSE = (None, b"")
+
+STREAM_DROPPED_CLIENTS = Counter("stream_dropped_clients_total", "Live stream clients disconnected for falling behind.")
+STREAM_EVENTS = Counter("stream_events_total", "Article events queued to live stream clients.")
+
+
+def encode_event(article: dict) -> bytes:
+    """An article as one SSE message whose id is the article id."""
+    return b"id: %d\nevent: article\ndata: %s\n\n" % (article["id"], orjson.dumps(article))
+
+
+class _Client:
+    __slots__ = ("categories", "queue")
+
+    def __init__(self, categories: Optional[Set[str]]):
+        self.categories = categories
+        self.queue: "asyncio.Queue[Tuple[Optional[int], bytes]]" = asyncio.Queue(CLIENT_QUEUE_SIZE)
+
+
+class ArticleBroadcaster:
+    def __init__(self):
+        self._clients: Set[_Client] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # Every article up to this id has been handed to the clients connected at the time
+        self._last_id = 0
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Starts fanning out new articles. Call from the event loop that serves the streams."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._last_id = await run_in_threadpool(database.get_latest_article_id)
+        self._tasks = [
+            asyncio.create_task(self._fan_out_forever(), name="stream-fan-out"),
+            asyncio.create_task(self._heartbeat_forever(), name="stream-heartbeat"),
+        ]
+        database.add_generation_listener(self.notify)
+
+    async def stop(self):
+        """Stops fanning out and ends every open stream."""
+        database.remove_generation_listener(self.notify)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for client in list(self._clients):
+            self._close(client)
+
+    def notify(self):
+        """Signals that articles may have been stored. Safe to call from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    # --- Fan-out ---
+
+    async def _fan_out_forever(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                while True:
+                    articles = await run_in_threadpool(database.get_articles_after, self._last_id, None, FETCH_LIMIT)
+                    if not articles:
+                        break
+                    # No await between moving _last_id and queueing, so a client
+                    # registered at any await point gets exactly the ids above it
+                    self._last_id = articles[-1]["id"]
+                    self._publish(articles)
+                    if len(articles) < FETCH_LIMIT:
+                        break
+            except Exception as e:
+                print(f"Live stream fan-out failed: {e}")
+
+    def _publish(self, articles: List[dict]):
+        if not self._clients:
+            return
+        events = [(article["id"], article["category"], encode_event(article)) for article in articles]
+        for client in list(self._clients):
+            for article_id, category, event in events:
+                if client.categories and category not in client.categories:
+                    continue
+                if not self._offer(client, (article_id, event)):
+                    break
+                STREAM_EVENTS.inc()
+
+    async def _heartbeat_forever(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            for client in list(self._clients):
+                self._offer(client, (None, HEARTBEAT))
+
+    def _offer(self, client: _Client, item: Tuple[Optional[int], bytes]) -> bool:
+        """Queues an item for a client, dropping the client if its queue is full."""
+        try:
+            client.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            STREAM_DROPPED_CLIENTS.inc()
+            self._close(client)
+            return False
+
+    def _close(self, client: _Client):
+        """Unregisters a client and ends its stream after whatever it is sending now."""
+        self._clients.discard(client)
+        # Make room for the close marker; the client resumes from its Last-Event-ID anyway
+        while not client.queue.empty():
+            client.queue.get_nowait()
+        client.queue.put_nowait(_CLOSE)
+
+    # --- Streams ---
+
+    async def stream(self, categories: Optional[Sequence[str]] = None,
+                     last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Yields the SSE byte stream for one client: first the articles stored
+        after `last_event_id` (if given), then every new article as it is
+        stored, interleaved with heartbeats. Ends when the client is dropped or
+        the broadcaster stops.
+        """
+        client = _Client(set(categories) if categories else None)
+        self._clients.add(client)
+        # Everything above this id reaches the client's queue; replay covers the rest
+        live_from = self._last_id
+        try:
+            yield b"retry: %d\n\n" % RETRY_MS
+            if last_event_id is not None and last_event_id < live_from:
+                missed = await run_in_threadpool(
+                    database.get_articles_after, last_event_id, categories, MAX_REPLAY + 1, live_from
+                )
+                if len(missed) > MAX_REPLAY:
+                    # Too far behind to replay: move the client's position up and let it reload its lists
+                    yield b"id: %d\nevent: reset\ndata: {}\n\n" % live_from
+                else:
+                    for article in missed:
+                        yield encode_event(article)
+            while True:
+                # Send everything queued as one chunk: a batch of articles costs one write, not one per article
+                items = [await client.queue.get()]
+                while not client.queue.empty():
+                    items.append(client.queue.get_nowait())
+                chunk = b"".join(
+                    event for article_id, event in items
+                    if article_id is None or last_event_id is None or article_id > last_event_id
+                )
+                if chunk:
+                    yield chunk
+                if items[-1] is _CLOSE:
+                    return
+        finally:
+            self._clients.discard(client)
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+
+# Global instance
+broadcaster_instance = None
+
+def get_broadcaster() -> ArticleBroadcaster:
+    """Get the global article broadcaster."""
+    global broadcaster_instance
+    if broadcaster_instance is None:
+        broadcaster_instance = ArticleBroadcaster()
+    return broadcaster_instance
@@ -0,0 +1,168 @@
+"""
+Persistent cache of AI categorization answers.
+
+Answers are stored in the categorization_cache table of news.db, keyed by a
+hash of the model, the prompt version, the kind of answer ('category' or
+'suggestions') and the normalized title and description, so a re-syndicated
+headline or a re-run scrape is answered without calling the API. Changing the
+model or bumping a prompt version simply stops matching the old entries,
+which then age out. An in-memory LRU sits in front of the table.
+
+Entries expire after CACHE_TTL seconds, and the table is trimmed to
+CACHE_MAX_ROWS (oldest first) whenever new answers are written.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import database
+
+CACHE_TTL = float(os.getenv("AI_CACHE_TTL_DAYS", "30")) * 86400
+CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "100000"))
+MEMORY_ENTRIES = 4096
+LOOKUP_CHUNK_SIZE = 500
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case, width, punctuation and whitespace differences don't change the answer, so they don't change the key."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(model: str, prompt_version: int, kind: str, title: str, description: Optional[str] = None) -> str:
+    content = "\x1f".join([model, str(prompt_version), kind, normalize_text(title), normalize_text(description)])
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class CategorizationCache:
+    def __init__(self, ttl: float = CACHE_TTL, max_rows: int = CACHE_MAX_ROWS, memory_entries: int = MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        with self._lock:
+            self._memory[key] = (value, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Returns {key: value} for every key with an unexpired answer, checking memory before the database."""
+        now = time.time()
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get(key)
+                if entry and now - entry[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[0]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+        if missing:
+            conn = database.get_db_connection()
+            try:
+                for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+                    chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+                    rows = conn.execute(
+                        f"SELECT key, value, created_at FROM categorization_cache "
+                        f"WHERE key IN ({', '.join('?' * len(chunk))}) AND created_at > ?",
+                        (*chunk, now - self.ttl),
+                    ).fetchall()
+                    for row in rows:
+                        value = json.loads(row["value"])
+                        found[row["key"]] = value
+                        self._remember(row["key"], value, row["created_at"])
+            finally:
+                conn.close()
+
+        with self._lock:
+            db_hits = sum(1 for key in missing if key in found)
+            self.db_hits += db_hits
+            self.misses += len(missing) - db_hits
+        return found
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: Dict[str, Any]):
+        """Stores answers in memory and in the database, then applies TTL and size eviction."""
+        if not entries:
+            return
+        now = time.time()
+        for key, value in entries.items():
+            self._remember(key, value, now)
+        conn = database.get_db_connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO categorization_cache (key, value, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in entries.items()],
+            )
+            self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def put(self, key: str, value: Any):
+        self.put_many({key: value})
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM categorization_cache WHERE created_at <= ?", (now - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM categorization_cache").fetchone()[0] - self.max_rows
+        if excess > 0:
+            conn.execute('''
+                DELETE FROM categorization_cache WHERE key IN (
+                    SELECT key FROM categorization_cache ORDER BY created_at LIMIT ?
+                )
+            ''', (excess,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = database.get_db_connection()
+        try:
+            conn.execute("DELETE FROM categorization_cache")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            total = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+
+# Global instance
+categorization_cache_instance = None
+
+def get_categorization_cache() -> CategorizationCache:
+    """Get the global categorization cache instance."""
+    global categorization_cache_instance
+    if categorization_cache_instance is None:
+        categorization_cache_instance = CategorizationCache()
+    return categorization_cache_instance
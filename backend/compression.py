@@ -0,0 +1,68 @@
+"""
+Content-Encoding negotiation and compression for API responses.
+
+gzip is always available; br is offered when the optional Brotli package is
+installed. Compressed bodies are built once per cached response (see
+response_cache.CachedResponse.encoded), so the cost is paid per data
+generation rather than per request.
+"""
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are; the headers would eat the saving
+MIN_SIZE = 512
+# Most one-off pages (e.g. deep cursors) are compressed once and never reused, so
+# favour speed: these are about three times faster than gzip 6 / br 5 for ~10% more bytes
+GZIP_LEVEL = 4
+BROTLI_QUALITY = 4
+
+# Encodings we can produce, most preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Maps each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """
+    The encoding to use for a client's Accept-Encoding header, or None to send
+    the body uncompressed. Among codings with the highest q-value, ours are
+    preferred in ENCODINGS order; '*' stands for any coding not listed.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
@@ -1,35 +1,259 @@
+import base64
+import datetime
+import json
+import os
+import queue
+import re
 import sqlite3
-from typing import Dict, Any, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from metrics import Histogram, timed
+from migrations import epoch_seconds, run_migrations, url_hash
+from near_duplicates import THRESHOLD, headline_band_keys, jaccard, tokens
 
 DB_FILE = "news.db"
 
-def get_db_connection():
+# Number of read connections shared by the API worker threads
+READ_POOL_SIZE = 8
+# Seconds a request waits for a free read connection before giving up
+READ_POOL_TIMEOUT = 10.0
+# Per-connection cache of prepared statements, keyed by SQL text
+STATEMENT_CACHE_SIZE = 256
+
+# Applied to every connection. journal_mode=WAL is persistent and set once in init_db.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",  # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+)
+
+# BM25 ranking for search results; title matches count ten times as much as description matches
+SEARCH_RANK = "bm25(articles_fts, 10.0, 1.0)"
+
+# Columns returned by the API; internal bookkeeping columns such as url_hash stay out
+ARTICLE_COLUMNS = "id, title, url, source, category, imageUrl, description, publishedAt, ai_categorized"
+ARTICLE_FIELDS = tuple(ARTICLE_COLUMNS.split(', '))
+# Extra fields computed for search results
+SEARCH_FIELDS = ('score', 'snippet')
+# Bound parameters per IN (...) lookup, well under SQLite's variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+# Page size used when the client does not ask for one, and the largest it may ask for.
+# Clients choose `limit` in 1..MAX_PAGE_SIZE; main.py's Query bounds use these values.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Articles per category in /api/feed by default, and the most a client may ask for
+FEED_PAGE_SIZE = 10
+MAX_FEED_PAGE_SIZE = 50
+
+# Bumped when the keys inside cursors change meaning, so older cursors are rejected
+CURSOR_VERSION = 2
+
+# sort_by -> (keyset columns, descending). The id tiebreaker makes every key unique.
+# Date sorts use published_ts, publishedAt as Unix seconds (see migrations.epoch_seconds).
+LIST_SORTS = {
+    'publishedAt': (('published_ts', 'id'), True),
+    'publishedAt_asc': (('published_ts', 'id'), False),
+    'relevancy': (('title', 'id'), False),
+}
+
+# sort_by -> (keyset expressions, matching result fields, descending) for full-text search
+SEARCH_SORTS = {
+    'publishedAt': (('a.published_ts', 'a.id'), ('published_ts', 'id'), True),
+    'publishedAt_asc': (('a.published_ts', 'a.id'), ('published_ts', 'id'), False),
+    'relevancy': ((SEARCH_RANK, 'a.id'), ('score', 'id'), False),
+}
+
+# Time spent in each query function, exported at /metrics
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time spent in each database query function.", ["function"])
+
+# Bumped whenever articles are written, so response caches know their contents are stale
+_data_generation = 0
+_data_generation_lock = threading.Lock()
+# Called, on the writing thread, after every bump (see add_generation_listener)
+_generation_listeners: List[Callable[[], None]] = []
+
+def get_data_generation() -> int:
+    """Returns a counter that changes every time the set of stored articles changes."""
+    return _data_generation
+
+def bump_data_generation():
+    global _data_generation
+    with _data_generation_lock:
+        _data_generation += 1
+    for listener in list(_generation_listeners):
+        try:
+            listener()
+        except Exception as e:
+            print(f"Data generation listener failed: {e}")
+
+def add_generation_listener(listener: Callable[[], None]):
+    """Registers a callback run after each data generation bump. It must be quick and thread-safe."""
+    _generation_listeners.append(listener)
+
+def remove_generation_listener(listener: Callable[[], None]):
+    if listener in _generation_listeners:
+        _generation_listeners.remove(listener)
+
+def get_db_connection(db_file: Optional[str] = None):
     """Creates a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    conn = sqlite3.connect(db_file or DB_FILE, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row 
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+class ConnectionPool:
+    """
+    A bounded pool of read-only connections.
+
+    Connections are opened lazily up to `size` and handed out one request at a
+    time. Because each connection lives for the whole process, sqlite3's
+    per-connection statement cache lets repeated queries skip re-preparing.
+    Writes go through their own connection from get_db_connection(); with WAL
+    enabled, readers never wait on that writer.
+    """
+
+    def __init__(self, db_file: str, size: int = READ_POOL_SIZE, timeout: float = READ_POOL_TIMEOUT):
+        self.db_file = db_file
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = get_db_connection(self.db_file)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Takes an idle connection, opening a new one if the pool is not yet full."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn: sqlite3.Connection):
+        """Returns a connection to the pool."""
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Closes every idle connection. Connections currently checked out are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+_read_pool: Optional[ConnectionPool] = None
+_read_pool_lock = threading.Lock()
+
+def get_read_pool() -> ConnectionPool:
+    """Returns the process-wide read pool, recreating it if DB_FILE has changed."""
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is None or _read_pool.db_file != DB_FILE:
+            if _read_pool is not None:
+                _read_pool.close()
+            _read_pool = ConnectionPool(DB_FILE)
+        return _read_pool
+
+def close_read_pool():
+    """Closes all pooled read connections (e.g. on server shutdown)."""
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is not None:
+            _read_pool.close()
+            _read_pool = None
+
 def init_db():
-    """Initializes the database and creates the articles table if it doesn't exist."""
+    """Initializes the database, bringing its schema up to date with any pending migrations."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE,
-            source TEXT,
-            category TEXT,
-            imageUrl TEXT,
-            description TEXT,
-            publishedAt TEXT NOT NULL,
-            ai_categorized BOOLEAN DEFAULT 0
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    # Only takes effect on a new database, so it must come before anything is
+    # written to the file; retention.py converts existing ones
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # WAL lets the API keep reading while the scraper writes
+    conn.execute("PRAGMA journal_mode = WAL")
+    # With several API workers, the ones that start while another is migrating wait for it
+    conn.execute("PRAGMA busy_timeout = 600000")
+    try:
+        run_migrations(conn)
+    finally:
+        conn.close()
     print("Database initialized successfully.")
 
+# --- Archive Tier ---
+# retention.py moves articles older than its hot window into a second database
+# with the same tables. Queries attach it only when they need it.
+
+def archive_file(db_file: Optional[str] = None) -> str:
+    """The archive database that holds articles moved out of `db_file` (news.db -> news.archive.db)."""
+    root, _ = os.path.splitext(db_file or DB_FILE)
+    return f"{root}.archive.db"
+
+def get_archive_boundary(conn: sqlite3.Connection) -> Optional[str]:
+    """The publishedAt before which articles may live in the archive, or None if nothing was ever archived."""
+    row = conn.execute("SELECT archived_before FROM retention_state").fetchone()
+    return row[0] if row else None
+
+def attach_archive(conn: sqlite3.Connection):
+    """Attaches the archive database to `conn` as schema 'archive', unless it already is."""
+    if conn.execute("SELECT 1 FROM pragma_database_list WHERE name = 'archive'").fetchone() is None:
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_file(),))
+
+def _tiers(conn: sqlite3.Connection, from_ts: Optional[int]) -> List[str]:
+    """
+    The schemas a date-filtered read has to cover: the hot 'main' database,
+    plus the archive when `from_ts` reaches back past the archive boundary.
+    Without a from_ts, reads cover the hot window only.
+    """
+    boundary = get_archive_boundary(conn)
+    if boundary is None or from_ts is None or from_ts >= epoch_seconds(boundary):
+        return ['main']
+    attach_archive(conn)
+    return ['main', 'archive']
+
+@timed(DB_QUERY_SECONDS)
 def article_exists(url: str, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Checks if an article with the given URL already exists in the database."""
     close_conn = False
@@ -46,6 +270,33 @@ def article_exists(url: str, conn: Optional[sqlite3.Connection] = None) -> bool:
         
     return exists
 
+@timed(DB_QUERY_SECONDS)
+def find_existing_urls(urls: Iterable[str], conn: sqlite3.Connection) -> Set[str]:
+    """
+    Returns the subset of `urls` already stored, as articles or as aliases of
+    a near-duplicate article, in either tier, in one indexed query per
+    LOOKUP_CHUNK_SIZE URLs rather than one query per URL. The lookup goes
+    through the 8-byte url_hash indexes; the stored URL is compared as well,
+    so a hash collision can never hide a new article.
+    """
+    wanted = {url_hash(url): url for url in set(urls)}
+    hashes = list(wanted)
+    schemas = ['main']
+    if get_archive_boundary(conn) is not None:
+        attach_archive(conn)
+        schemas.append('archive')
+    tables = [f"{schema}.{table}" for schema in schemas for table in ('articles', 'article_aliases')]
+    existing = set()
+    for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+        chunk = hashes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        query = " UNION ALL ".join(f"SELECT url_hash, url FROM {table} WHERE url_hash IN ({placeholders})" for table in tables)
+        for row in conn.execute(query, chunk * len(tables)):
+            if wanted.get(row[0]) == row[1]:
+                existing.add(row[1])
+    return existing
+
+@timed(DB_QUERY_SECONDS)
 def add_article_batch(articles: List[Dict[str, Any]], conn: sqlite3.Connection):
     """Adds a batch of articles to the database, ignoring duplicates."""
     cursor = conn.cursor()
@@ -55,117 +306,441 @@ def add_article_batch(articles: List[Dict[str, Any]], conn: sqlite3.Connection):
         articles_to_insert.append((
             article.get('title'),
             article.get('url'),
+            url_hash(article.get('url')),
             article.get('source'),
             article.get('category'),
             article.get('imageUrl'),
             article.get('description'),
-            article.get('publishedAt')
+            article.get('publishedAt'),
+            epoch_seconds(article.get('publishedAt')),
+            1 if article.get('ai_categorized') else 0
         ))
 
     try:
         cursor.executemany('''
-            INSERT OR IGNORE INTO articles (title, url, source, category, imageUrl, description, publishedAt)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT OR IGNORE INTO articles (title, url, url_hash, source, category, imageUrl, description, publishedAt,
+                                            published_ts, ai_categorized)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', articles_to_insert)
+        _index_title_bands(articles, conn)
         conn.commit()
+        if cursor.rowcount > 0:
+            bump_data_generation()
     except sqlite3.IntegrityError as e:
         print(f"An integrity error occurred during batch insert: {e}")
         conn.rollback()
 
+def _index_title_bands(articles: List[Dict[str, Any]], conn: sqlite3.Connection):
+    """Adds the LSH band keys of each article's headline to title_bands (already indexed rows are left alone)."""
+    keys = {article.get('url'): headline_band_keys(article.get('title')) for article in articles}
+    hashes = [url_hash(url) for url, article_keys in keys.items() if article_keys]
+    rows = []
+    for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+        chunk = hashes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        for article_id, url in conn.execute(f"SELECT id, url FROM articles WHERE url_hash IN ({placeholders})", chunk):
+            rows.extend((key, article_id) for key in keys.get(url, ()))
+    conn.executemany("INSERT OR IGNORE INTO title_bands (band_key, article_id) VALUES (?, ?)", rows)
+
+@timed(DB_QUERY_SECONDS)
+def find_near_duplicate(headline: str, conn: sqlite3.Connection, since_ts: Optional[int] = None) -> Optional[Tuple[int, str, float]]:
+    """
+    Finds a stored article whose headline is a near-duplicate of `headline`
+    (see near_duplicates.py), published at or after Unix time `since_ts` if given.
+
+    Candidates come from the title_bands index, so only headlines sharing an
+    LSH band are compared. Returns (id, url, similarity) of the most similar
+    one at or above the threshold, or None.
+    """
+    words = tokens(headline)
+    keys = headline_band_keys(headline)
+    if not keys:
+        return None
+    placeholders = ', '.join('?' * len(keys))
+    params: List[Any] = list(keys)
+    date_filter = ""
+    if since_ts is not None:
+        date_filter = "AND a.published_ts >= ?"
+        params.append(since_ts)
+    rows = conn.execute(f'''
+        SELECT a.id, a.url, a.title FROM articles a
+        WHERE a.id IN (SELECT article_id FROM title_bands WHERE band_key IN ({placeholders})) {date_filter}
+    ''', params).fetchall()
+    best = None
+    for article_id, url, title in rows:
+        similarity = jaccard(words, tokens(title))
+        if similarity >= THRESHOLD and (best is None or similarity > best[2]):
+            best = (article_id, url, similarity)
+    return best
+
+@timed(DB_QUERY_SECONDS)
+def add_article_aliases(aliases: List[Tuple[str, str, float]], conn: sqlite3.Connection) -> int:
+    """
+    Records each (url, canonical_url, similarity) as a near-duplicate of the
+    stored article at canonical_url, so the URL is treated as known from now
+    on. Returns how many were recorded; an alias whose canonical article is
+    not stored is not, and the caller must not treat its URL as handled.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    cursor = conn.executemany('''
+        INSERT OR IGNORE INTO article_aliases (url, url_hash, canonical_id, similarity, created_at)
+        SELECT ?, ?, id, ?, ? FROM articles WHERE url_hash = ? AND url = ?
+    ''', [(url, url_hash(url), similarity, now, url_hash(canonical_url), canonical_url)
+          for url, canonical_url, similarity in aliases])
+    conn.commit()
+    return cursor.rowcount
+
+@timed(DB_QUERY_SECONDS)
+def get_page_validators(url: str, conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Returns the stored ETag, Last-Modified and link-set hash for a listing page (empty if never seen)."""
+    row = conn.execute("SELECT etag, last_modified, link_hash FROM page_validators WHERE url = ?", (url,)).fetchone()
+    return dict_from_row(row)
+
+@timed(DB_QUERY_SECONDS)
+def save_page_validators(url: str, etag: Optional[str], last_modified: Optional[str], link_hash: Optional[str],
+                         conn: sqlite3.Connection):
+    """Records what a listing page looked like on this scrape, for the next conditional GET."""
+    conn.execute('''
+        INSERT INTO page_validators (url, etag, last_modified, link_hash, checked_at)
+        VALUES (?, ?, ?, ?, datetime('now'))
+        ON CONFLICT (url) DO UPDATE SET
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            link_hash = excluded.link_hash,
+            checked_at = excluded.checked_at
+    ''', (url, etag, last_modified, link_hash))
+    conn.commit()
+
 def dict_from_row(row: sqlite3.Row) -> Dict[str, Any]:
     """Converts a sqlite3.Row object to a dictionary."""
     if not row:
         return {}
     return dict(row)
 
-def get_articles(sort_by: str = 'publishedAt', limit: int = 100, from_date: Optional[str] = None, to_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Retrieves all articles from the database, with sorting and date filtering."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def encode_cursor(sort_by: str, direction: str, key: List[Any]) -> str:
+    """Encodes a keyset position as an opaque, URL-safe cursor string."""
+    payload = json.dumps({"v": CURSOR_VERSION, "s": sort_by, "d": direction, "k": list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[str, List[Any]]:
+    """Decodes a cursor into (direction, key). Raises ValueError if it is malformed or was issued for another sort."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        cursor_sort, direction, key = data['s'], data['d'], data['k']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if data.get('v') != CURSOR_VERSION:
+        raise ValueError("Cursor has expired; request the first page again.")
+    if cursor_sort != sort_by:
+        raise ValueError("Cursor was issued for a different sort order.")
+    if direction not in ('next', 'prev') or not isinstance(key, list) or len(key) != 2:
+        raise ValueError("Invalid cursor.")
+    return direction, key
+
+def _projection(fields: Optional[Sequence[str]], allowed: Sequence[str], key_fields: Sequence[str]) -> Tuple[List[str], Set[str]]:
+    """
+    Works out which fields to SELECT for a `fields=` projection.
+
+    Returns the fields to read, in `allowed` order followed by any key columns
+    that are not fields themselves (such as published_ts), and the ones that
+    are only read because the page cursor needs them and must be dropped
+    afterwards. Raises ValueError for unknown field names.
+    """
+    wanted = set(fields) if fields else set(allowed)
+    unknown = wanted - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Choose from: {', '.join(allowed)}.")
+    selected = [field for field in allowed if field in wanted or field in key_fields]
+    selected += [field for field in key_fields if field not in allowed]
+    return selected, set(key_fields) - wanted
+
+def _project_page(page: Dict[str, Any], hidden: Set[str]) -> Dict[str, Any]:
+    """Drops the cursor-only fields from every article of a page."""
+    if hidden:
+        page["articles"] = [{k: v for k, v in row.items() if k not in hidden} for row in page["articles"]]
+    return page
 
-    params = []
-    where_clauses = []
+def _keyset_query(columns: Tuple[str, str], descending: bool, direction: str) -> Tuple[str, str]:
+    """
+    Builds the seek condition and ORDER BY for one page of a keyset-paginated query.
 
-    if from_date:
-        where_clauses.append("publishedAt >= ?")
-        params.append(from_date)
-    if to_date:
-        # To include the whole day, we can use '<' with the next day or just check the date part
-        where_clauses.append("publishedAt <= ?")
-        params.append(f"{to_date}T23:59:59Z")
+    Rows are ordered by `columns` (a sort key plus the id tiebreaker). Paging
+    backwards walks the same index in the opposite direction; the caller
+    reverses those rows again so pages always come out in display order.
+    """
+    backwards = direction == 'prev'
+    scan_descending = descending != backwards
+    operator = '<' if scan_descending else '>'
+    order = 'DESC' if scan_descending else 'ASC'
+    condition = f"({columns[0]}, {columns[1]}) {operator} (?, ?)"
+    order_sql = f"ORDER BY {columns[0]} {order}, {columns[1]} {order}"
+    return condition, order_sql
+
+def _build_page(rows: List[Dict[str, Any]], sort_by: str, fields: Tuple[str, str], limit: int,
+                direction: str, cursor_key: Optional[List[Any]]) -> Dict[str, Any]:
+    """Trims the extra look-ahead row and works out the cursors for the neighbouring pages."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'prev':
+        rows.reverse()
+
+    def key_of(row):
+        return [row[fields[0]], row[fields[1]]]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == 'next':
+            next_cursor = encode_cursor(sort_by, 'next', key_of(rows[-1])) if has_more else None
+            prev_cursor = encode_cursor(sort_by, 'prev', key_of(rows[0])) if cursor_key else None
+        else:
+            next_cursor = encode_cursor(sort_by, 'next', key_of(rows[-1]))
+            prev_cursor = encode_cursor(sort_by, 'prev', key_of(rows[0])) if has_more else None
+    elif cursor_key:
+        # Paged past either end; offer the way back
+        if direction == 'next':
+            prev_cursor = encode_cursor(sort_by, 'prev', cursor_key)
+        else:
+            next_cursor = encode_cursor(sort_by, 'next', cursor_key)
+
+    return {"articles": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+def _list_articles(where_clauses: List[str], params: List[Any], sort_by: str, limit: int, cursor: Optional[str],
+                   from_ts: Optional[int], to_ts: Optional[int], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Shared keyset-paginated listing behind get_articles and get_articles_by_category."""
+    sort_by = sort_by if sort_by in LIST_SORTS else 'publishedAt'
+    columns, descending = LIST_SORTS[sort_by]
+    selected, hidden = _projection(fields, ARTICLE_FIELDS, columns)
+    direction, cursor_key = decode_cursor(cursor, sort_by) if cursor else ('next', None)
+
+    if from_ts is not None:
+        where_clauses.append("published_ts >= ?")
+        params.append(from_ts)
+    if to_ts is not None:
+        where_clauses.append("published_ts < ?")
+        params.append(to_ts)
+
+    seek_condition, order_clause = _keyset_query(columns, descending, direction)
+    if cursor_key:
+        where_clauses.append(seek_condition)
+        params.extend(cursor_key)
 
     where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
-    
-    order_clause = 'ORDER BY publishedAt DESC'
-    if sort_by == 'relevancy':
-        order_clause = 'ORDER BY title'
-    elif sort_by == 'publishedAt_asc':
-        order_clause = 'ORDER BY publishedAt ASC'
 
-    params.append(limit)
-    cursor.execute(f"SELECT * FROM articles {where_sql} {order_clause} LIMIT ?", params)
-    
-    articles = [dict_from_row(row) for row in cursor.fetchall()]
-    conn.close()
-    return articles
+    # One extra row tells us whether another page follows
+    params.append(limit + 1)
+    with get_read_pool().connection() as conn:
+        schemas = _tiers(conn, from_ts)
+        branches = [f"SELECT {', '.join(selected)} FROM {schema}.articles {where_sql} {order_clause} LIMIT ?" for schema in schemas]
+        if len(branches) == 1:
+            rows = conn.execute(branches[0], params).fetchall()
+        else:
+            # Each tier is its own index seek; the outer query merges their pages
+            union = " UNION ALL ".join(f"SELECT * FROM ({branch})" for branch in branches)
+            rows = conn.execute(f"{union} {order_clause} LIMIT ?", params * len(branches) + [limit + 1]).fetchall()
 
-def get_articles_by_category(category: str, sort_by: str = 'publishedAt', limit: int = 100, from_date: Optional[str] = None, to_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Retrieves articles for a specific category, with sorting and date filtering."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    page = _build_page([dict_from_row(row) for row in rows], sort_by, columns, limit, direction, cursor_key)
+    return _project_page(page, hidden)
 
-    params = [category]
-    where_clauses = ["category = ?"]
+@timed(DB_QUERY_SECONDS)
+def get_articles(sort_by: str = 'publishedAt', limit: int = DEFAULT_PAGE_SIZE, from_ts: Optional[int] = None, to_ts: Optional[int] = None,
+                 cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Retrieves one page of articles, with sorting and date filtering.
 
-    if from_date:
-        where_clauses.append("publishedAt >= ?")
-        params.append(from_date)
-    if to_date:
-        where_clauses.append("publishedAt <= ?")
-        params.append(f"{to_date}T23:59:59Z")
+    The date range is in Unix seconds: published at or after `from_ts` and
+    before `to_ts`. Turning calendar days in the reader's timezone into
+    that range is the caller's job (see main.date_range).
 
-    where_sql = f"WHERE {' AND '.join(where_clauses)}"
-    
-    order_clause = 'ORDER BY publishedAt DESC'
-    if sort_by == 'relevancy':
-        order_clause = 'ORDER BY title'
-    elif sort_by == 'publishedAt_asc':
-        order_clause = 'ORDER BY publishedAt ASC'
+    Returns a dict with 'articles', 'next_cursor' and 'prev_cursor'. Pass either
+    cursor back to fetch the neighbouring page; every page is an index seek, so
+    deep pages cost the same as the first one. `fields` limits the columns
+    read and returned (see ARTICLE_FIELDS); by default every field is returned.
+    Only a from_ts older than the hot window also reads the archive tier
+    (see retention.py).
+    """
+    return _list_articles([], [], sort_by, limit, cursor, from_ts, to_ts, fields)
+
+@timed(DB_QUERY_SECONDS)
+def get_articles_by_category(category: str, sort_by: str = 'publishedAt', limit: int = DEFAULT_PAGE_SIZE, from_ts: Optional[int] = None,
+                             to_ts: Optional[int] = None, cursor: Optional[str] = None,
+                             fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Retrieves one page of articles for a specific category. See get_articles for the date range, return value and `fields`."""
+    return _list_articles(["category = ?"], [category], sort_by, limit, cursor, from_ts, to_ts, fields)
+
+@timed(DB_QUERY_SECONDS)
+def get_feed(categories: Sequence[str], per_category: int = FEED_PAGE_SIZE,
+             fields: Optional[Sequence[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Retrieves the newest `per_category` articles of every category in one query.
 
+    Returns a dict mapping each category, in the order given, to its articles
+    (newest first). Each category is its own index seek on
+    (category, published_ts), joined with UNION ALL, so the cost grows with
+    the number of rows returned rather than the size of the categories.
+    `fields` works as in get_articles.
+    """
+    categories = list(dict.fromkeys(categories))
+    feed: Dict[str, List[Dict[str, Any]]] = {category: [] for category in categories}
+    if not categories:
+        return feed
+    selected, hidden = _projection(fields, ARTICLE_FIELDS, ('category', 'published_ts', 'id'))
+    branch = f"SELECT * FROM (SELECT {', '.join(selected)} FROM articles WHERE category = ? ORDER BY published_ts DESC, id DESC LIMIT ?)"
+    params: List[Any] = []
+    for category in categories:
+        params.extend((category, per_category))
+    with get_read_pool().connection() as conn:
+        rows = conn.execute(
+            " UNION ALL ".join([branch] * len(categories)) + " ORDER BY category, published_ts DESC, id DESC", params
+        ).fetchall()
+    for row in rows:
+        article = dict_from_row(row)
+        feed[article['category']].append({k: v for k, v in article.items() if k not in hidden} if hidden else article)
+    return feed
+
+@timed(DB_QUERY_SECONDS)
+def get_latest_article_id() -> int:
+    """The highest article id stored, or 0 for an empty database."""
+    with get_read_pool().connection() as conn:
+        return conn.execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0]
+
+@timed(DB_QUERY_SECONDS)
+def get_articles_after(after_id: int, categories: Optional[Sequence[str]] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       up_to: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Retrieves up to `limit` articles with ids above `after_id` (and at most
+    `up_to`), optionally only those in `categories`, oldest first. Ids only
+    ever grow (AUTOINCREMENT), so this is everything inserted since that
+    article; it is one seek on the primary key.
+    """
+    where_clauses = ["id > ?"]
+    params: List[Any] = [after_id]
+    if up_to is not None:
+        where_clauses.append("id <= ?")
+        params.append(up_to)
+    if categories:
+        where_clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
     params.append(limit)
-    cursor.execute(f"SELECT * FROM articles {where_sql} {order_clause} LIMIT ?", params)
-    
-    articles = [dict_from_row(row) for row in cursor.fetchall()]
-    conn.close()
-    return articles
+    with get_read_pool().connection() as conn:
+        rows = conn.execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles WHERE {' AND '.join(where_clauses)} ORDER BY id LIMIT ?", params
+        ).fetchall()
+    return [dict_from_row(row) for row in rows]
 
-def search_articles(query: str, sort_by: str = 'publishedAt', limit: int = 100, from_date: Optional[str] = None, to_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Searches for articles by title or description, with sorting and date filtering."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+@timed(DB_QUERY_SECONDS)
+def get_articles_by_ids(ids: Sequence[int], fields: Optional[Sequence[str]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Retrieves the articles with the given ids, keyed by id, from the hot tier
+    and, for those not found there, the archive. Ids that match no article
+    are left out. `fields` works as in get_articles; 'id' is always returned.
+    """
+    selected, _ = _projection(fields, ARTICLE_FIELDS, ('id',))
+    found: Dict[int, Dict[str, Any]] = {}
+    with get_read_pool().connection() as conn:
+        schemas = ['main'] if get_archive_boundary(conn) is None else ['main', 'archive']
+        for schema in schemas:
+            missing = [article_id for article_id in dict.fromkeys(ids) if article_id not in found]
+            if not missing:
+                break
+            if schema == 'archive':
+                attach_archive(conn)
+            rows = conn.execute(
+                f"SELECT {', '.join(selected)} FROM {schema}.articles WHERE id IN ({', '.join('?' * len(missing))})", missing
+            ).fetchall()
+            found.update((row['id'], dict_from_row(row)) for row in rows)
+    return found
 
-    search_query = f"%{query}%"
-    params = [search_query, search_query]
-    where_clauses = ["(title LIKE ? OR description LIKE ?)"]
+def build_fts_query(query: str) -> str:
+    """
+    Converts a user search string into a safe FTS5 MATCH expression.
 
-    if from_date:
-        where_clauses.append("publishedAt >= ?")
-        params.append(from_date)
-    if to_date:
-        where_clauses.append("publishedAt <= ?")
-        params.append(f"{to_date}T23:59:59Z")
+    Quoted text is kept as a phrase, a trailing '*' on a word makes it a prefix
+    query, and everything else is matched as individual terms (implicit AND).
+    FTS5 operators and punctuation in the input are never passed through.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        tokens = re.findall(r'\w+', phrase or word)
+        if not tokens:
+            continue
+        term = '"' + ' '.join(tokens) + '"'
+        if word and word.endswith('*'):
+            term += '*'
+        terms.append(term)
+    return ' '.join(terms)
+
+@timed(DB_QUERY_SECONDS)
+def search_articles(query: str, sort_by: str = 'publishedAt', limit: int = DEFAULT_PAGE_SIZE, from_ts: Optional[int] = None,
+                    to_ts: Optional[int] = None, cursor: Optional[str] = None,
+                    fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Full-text searches article titles and descriptions, with sorting and date filtering.
+
+    Supports "quoted phrases" and prefix* terms. 'relevancy' orders results by BM25
+    (title matches weigh more than description matches) and pages on that score.
+    Each result carries a 'snippet' with the matched terms wrapped in <mark> tags.
+    Returns the same page dict as get_articles, and takes the same date range;
+    `fields` may also name 'score' and 'snippet', and leaving 'snippet' out
+    skips building it.
+    """
+    sort_by = sort_by if sort_by in SEARCH_SORTS else 'publishedAt'
+    columns, key_fields, descending = SEARCH_SORTS[sort_by]
+    selected, hidden = _projection(fields, ARTICLE_FIELDS + SEARCH_FIELDS, key_fields)
+    direction, cursor_key = decode_cursor(cursor, sort_by) if cursor else ('next', None)
+
+    match_query = build_fts_query(query)
+    if not match_query:
+        return {"articles": [], "next_cursor": None, "prev_cursor": None}
+
+    params = [match_query]
+    where_clauses = ["articles_fts MATCH ?"]
+
+    if from_ts is not None:
+        where_clauses.append("a.published_ts >= ?")
+        params.append(from_ts)
+    if to_ts is not None:
+        where_clauses.append("a.published_ts < ?")
+        params.append(to_ts)
+
+    seek_condition, order_clause = _keyset_query(columns, descending, direction)
+    if cursor_key:
+        where_clauses.append(seek_condition)
+        params.extend(cursor_key)
 
     where_sql = f"WHERE {' AND '.join(where_clauses)}"
+    _, page_order_clause = _keyset_query(tuple(f"page.{field}" for field in key_fields), descending, direction)
+    select_sql = ', '.join(
+        {'score': 'page.score', 'snippet': "snippet(articles_fts, -1, '<mark>', '</mark>', '…', 24) AS snippet"}.get(field, f"a.{field}")
+        for field in selected
+    )
 
-    order_clause = 'ORDER BY publishedAt DESC'
-    if sort_by == 'relevancy':
-        order_clause = 'ORDER BY title'
-    elif sort_by == 'publishedAt_asc':
-        order_clause = 'ORDER BY publishedAt ASC'
-        
-    params.append(limit)
-    cursor.execute(f"SELECT * FROM articles {where_sql} {order_clause} LIMIT ?", params)
-    
-    articles = [dict_from_row(row) for row in cursor.fetchall()]
-    conn.close()
-    return articles 
\ No newline at end of file
+    params.append(limit + 1)
+    params.append(match_query)
+    # Rank and limit first, then build snippets for the page only; snippet() is
+    # far more expensive than matching and would otherwise run for every hit.
+    with get_read_pool().connection() as conn:
+        schemas = _tiers(conn, from_ts)
+        rows = []
+        for schema in schemas:
+            rows.extend(conn.execute(f"""
+                WITH page AS (
+                    SELECT a.id, a.published_ts, {SEARCH_RANK} AS score
+                    FROM {schema}.articles_fts
+                    JOIN {schema}.articles a ON a.id = articles_fts.rowid
+                    {where_sql} {order_clause} LIMIT ?
+                )
+                SELECT {select_sql}
+                FROM page
+                JOIN {schema}.articles_fts ON articles_fts.rowid = page.id
+                JOIN {schema}.articles a ON a.id = page.id
+                WHERE articles_fts MATCH ?
+                {page_order_clause}
+            """, params).fetchall())
+    if len(schemas) > 1:
+        # Merge the pages of both tiers. Each tier's BM25 scores come from its own
+        # index statistics, so for 'relevancy' the interleaving is approximate.
+        rows.sort(key=lambda row: (row[key_fields[0]], row[key_fields[1]]), reverse=descending != (direction == 'prev'))
+        rows = rows[:limit + 1]
+
+    page = _build_page([dict_from_row(row) for row in rows], sort_by, key_fields, limit, direction, cursor_key)
+    return _project_page(page, hidden)
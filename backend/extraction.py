@@ -0,0 +1,255 @@
+"""
+HTML extraction for CNN listing and article pages.
+
+The scraper only needs a handful of values from each page: the article links
+and headlines on a listing page, and the lead image and first paragraph on an
+article page. Building a full BeautifulSoup tree for that allocates thousands
+of node objects per page, so extraction goes through one of these backends:
+
+- 'stream': an event-based html.parser.HTMLParser that keeps no tree and, on
+  article pages, stops as soon as both fields have been found. Default.
+- 'strainer': BeautifulSoup with a SoupStrainer, so only the matching elements
+  are turned into objects.
+- 'soup': a full BeautifulSoup tree, the original behaviour, kept as a
+  reference for benchmarks and as a fallback.
+
+All backends return identical results. Set SCRAPER_PARSER to choose one.
+"""
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import UnicodeDammit
+
+DEFAULT_BACKEND = os.getenv("SCRAPER_PARSER", "stream")
+
+IMAGE_CONTAINER_CLASS = 'image__container'
+PARAGRAPH_CLASS = 'paragraph'
+HEADLINE_CLASS = 'container__headline-text'
+
+# (href, headline) for each article link on a listing page; headline is None if the card has none
+ListingLink = Tuple[str, Optional[str]]
+
+
+def _decode(html: bytes) -> str:
+    if isinstance(html, str):
+        return html
+    try:
+        return html.decode('utf-8')
+    except UnicodeDecodeError:
+        return UnicodeDammit(html).unicode_markup
+
+
+# --- Full BeautifulSoup tree ('soup') ---
+
+def _details_from_soup(article_soup: BeautifulSoup) -> Dict[str, Any]:
+    details = {'imageUrl': None, 'description': None}
+
+    # CNN often wraps the main image in a picture element within a container
+    # that has 'image' in its class name.
+    image_container = article_soup.find(class_=re.compile(IMAGE_CONTAINER_CLASS))
+    if image_container:
+        image_tag = image_container.find('img')
+        if image_tag and image_tag.get('src'):
+            details['imageUrl'] = image_tag['src']
+
+    # The first paragraph of text is usually a good summary.
+    first_paragraph = article_soup.find('p', class_=re.compile(PARAGRAPH_CLASS))
+    if first_paragraph:
+        details['description'] = first_paragraph.get_text(strip=True)
+
+    return details
+
+
+def _links_from_soup(soup: BeautifulSoup) -> List[ListingLink]:
+    links = []
+    for link in soup.select('a[data-link-type="article"]'):
+        headline_element = link.find('span', class_=HEADLINE_CLASS)
+        links.append((link.get('href'), headline_element.get_text(strip=True) if headline_element else None))
+    return links
+
+
+def soup_article_details(html: bytes) -> Dict[str, Any]:
+    return _details_from_soup(BeautifulSoup(html, 'html.parser'))
+
+
+def soup_listing_links(html: bytes) -> List[ListingLink]:
+    return _links_from_soup(BeautifulSoup(html, 'html.parser'))
+
+
+# --- SoupStrainer ('strainer') ---
+
+ARTICLE_STRAINER = SoupStrainer(class_=re.compile(f'{IMAGE_CONTAINER_CLASS}|{PARAGRAPH_CLASS}'))
+LISTING_STRAINER = SoupStrainer('a', attrs={'data-link-type': 'article'})
+
+
+def strainer_article_details(html: bytes) -> Dict[str, Any]:
+    return _details_from_soup(BeautifulSoup(html, 'html.parser', parse_only=ARTICLE_STRAINER))
+
+
+def strainer_listing_links(html: bytes) -> List[ListingLink]:
+    return _links_from_soup(BeautifulSoup(html, 'html.parser', parse_only=LISTING_STRAINER))
+
+
+# --- Event-based parser ('stream') ---
+
+class _StopParsing(Exception):
+    pass
+
+
+class _ArticleDetailsParser(HTMLParser):
+    """
+    Mirrors _details_from_soup without building a tree: the image comes from the
+    first img inside the first image container, the description from the text
+    of the first paragraph. Parsing stops once both have been settled.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.details = {'imageUrl': None, 'description': None}
+        self.image_done = False
+        self.paragraph_done = False
+        self._container_tag = None
+        self._container_depth = 0
+        self._paragraph_parts = None
+
+    def _check_done(self):
+        if self.image_done and self.paragraph_done:
+            raise _StopParsing
+
+    def handle_starttag(self, tag, attrs):
+        classes = dict(attrs).get('class') or ''
+
+        if not self.image_done:
+            if self._container_tag is None:
+                if IMAGE_CONTAINER_CLASS in classes:
+                    self._container_tag = tag
+                    self._container_depth = 1
+            elif tag == self._container_tag:
+                self._container_depth += 1
+            if self._container_tag is not None and tag == 'img':
+                self.details['imageUrl'] = dict(attrs).get('src') or None
+                self.image_done = True
+                self._check_done()
+
+        if not self.paragraph_done and self._paragraph_parts is None and tag == 'p' and PARAGRAPH_CLASS in classes:
+            self._paragraph_parts = []
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if not self.image_done and self._container_tag is not None and tag == self._container_tag:
+            self._container_depth -= 1
+            if self._container_depth == 0:
+                # Only the first container counts; it had no image
+                self.image_done = True
+                self._check_done()
+
+        if self._paragraph_parts is not None and tag == 'p':
+            self.details['description'] = ''.join(self._paragraph_parts)
+            self._paragraph_parts = None
+            self.paragraph_done = True
+            self._check_done()
+
+    def handle_data(self, data):
+        if self._paragraph_parts is not None:
+            stripped = data.strip()
+            if stripped:
+                self._paragraph_parts.append(stripped)
+
+    def close(self):
+        super().close()
+        # An unclosed paragraph at the end of the document still counts
+        if self._paragraph_parts is not None:
+            self.details['description'] = ''.join(self._paragraph_parts)
+
+
+class _ListingLinksParser(HTMLParser):
+    """Collects (href, headline) for every article link, as _links_from_soup does."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[ListingLink] = []
+        self._href = None
+        self._in_link = False
+        self._headline_parts = None
+        self._headline = None
+        self._span_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            attributes = dict(attrs)
+            if attributes.get('data-link-type') == 'article':
+                self._in_link = True
+                self._href = attributes.get('href')
+                self._headline = None
+            return
+        if not self._in_link or tag != 'span':
+            return
+        if self._headline_parts is not None:
+            self._span_depth += 1
+        elif self._headline is None and HEADLINE_CLASS in (dict(attrs).get('class') or '').split():
+            self._headline_parts = []
+            self._span_depth = 1
+
+    def handle_endtag(self, tag):
+        if tag == 'span' and self._headline_parts is not None:
+            self._span_depth -= 1
+            if self._span_depth == 0:
+                self._headline = ''.join(self._headline_parts)
+                self._headline_parts = None
+        elif tag == 'a' and self._in_link:
+            if self._headline_parts is not None:
+                self._headline = ''.join(self._headline_parts)
+                self._headline_parts = None
+            self.links.append((self._href, self._headline))
+            self._in_link = False
+
+    def handle_data(self, data):
+        if self._headline_parts is not None:
+            stripped = data.strip()
+            if stripped:
+                self._headline_parts.append(stripped)
+
+
+def stream_article_details(html: bytes) -> Dict[str, Any]:
+    parser = _ArticleDetailsParser()
+    try:
+        parser.feed(_decode(html))
+        parser.close()
+    except _StopParsing:
+        pass
+    return parser.details
+
+
+def stream_listing_links(html: bytes) -> List[ListingLink]:
+    parser = _ListingLinksParser()
+    parser.feed(_decode(html))
+    parser.close()
+    return parser.links
+
+
+ARTICLE_EXTRACTORS: Dict[str, Callable[[bytes], Dict[str, Any]]] = {
+    'stream': stream_article_details,
+    'strainer': strainer_article_details,
+    'soup': soup_article_details,
+}
+
+LISTING_EXTRACTORS: Dict[str, Callable[[bytes], List[ListingLink]]] = {
+    'stream': stream_listing_links,
+    'strainer': strainer_listing_links,
+    'soup': soup_listing_links,
+}
+
+
+def extract_article_details(html: bytes, backend: Optional[str] = None) -> Dict[str, Any]:
+    """Extracts {'imageUrl', 'description'} from an article page."""
+    return ARTICLE_EXTRACTORS[backend or DEFAULT_BACKEND](html)
+
+
+def extract_listing_links(html: bytes, backend: Optional[str] = None) -> List[ListingLink]:
+    """Extracts (href, headline) for every article link on a listing page, in page order."""
+    return LISTING_EXTRACTORS[backend or DEFAULT_BACKEND](html)
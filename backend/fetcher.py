@@ -0,0 +1,216 @@
+"""
+Concurrent HTTP fetch engine for the scraper.
+
+All requests share one keep-alive requests.Session. Concurrency is bounded both
+globally (the worker pool) and per host (a semaphore), each host is throttled
+by a token bucket, and transient failures are retried with jittered
+exponential backoff. Every fetch reports how long it took and how many attempts
+it needed.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Requests in flight across all hosts, and against any single host
+MAX_CONCURRENCY = 16
+MAX_PER_HOST = 6
+# Token bucket per host: sustained requests per second, and the burst allowed on top
+RATE_PER_HOST = 8.0
+BURST_PER_HOST = 8
+# Retries after the first attempt, with backoff doubling from BACKOFF_BASE up to BACKOFF_MAX seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = 15
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status: Optional[int]
+    content: bytes
+    headers: Mapping[str, str]
+    elapsed: float
+    attempts: int
+    error: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TokenBucket:
+    """Blocks callers so that no more than `rate` acquisitions per second (plus a burst of `capacity`) get through."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """Blocks until `tokens` are available (capped at the bucket's capacity) and takes them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_per_host: int = MAX_PER_HOST,
+                 rate_per_host: float = RATE_PER_HOST, burst_per_host: int = BURST_PER_HOST,
+                 max_retries: int = MAX_RETRIES, timeout: float = DEFAULT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.rate_per_host = rate_per_host
+        self.burst_per_host = burst_per_host
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='fetch')
+        self._hosts: Dict[str, Tuple[threading.BoundedSemaphore, TokenBucket]] = {}
+        self._lock = threading.Lock()
+        self._elapsed: List[float] = []
+        self._retries = 0
+        self._failures = 0
+
+    def _host_limits(self, url: str) -> Tuple[threading.BoundedSemaphore, TokenBucket]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.max_per_host),
+                    TokenBucket(self.rate_per_host, self.burst_per_host),
+                )
+            return self._hosts[host]
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> FetchResult:
+        """Fetches a URL, retrying transient failures. Never raises; failures are reported in the result."""
+        host_slots, bucket = self._host_limits(url)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            error = None
+            bucket.acquire()
+            with host_slots:
+                try:
+                    response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+                except requests.RequestException as e:
+                    error = str(e)
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                break
+            if response is not None:
+                error = f"HTTP {response.status_code}"
+            if attempt > self.max_retries:
+                break
+            with self._lock:
+                self._retries += 1
+            time.sleep(self._backoff(attempt - 1, response))
+
+        elapsed = time.perf_counter() - started
+        if response is not None and error is None and response.status_code >= 400:
+            error = f"HTTP {response.status_code}"
+
+        with self._lock:
+            self._elapsed.append(elapsed)
+            if error:
+                self._failures += 1
+
+        return FetchResult(
+            url=url,
+            status=response.status_code if response is not None else None,
+            content=response.content if response is not None else b'',
+            headers=CaseInsensitiveDict(response.headers) if response is not None else CaseInsensitiveDict(),
+            elapsed=elapsed,
+            attempts=attempt,
+            error=error,
+        )
+
+    def fetch_many(self, urls: Iterable[str], timeout: Optional[float] = None,
+                   headers: Optional[Mapping[str, Dict[str, str]]] = None) -> List[FetchResult]:
+        """
+        Fetches URLs concurrently, returning results in the same order as `urls`.
+        `headers` optionally maps a URL to extra request headers for that URL.
+        """
+        headers = headers or {}
+        return list(self._executor.map(lambda url: self.fetch(url, headers=headers.get(url), timeout=timeout), urls))
+
+    def fetch_iter(self, urls: Iterable[str], timeout: Optional[float] = None,
+                   headers: Optional[Mapping[str, Dict[str, str]]] = None) -> Iterator[FetchResult]:
+        """Like fetch_many, but yields each result as soon as it completes, in completion order."""
+        headers = headers or {}
+        futures = [self._executor.submit(self.fetch, url, headers.get(url), timeout) for url in urls]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def stats(self) -> Dict[str, float]:
+        """Request count, retries, failures and latency percentiles since the last reset."""
+        with self._lock:
+            elapsed = sorted(self._elapsed)
+            retries, failures = self._retries, self._failures
+        if not elapsed:
+            return {"requests": 0, "retries": retries, "failures": failures}
+        return {
+            "requests": len(elapsed),
+            "retries": retries,
+            "failures": failures,
+            "mean_s": round(sum(elapsed) / len(elapsed), 3),
+            "p50_s": round(elapsed[len(elapsed) // 2], 3),
+            "p95_s": round(elapsed[min(len(elapsed) - 1, int(len(elapsed) * 0.95))], 3),
+            "max_s": round(elapsed[-1], 3),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._elapsed = []
+            self._retries = 0
+            self._failures = 0
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+# Global instance
+fetcher_instance = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher() -> Fetcher:
+    """Get the global fetcher, shared by every scrape so connections stay warm."""
+    global fetcher_instance
+    with _fetcher_lock:
+        if fetcher_instance is None:
+            fetcher_instance = Fetcher()
+        return fetcher_instance
@@ -0,0 +1,217 @@
+"""
+A local article classifier trained on the categories already stored in news.db.
+
+Articles are turned into TF-IDF weighted unigrams and bigrams of the
+normalized title and description, and scored by a multinomial naive Bayes
+model. The model is a handful of NumPy arrays, so a whole scrape's worth of
+articles is classified in a few milliseconds. AICategorizer uses it as a fast
+path: predictions at or above CONFIDENCE_THRESHOLD are accepted, everything
+else still goes to the LLM.
+
+Retrain after a few scrapes (from the backend directory):
+    python local_classifier.py
+"""
+import argparse
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import database
+from categorization_cache import normalize_text
+
+MODEL_FILE = os.getenv("LOCAL_CLASSIFIER_MODEL", "local_classifier.npz")
+CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+MAX_FEATURES = 50000
+MIN_DF = 1
+ALPHA = 0.01  # additive smoothing
+HOLDOUT_FRACTION = 0.2
+
+
+def article_text(title: str, description: Optional[str] = None) -> str:
+    return f"{title or ''} {description or ''}"
+
+
+def tokenize(text: str) -> List[str]:
+    words = normalize_text(text).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LocalClassifier:
+    def __init__(self, classes: Sequence[str], terms: Sequence[str], idf: np.ndarray,
+                 log_prior: np.ndarray, log_likelihood: np.ndarray):
+        self.classes = list(classes)
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.idf = idf
+        self.log_prior = log_prior
+        # Stored term-major, so each token's row of class scores is contiguous
+        self.log_likelihood = log_likelihood
+
+    @staticmethod
+    def _term_counts(texts: Iterable[str]) -> List[Counter]:
+        return [Counter(tokenize(text)) for text in texts]
+
+    def _vectorize(self, counts: List[Counter]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sparse L2-normalized TF-IDF rows as (row ids, term ids, weights)."""
+        rows, cols, data = [], [], []
+        for row, counter in enumerate(counts):
+            for term, count in counter.items():
+                col = self.vocabulary.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    data.append(count)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        data = (1.0 + np.log(np.asarray(data, dtype=np.float64))) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(counts)))
+        data /= np.where(norms > 0, norms, 1.0)[rows]
+        return rows, cols, data
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], min_df: int = MIN_DF,
+              max_features: int = MAX_FEATURES, alpha: float = ALPHA) -> "LocalClassifier":
+        counts = cls._term_counts(texts)
+        document_frequency = Counter(term for counter in counts for term in counter)
+        terms = [term for term, df in document_frequency.most_common(max_features) if df >= min_df]
+        df = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+
+        classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(classes)}
+        y = np.array([class_index[label] for label in labels], dtype=np.int64)
+        log_prior = np.log(np.bincount(y, minlength=len(classes)) / len(y))
+
+        model = cls(classes, terms, idf, log_prior, np.zeros((len(terms), len(classes))))
+        rows, cols, data = model._vectorize(counts)
+        feature_totals = np.zeros((len(terms), len(classes)))
+        np.add.at(feature_totals, (cols, y[rows]), data)
+        feature_totals += alpha
+        model.log_likelihood = np.log(feature_totals / feature_totals.sum(axis=0))
+        return model
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Class probabilities, one row per text, columns in self.classes order."""
+        rows, cols, data = self._vectorize(self._term_counts(texts))
+        scores = np.tile(self.log_prior, (len(texts), 1))
+        np.add.at(scores, rows, data[:, None] * self.log_likelihood[cols])
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(category, confidence) for each text."""
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.classes[i], float(p)) for i, p in zip(best, probabilities[np.arange(len(texts)), best])]
+
+    def save(self, path: str = MODEL_FILE):
+        # Written to a temporary file first so a running server never loads a half-written model
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(
+                f,
+                classes=np.array(self.classes),
+                terms=np.array(self.terms),
+                idf=self.idf,
+                log_prior=self.log_prior,
+                log_likelihood=self.log_likelihood,
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_FILE) -> "LocalClassifier":
+        with np.load(path) as data:
+            return cls(data["classes"].tolist(), data["terms"].tolist(), data["idf"],
+                       data["log_prior"], data["log_likelihood"])
+
+
+def load_training_data(categories: Sequence[str], conn=None) -> Tuple[List[str], List[str]]:
+    """(texts, labels) for every stored article whose category is one of `categories`."""
+    own_connection = conn is None
+    conn = conn or database.get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT title, description, category FROM articles WHERE category IN ({', '.join('?' * len(categories))})",
+            list(categories),
+        ).fetchall()
+    finally:
+        if own_connection:
+            conn.close()
+    return [article_text(row["title"], row["description"]) for row in rows], [row["category"] for row in rows]
+
+
+def split_holdout(texts: List[str], labels: List[str], fraction: float = HOLDOUT_FRACTION, seed: int = 0):
+    """Shuffled (train_texts, train_labels, test_texts, test_labels)."""
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut = int(len(texts) * (1 - fraction))
+    train, test = order[:cut], order[cut:]
+    return ([texts[i] for i in train], [labels[i] for i in train],
+            [texts[i] for i in test], [labels[i] for i in test])
+
+
+def evaluate(model: LocalClassifier, texts: List[str], labels: List[str], threshold: float = CONFIDENCE_THRESHOLD) -> Dict[str, float]:
+    predictions = model.predict(texts)
+    confident = [(p, label) for (p, confidence), label in zip(predictions, labels) if confidence >= threshold]
+    return {
+        "accuracy": sum(p == label for (p, _), label in zip(predictions, labels)) / len(labels) if labels else 0.0,
+        "coverage": len(confident) / len(labels) if labels else 0.0,
+        "confident_accuracy": sum(p == label for p, label in confident) / len(confident) if confident else 0.0,
+    }
+
+
+# Global instance, reloaded when the model file changes
+_model: Optional[LocalClassifier] = None
+_model_mtime: Optional[float] = None
+_model_lock = threading.Lock()
+
+def get_local_classifier() -> Optional[LocalClassifier]:
+    """Get the trained classifier, or None if no model has been trained yet."""
+    global _model, _model_mtime
+    try:
+        mtime = os.stat(MODEL_FILE).st_mtime
+    except OSError:
+        return None
+    with _model_lock:
+        if mtime != _model_mtime:
+            try:
+                _model = LocalClassifier.load(MODEL_FILE)
+            except Exception as e:
+                print(f"Failed to load local classifier from {MODEL_FILE}: {e}")
+                _model = None
+            _model_mtime = mtime
+        return _model
+
+
+def main():
+    from ai_categorizer import PREDEFINED_CATEGORIES
+
+    parser = argparse.ArgumentParser(description="Retrain the local article classifier from news.db.")
+    parser.add_argument("--db", default=database.DB_FILE, help="database to train on")
+    parser.add_argument("--out", default=MODEL_FILE, help="where to write the model")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD, help="confidence threshold to report on")
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    texts, labels = load_training_data(PREDEFINED_CATEGORIES)
+    if len(set(labels)) < 2:
+        print("Not enough labelled articles to train on.")
+        return
+
+    train_texts, train_labels, test_texts, test_labels = split_holdout(texts, labels)
+    metrics = evaluate(LocalClassifier.train(train_texts, train_labels), test_texts, test_labels, args.threshold)
+    print(f"Held-out accuracy {metrics['accuracy']:.1%}; at threshold {args.threshold} it answers "
+          f"{metrics['coverage']:.1%} of articles with {metrics['confident_accuracy']:.1%} accuracy.")
+
+    model = LocalClassifier.train(texts, labels)
+    model.save(args.out)
+    print(f"Trained on {len(texts)} articles, {len(model.terms)} terms, {len(model.classes)} categories; saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,89 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+import datetime
 import json
-from typing import List, Dict, Any, Optional
+import math
+from typing import List, Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import os
 import uvicorn
 import database
-from scraper import run_scrape_in_background, CATEGORIES
-from ai_categorizer import get_ai_categorizer
+from scraper import CATEGORIES
+from scheduler import get_scheduler
+from broadcaster import get_broadcaster
+from retention import get_retention_job
+from workers import get_coordinator
+import stats
+from ai_categorizer import health_status as ai_health_status, warm_up as ai_warm_up
+from categorization_cache import get_categorization_cache
+from compression import negotiate_encoding
+from metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, render_metrics
+from response_cache import ResponseCache, cacheable_headers, etag_matches
 
 # --- App Initialization ---
 app = FastAPI()
 
+# --- Response Cache ---
+# Read endpoints only change when a scrape commits new articles, so their
+# responses are cached per data generation and revalidated with ETags.
+CACHEABLE_PATHS = ("/api/news", "/api/feed", "/api/search", "/api/categories")
+# Related articles change when the related index is updated after a scrape,
+# which is not a data generation; the lookups are cheap enough uncached
+UNCACHED_SUFFIXES = ("/related",)
+response_cache = ResponseCache()
+
+async def cache_read_responses(request: Request, call_next):
+    """
+    Serves GET responses for the read endpoints from the response cache,
+    compressed as the client's Accept-Encoding allows, and answers
+    If-None-Match with 304 when the client's copy is still current.
+    """
+    key = ResponseCache.make_key(request.url.path, request.query_params.multi_items())
+    # Read the generation before running the query: if a scrape commits while
+    # we build the response, the entry is already stale and won't be served.
+    generation = database.get_data_generation()
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = response_cache.put(key, generation, body, cacheable_headers(response.raw_headers))
+
+    body, etag, encoding = entry.encoded(negotiate_encoding(request.headers.get("accept-encoding")))
+    validators = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=validators)
+    headers = {**entry.headers, **validators}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=200, headers=headers)
+
+class CacheReadResponses:
+    """
+    Runs cache_read_responses for GETs of CACHEABLE_PATHS (other than
+    UNCACHED_SUFFIXES) only. Every other request, notably the long-lived
+    /api/stream responses, skips BaseHTTPMiddleware and the task group and
+    memory streams it sets up per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cached = BaseHTTPMiddleware(app, dispatch=cache_read_responses)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] == "http" and scope["method"] == "GET" and scope["path"].startswith(CACHEABLE_PATHS)
+                and not scope["path"].endswith(UNCACHED_SUFFIXES)):
+            await self.cached(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+# Added before CORS so that CORS wraps it: per-origin CORS headers are never cached
+app.add_middleware(CacheReadResponses)
+
 # --- CORS Middleware ---
 app.add_middleware(
     CORSMiddleware,
@@ -18,88 +91,301 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "ETag"],
 )
 
+# --- Metrics Middleware ---
+# Added last so it is outermost and its timings include the other middleware
+app.add_middleware(MetricsMiddleware)
+Gauge("response_cache_hits", "Responses served from the response cache since startup.", lambda: response_cache.hits)
+Gauge("response_cache_misses", "Cacheable responses built from the database since startup.", lambda: response_cache.misses)
+Gauge("response_cache_entries", "Responses currently held in the response cache.", lambda: response_cache.stats()["entries"])
+Gauge("stream_clients", "Open live stream connections.", lambda: get_broadcaster().client_count())
+Gauge("worker_is_writer", "1 if this worker runs the scrapes and archiving, 0 if it only serves reads.",
+      lambda: int(get_coordinator().is_writer))
+
 # --- Server Startup Event ---
 @app.on_event("startup")
 async def startup_event():
     """
-    On server startup, initialize the database and trigger an initial scrape.
+    On server startup, initialize the database and start the live article
+    stream. The worker that becomes the writer (see workers.py) also starts
+    the scrape scheduler, whose first run is a full scrape, and the retention
+    job.
     """
     print("Server starting up...")
     database.init_db()
+    await get_broadcaster().start()
     
     # Delete the old JSON file if it exists to avoid confusion
     if os.path.exists("news_data.json"):
         os.remove("news_data.json")
         print("Removed obsolete news_data.json file.")
 
-    run_scrape_in_background()
+    # Validate the OpenAI client in the background instead of at import time
+    if os.getenv("OPENAI_WARMUP", "1") != "0":
+        ai_warm_up()
+
+    get_coordinator().start(on_elected=start_writer_jobs, on_scrape_request=get_scheduler().trigger)
+
+def start_writer_jobs():
+    """Starts the jobs that write to the database; only the writer worker runs them."""
+    get_scheduler().start()
+    get_retention_job().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop scheduling scrapes and archiving, hand the writer role to another
+    worker, end live streams and close pooled database connections on shutdown.
+    """
+    get_scheduler().stop(timeout=5)
+    get_retention_job().stop(timeout=5)
+    get_coordinator().stop(timeout=5)
+    await get_broadcaster().stop()
+    database.close_read_pool()
+
+# --- Pagination ---
+
+def page_response(page: Dict[str, Any]) -> ORJSONResponse:
+    """
+    Serializes a page's articles straight to JSON with orjson, skipping
+    response_model validation, and moves the page cursors into the
+    X-Next-Cursor / X-Prev-Cursor headers, so list bodies stay plain arrays.
+    """
+    headers = {}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["prev_cursor"]:
+        headers["X-Prev-Cursor"] = page["prev_cursor"]
+    return ORJSONResponse(page["articles"], headers=headers)
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Splits a comma-separated parameter such as `fields`; None or empty means all of them."""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+KNOWN_CATEGORIES = ['top-stories'] + list(CATEGORIES)
+
+def parse_categories(categories: Optional[str]) -> Optional[List[str]]:
+    """Splits a comma-separated `categories` parameter (None means all), rejecting unknown names with 400."""
+    wanted = parse_fields(categories.lower() if categories else None)
+    unknown = [category for category in wanted or () if category not in KNOWN_CATEGORIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown categories: {', '.join(unknown)}")
+    return wanted
+
+def date_range(from_date: Optional[str], to_date: Optional[str], tz: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Turns the `from_date`/`to_date` parameters into the Unix-second range the
+    database filters on: from the start of from_date up to, but not including,
+    the start of the day after to_date, both in timezone `tz` (UTC by
+    default). Either may also be a full ISO 8601 timestamp, used as given and
+    inclusive. Rejects values that don't parse with 400.
+    """
+    try:
+        zone = ZoneInfo(tz) if tz else datetime.timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+
+    def bound(name: str, value: Optional[str], upper: bool) -> Optional[int]:
+        if not value:
+            return None
+        try:
+            day = datetime.date.fromisoformat(value)
+        except ValueError:
+            day = None
+        try:
+            if day is not None:
+                # Midnight at the start of the day (or of the next one, for the upper bound) in the reader's timezone
+                moment = datetime.datetime.combine(day + datetime.timedelta(days=1) if upper else day, datetime.time(), zone)
+                return math.floor(moment.timestamp())
+            moment = datetime.datetime.fromisoformat(value)
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD) or an ISO 8601 timestamp.")
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=zone)
+        # published_ts is whole seconds, so an inclusive instant ends one second later
+        return math.floor(moment.timestamp()) + (1 if upper else 0)
+
+    return bound("from_date", from_date, False), bound("to_date", to_date, True)
 
 # --- API Endpoints ---
+# SQLite calls are blocking, so every database read runs in the threadpool
+# instead of on the event loop.
 
-@app.get("/api/news", response_model=List[Dict[str, Any]])
+@app.get("/api/news", response_class=ORJSONResponse)
 async def get_all_news(
     sort_by: Optional[str] = Query('publishedAt', enum=['publishedAt', 'publishedAt_asc', 'relevancy']),
     from_date: Optional[str] = None,
-    to_date: Optional[str] = None
+    to_date: Optional[str] = None,
+    tz: Optional[str] = Query(None, description="IANA timezone whose days from_date/to_date mean, e.g. Europe/Berlin; UTC by default"),
+    limit: int = Query(database.DEFAULT_PAGE_SIZE, ge=1, le=database.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,url,imageUrl")
 ):
     """
-    Endpoint to get all news articles from the database.
+    Endpoint to get one page of news articles from the database.
+    Follow the X-Next-Cursor / X-Prev-Cursor response headers for more, and
+    pass `fields` to return only some fields (e.g. for article cards).
+    `from_date`/`to_date` are days in `tz`, both inclusive.
     """
+    from_ts, to_ts = date_range(from_date, to_date, tz)
     try:
-        articles = database.get_articles(sort_by=sort_by, from_date=from_date, to_date=to_date)
-        return articles
+        page = await run_in_threadpool(
+            database.get_articles,
+            sort_by=sort_by,
+            limit=limit,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            cursor=cursor,
+            fields=parse_fields(fields)
+        )
+        return page_response(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-@app.get("/api/news/category/{category_name}", response_model=List[Dict[str, Any]])
+@app.get("/api/news/category/{category_name}", response_class=ORJSONResponse)
 async def get_news_by_category(
     category_name: str, 
     sort_by: Optional[str] = Query('publishedAt', enum=['publishedAt', 'publishedAt_asc', 'relevancy']),
     from_date: Optional[str] = None,
-    to_date: Optional[str] = None
+    to_date: Optional[str] = None,
+    tz: Optional[str] = Query(None, description="IANA timezone whose days from_date/to_date mean, e.g. Europe/Berlin; UTC by default"),
+    limit: int = Query(database.DEFAULT_PAGE_SIZE, ge=1, le=database.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,url,imageUrl")
 ):
     """
     Endpoint to get news articles for a specific category from the database.
     """
     if category_name.lower() not in CATEGORIES and category_name.lower() != 'top-stories':
         raise HTTPException(status_code=404, detail="Category not found.")
-    
+    from_ts, to_ts = date_range(from_date, to_date, tz)
+
     try:
-        articles = database.get_articles_by_category(
+        page = await run_in_threadpool(
+            database.get_articles_by_category,
             category=category_name.lower(), 
             sort_by=sort_by, 
-            from_date=from_date, 
-            to_date=to_date
+            limit=limit,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            cursor=cursor,
+            fields=parse_fields(fields)
         )
-        if not articles:
-             # Return empty list instead of 404, as category is valid but might have no articles yet
-            return []
-        return articles
+        # An empty list rather than 404, as the category is valid but might have no articles yet
+        return page_response(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-@app.get("/api/search", response_model=List[Dict[str, Any]])
+@app.get("/api/news/{article_id}/related", response_class=ORJSONResponse)
+async def get_related_news(
+    article_id: int,
+    # At most the number of neighbours stored per article (related.NEIGHBORS)
+    limit: int = Query(10, ge=1, le=20),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,url,score")
+):
+    """
+    Returns the articles most similar to an article by title and description,
+    best first, each with its similarity as `score`. The neighbours are
+    precomputed after every scrape (see related.py); an article stored by the
+    scrape still being indexed is a 404 for a moment.
+    """
+    # Imported here so that numpy is only loaded once the endpoint is used
+    import related
+    try:
+        articles = await run_in_threadpool(related.related_articles, article_id, limit, parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    if articles is None:
+        raise HTTPException(status_code=404, detail="Article not found or not indexed yet.")
+    return ORJSONResponse(articles)
+
+@app.get("/api/feed", response_class=ORJSONResponse)
+async def get_feed(
+    categories: Optional[str] = Query(None, description="Comma-separated categories; all of them by default"),
+    limit: int = Query(database.FEED_PAGE_SIZE, ge=1, le=database.MAX_FEED_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,url,imageUrl")
+):
+    """
+    Returns the newest `limit` articles of each requested category in one
+    response, keyed by category, so a page with many sections needs a single
+    request.
+    """
+    wanted = parse_categories(categories) or KNOWN_CATEGORIES
+    try:
+        feed = await run_in_threadpool(database.get_feed, wanted, per_category=limit, fields=parse_fields(fields))
+        return ORJSONResponse(feed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+@app.get("/api/stream")
+async def stream_articles(
+    categories: Optional[str] = Query(None, description="Comma-separated categories; all of them by default"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this article id (same as the Last-Event-ID header)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Streams newly stored articles as Server-Sent Events (`event: article`,
+    with the article id as the event id), optionally for some categories only.
+    A reconnecting EventSource sends Last-Event-ID and is first sent the
+    articles it missed; if it missed too many, it gets an `event: reset` and
+    should reload its lists.
+    """
+    wanted = parse_categories(categories)
+    resume_from = last_event_id_header or last_event_id
+    try:
+        resume_from = int(resume_from) if resume_from else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an article id.")
+    return StreamingResponse(
+        get_broadcaster().stream(wanted, resume_from),
+        media_type="text/event-stream",
+        # Tell proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/search", response_class=ORJSONResponse)
 async def search_news(
     q: str, 
     sort_by: Optional[str] = Query('publishedAt', enum=['publishedAt', 'publishedAt_asc', 'relevancy']),
     from_date: Optional[str] = None,
-    to_date: Optional[str] = None
+    to_date: Optional[str] = None,
+    tz: Optional[str] = Query(None, description="IANA timezone whose days from_date/to_date mean, e.g. Europe/Berlin; UTC by default"),
+    limit: int = Query(database.DEFAULT_PAGE_SIZE, ge=1, le=database.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,url,imageUrl")
 ):
     """
     Endpoint to search for news articles by a query string from the database.
     """
     if not q:
         raise HTTPException(status_code=400, detail="Search query cannot be empty.")
+    from_ts, to_ts = date_range(from_date, to_date, tz)
     try:
-        articles = database.search_articles(
+        page = await run_in_threadpool(
+            database.search_articles,
             query=q, 
             sort_by=sort_by,
-            from_date=from_date,
-            to_date=to_date
+            limit=limit,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            cursor=cursor,
+            fields=parse_fields(fields)
         )
-        return articles
+        return page_response(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
@@ -112,24 +398,101 @@ async def get_categories():
     all_categories = ["top-stories"] + list(CATEGORIES.keys())
     return {"categories": sorted(list(set(all_categories)))}
 
+@app.get("/api/stats")
+async def get_stats(
+    days: int = Query(stats.DEFAULT_DAYS, ge=1, le=stats.MAX_DAYS),
+    category: Optional[str] = None
+):
+    """
+    Returns article counts per category and per day with their AI-categorized
+    share, read from the incrementally maintained article_stats table.
+    """
+    try:
+        return await run_in_threadpool(stats.get_stats, days=days, category=category.lower() if category else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+def request_scrape(sections: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Starts or joins a scrape of `sections` (all of them if None) in the writer
+    worker: directly if that is this worker, otherwise through its queue.
+    Raises ValueError for unknown sections.
+    """
+    scheduler = get_scheduler()
+    if get_coordinator().is_writer:
+        return scheduler.trigger(sections)
+    unknown = set(sections or ()) - set(scheduler.sections)
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+    return get_coordinator().forward_scrape(sections)
+
 @app.post("/api/scrape-and-categorize", status_code=202)
 async def trigger_scrape_and_categorize():
     """
-    Triggers a new background scrape of all categories.
+    Triggers a background scrape of all categories. If a full scrape is
+    already running, the request joins it instead of starting another.
     """
     print("Scrape and categorize endpoint triggered.")
-    run_scrape_in_background()
-    return {"message": "Scraping and categorization process initiated in the background."}
+    result = await run_in_threadpool(request_scrape)
+    return {"message": "Scraping and categorization process initiated in the background.", **result}
+
+@app.post("/api/scrape/{category}", status_code=202)
+async def trigger_category_scrape(category: str):
+    """
+    Refreshes a single category (or 'top-stories') without a full scrape.
+    """
+    try:
+        result = await run_in_threadpool(request_scrape, [category])
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Unknown category: {category}")
+    return {"message": f"Refresh of '{category}' initiated in the background.", **result}
+
+@app.get("/api/scrape/status")
+async def scrape_status():
+    """
+    Returns the running and last scrape, queued sections, and each section's
+    adaptive refresh interval. Only the writer worker runs scrapes; the
+    others report just which worker that is.
+    """
+    coordinator = get_coordinator()
+    if not coordinator.is_writer:
+        return {"worker": coordinator.status()}
+    return {**get_scheduler().status(), "worker": coordinator.status()}
+
+@app.get("/api/retention/status")
+async def retention_status():
+    """
+    Returns the hot window, how far articles have been archived, and the last
+    retention run.
+    """
+    return await run_in_threadpool(get_retention_job().status)
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """
+    Returns response cache hit/miss counters.
+    """
+    return {**response_cache.stats(), "data_generation": database.get_data_generation()}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Exposes API, database, scrape and OpenAI metrics in the Prometheus text format.
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
 
 @app.get("/api/ai-status")
 async def ai_status():
     """
-    Checks if the AI categorizer is properly configured.
+    Reports the AI categorizer's last known health without waiting on the
+    network; a stale result triggers a background re-check.
     """
-    ai_categorizer = get_ai_categorizer()
-    is_configured = ai_categorizer is not None and ai_categorizer.is_configured()
-    return {"is_configured": is_configured}
+    health = ai_health_status()
+    return {"is_configured": bool(health["healthy"]), "health": health, "cache": get_categorization_cache().stats()}
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # Live streams never end on their own, so don't wait on them for long at shutdown.
+    # With API_WORKERS > 1, one worker scrapes and the others only serve reads (see workers.py).
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("API_WORKERS", "1")),
+                timeout_graceful_shutdown=5) 
\ No newline at end of file
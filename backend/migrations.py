@@ -0,0 +1,317 @@
+"""
+Versioned schema migrations for news.db.
+
+The schema version lives in SQLite's `PRAGMA user_version`. Each function in
+MIGRATIONS upgrades the schema by one version; its position in the list (1-based)
+is the version it migrates to. To change the schema, append a new function --
+never edit or reorder one that has already shipped, since existing databases
+have already applied it.
+"""
+import datetime
+import hashlib
+import math
+import sqlite3
+from typing import Callable, List, Optional
+
+from near_duplicates import headline_band_keys
+
+
+def url_hash(url: str) -> int:
+    """
+    The 64-bit value stored in articles.url_hash: the first 8 bytes of the URL's
+    BLAKE2b digest as a signed integer, so it fits SQLite's INTEGER type.
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def epoch_seconds(published_at: Optional[str]) -> Optional[int]:
+    """
+    The value stored in articles.published_ts: an ISO 8601 publishedAt as Unix
+    seconds, with timestamps that carry no offset taken as UTC. None if it
+    cannot be parsed.
+    """
+    try:
+        moment = datetime.datetime.fromisoformat(published_at)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return math.floor(moment.timestamp())
+
+
+def create_articles_table(conn: sqlite3.Connection):
+    """Create the articles table."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            url TEXT NOT NULL UNIQUE,
+            source TEXT,
+            category TEXT,
+            imageUrl TEXT,
+            description TEXT,
+            publishedAt TEXT NOT NULL,
+            ai_categorized BOOLEAN DEFAULT 0
+        )
+    ''')
+
+
+def add_list_indexes(conn: sqlite3.Connection):
+    """Index every sort and filter used by the list endpoints."""
+    # Keyset pagination seeks on (sort key, id); id is the rowid, which SQLite
+    # appends to every index, so these cover each list query's ORDER BY.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (publishedAt)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_category_published ON articles (category, publishedAt)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_title ON articles (title)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_category_title ON articles (category, title)")
+
+
+def add_search_index(conn: sqlite3.Connection):
+    """Add the FTS5 search index and the triggers that keep it in sync."""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title,
+            description,
+            content='articles',
+            content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, description ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO articles_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    # Backfill rows that were inserted before the index existed
+    conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+def add_page_validators(conn: sqlite3.Connection):
+    """Add the page_validators table used for conditional GETs of listing pages."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_validators (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            link_hash TEXT,
+            checked_at TEXT NOT NULL
+        )
+    ''')
+
+
+def add_url_hash(conn: sqlite3.Connection):
+    """Add the compact url_hash column and index used for bulk known-URL lookups."""
+    conn.execute("ALTER TABLE articles ADD COLUMN url_hash INTEGER")
+    conn.create_function("url_hash", 1, url_hash, deterministic=True)
+    conn.execute("UPDATE articles SET url_hash = url_hash(url)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_url_hash ON articles (url_hash)")
+
+
+def add_categorization_cache(conn: sqlite3.Connection):
+    """Add the categorization_cache table that remembers AI categorization answers."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categorization_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_categorization_cache_created ON categorization_cache (created_at)")
+
+
+# The UTC calendar day of an article, as used by article_stats
+STATS_DAY = "substr({0}.publishedAt, 1, 10)"
+STATS_CATEGORY = "coalesce({0}.category, 'uncategorized')"
+
+
+def rebuild_article_stats(conn: sqlite3.Connection):
+    """Recomputes article_stats from scratch from the articles table."""
+    conn.execute("DELETE FROM article_stats")
+    conn.execute(f'''
+        INSERT INTO article_stats (category, day, articles, ai_categorized)
+        SELECT {STATS_CATEGORY.format('a')}, {STATS_DAY.format('a')}, COUNT(*), COALESCE(SUM(a.ai_categorized), 0)
+        FROM articles a
+        GROUP BY 1, 2
+    ''')
+
+
+def _stats_delta(row: str, sign: str) -> str:
+    """Trigger statements adding (sign '+') or removing (sign '-') one article row to article_stats."""
+    category, day = STATS_CATEGORY.format(row), STATS_DAY.format(row)
+    ai = f"coalesce({row}.ai_categorized, 0)"
+    if sign == '+':
+        return f'''
+            INSERT INTO article_stats (category, day, articles, ai_categorized) VALUES ({category}, {day}, 1, {ai})
+            ON CONFLICT (category, day) DO UPDATE SET articles = articles + 1, ai_categorized = ai_categorized + excluded.ai_categorized;
+        '''
+    return f'''
+        UPDATE article_stats SET articles = articles - 1, ai_categorized = ai_categorized - {ai}
+        WHERE category = {category} AND day = {day};
+        DELETE FROM article_stats WHERE category = {category} AND day = {day} AND articles <= 0;
+    '''
+
+
+def add_article_stats(conn: sqlite3.Connection):
+    """Add the article_stats summary table and the triggers that keep it in sync."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS article_stats (
+            category TEXT NOT NULL,
+            day TEXT NOT NULL,
+            articles INTEGER NOT NULL,
+            ai_categorized INTEGER NOT NULL,
+            PRIMARY KEY (category, day)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_article_stats_day ON article_stats (day)")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS article_stats_insert AFTER INSERT ON articles BEGIN {_stats_delta('new', '+')} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS article_stats_delete AFTER DELETE ON articles BEGIN {_stats_delta('old', '-')} END")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS article_stats_update AFTER UPDATE OF category, publishedAt, ai_categorized ON articles BEGIN
+            {_stats_delta('old', '-')}
+            {_stats_delta('new', '+')}
+        END
+    ''')
+    rebuild_article_stats(conn)
+
+
+def add_near_duplicate_index(conn: sqlite3.Connection):
+    """Add the title_bands LSH index and the article_aliases table for near-duplicate stories."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS title_bands (
+            band_key INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            PRIMARY KEY (band_key, article_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_title_bands_article ON title_bands (article_id)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS article_aliases (
+            url TEXT PRIMARY KEY,
+            url_hash INTEGER NOT NULL,
+            canonical_id INTEGER NOT NULL,
+            similarity REAL NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_article_aliases_url_hash ON article_aliases (url_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_article_aliases_canonical ON article_aliases (canonical_id)")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS title_bands_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM title_bands WHERE article_id = old.id;
+            DELETE FROM article_aliases WHERE canonical_id = old.id;
+        END
+    ''')
+    # Band keys are computed in Python, so existing articles are indexed here and new ones by add_article_batch
+    rows = conn.execute("SELECT id, title FROM articles").fetchall()
+    conn.executemany(
+        "INSERT OR IGNORE INTO title_bands (band_key, article_id) VALUES (?, ?)",
+        ((key, article_id) for article_id, title in rows for key in headline_band_keys(title)),
+    )
+
+
+def add_retention_state(conn: sqlite3.Connection):
+    """Add the retention_state table recording how far articles have been moved to the archive."""
+    # Empty until retention.py first archives something; then holds a single row
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS retention_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            archived_before TEXT NOT NULL,
+            last_run_at TEXT NOT NULL
+        )
+    ''')
+
+
+def add_scrape_requests(conn: sqlite3.Connection):
+    """Add the scrape_requests queue through which API workers ask the writer worker for scrapes."""
+    # sections is a comma-separated list, or NULL for a full scrape
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_requests (
+            id INTEGER PRIMARY KEY,
+            sections TEXT,
+            requested_at TEXT NOT NULL
+        )
+    ''')
+
+
+def add_published_ts(conn: sqlite3.Connection):
+    """Add the integer published_ts column that date filters and date sorts use, replacing the publishedAt indexes."""
+    conn.execute("ALTER TABLE articles ADD COLUMN published_ts INTEGER")
+    conn.create_function("epoch_seconds", 1, epoch_seconds, deterministic=True)
+    conn.execute("UPDATE articles SET published_ts = epoch_seconds(publishedAt)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published_ts ON articles (published_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_category_published_ts ON articles (category, published_ts)")
+    conn.execute("DROP INDEX IF EXISTS idx_articles_published")
+    conn.execute("DROP INDEX IF EXISTS idx_articles_category_published")
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    create_articles_table,
+    add_list_indexes,
+    add_search_index,
+    add_page_validators,
+    add_url_hash,
+    add_categorization_cache,
+    add_article_stats,
+    add_near_duplicate_index,
+    add_retention_state,
+    add_scrape_requests,
+    add_published_ts,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Applies every migration newer than the database's user_version, each in its
+    own transaction, then refreshes the query planner statistics. Several API
+    workers may start at once: each migration takes the write lock first and
+    is skipped if another process applied it in the meantime.
+
+    Returns the number of migrations applied.
+    """
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this code supports ({SCHEMA_VERSION})."
+        )
+
+    applied = 0
+    for version, migration in list(enumerate(MIGRATIONS, start=1))[current:]:
+        conn.execute("BEGIN IMMEDIATE")
+        if get_schema_version(conn) >= version:
+            conn.rollback()
+            continue
+        print(f"Applying migration {version}: {migration.__doc__}")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+
+    if applied:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return applied
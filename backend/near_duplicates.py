@@ -0,0 +1,115 @@
+"""
+Near-duplicate headline detection with MinHash and LSH banding.
+
+The same story often appears on several sections, or is re-published under a
+slightly different URL or headline. Each headline is reduced to its set of
+normalized words (stop words dropped), and two headlines count as the same
+story when the Jaccard similarity of those sets is at least THRESHOLD.
+
+To find candidates without comparing against every stored article, each
+headline gets a MinHash signature of BANDS * ROWS values, cut into BANDS
+bands; every band is hashed into one 64-bit key, stored in the title_bands
+table (see database.find_near_duplicate). Headlines that share any band key
+are candidates, and their exact Jaccard similarity decides. With 8 bands of 3
+rows, a pair at similarity 0.7 shares a band with probability ~0.97, and a
+pair at 0.3 with ~0.2, so lookups touch only a few buckets however many
+articles are stored.
+"""
+import hashlib
+import random
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+BANDS = 8
+ROWS = 3
+THRESHOLD = 0.7
+# Headlines with fewer distinct words than this are too generic to match
+MIN_TOKENS = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(BANDS * ROWS)]
+
+_WORD = re.compile(r"\w+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have he her his how in into is it its of on or our over s says she "
+    "than that the their they this to up was we were what when who why will with you your".split()
+)
+
+
+def tokens(headline: Optional[str]) -> FrozenSet[str]:
+    """The normalized words of a headline that take part in matching."""
+    text = unicodedata.normalize("NFKC", headline or "").casefold()
+    return frozenset(word for word in _WORD.findall(text) if word not in STOP_WORDS and len(word) > 1)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+def signature(words: Iterable[str]) -> List[int]:
+    """The MinHash signature of a token set: the minimum of each permuted hash."""
+    hashes = [_token_hash(word) for word in words]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(words: FrozenSet[str]) -> List[int]:
+    """
+    One signed 64-bit key per LSH band (the type SQLite stores), or none for
+    headlines too short to match.
+    """
+    if len(words) < MIN_TOKENS:
+        return []
+    values = signature(words)
+    keys = []
+    for band in range(BANDS):
+        chunk = ",".join(map(str, values[band * ROWS:(band + 1) * ROWS]))
+        digest = hashlib.blake2b(f"{band}:{chunk}".encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def headline_band_keys(headline: Optional[str]) -> List[int]:
+    return band_keys(tokens(headline))
+
+
+class PendingIndex:
+    """
+    In-memory LSH index of headlines claimed earlier in the same scrape,
+    which may not have been written to the database yet.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, List[Tuple[str, FrozenSet[str]]]] = {}
+        self._released: Set[str] = set()
+
+    def add(self, url: str, words: FrozenSet[str], keys: List[int]):
+        for key in keys:
+            self._buckets.setdefault(key, []).append((url, words))
+
+    def release(self, url: str):
+        """Withdraws a claimed headline whose article was not stored, so nothing more matches it."""
+        self._released.add(url)
+
+    def released(self, url: str) -> bool:
+        return url in self._released
+
+    def find(self, words: FrozenSet[str], keys: List[int]) -> Optional[Tuple[str, float]]:
+        """The most similar claimed headline at or above THRESHOLD, as (url, similarity)."""
+        best = None
+        seen: Set[str] = set()
+        for key in keys:
+            for url, candidate in self._buckets.get(key, ()):
+                if url in seen or url in self._released:
+                    continue
+                seen.add(url)
+                similarity = jaccard(words, candidate)
+                if similarity >= THRESHOLD and (best is None or similarity > best[1]):
+                    best = (url, similarity)
+        return best
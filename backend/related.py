@@ -0,0 +1,376 @@
+"""
+Related articles ("more like this") from precomputed nearest neighbours.
+
+Each article's title and description are turned into TF-IDF weighted
+unigrams and bigrams (the terms local_classifier uses), hashed into
+DIMENSIONS signed buckets and L2-normalized, so the cosine similarity of two
+articles is the dot product of their vectors. The vectors are stored as a
+float16 matrix on disk, and each article's NEIGHBORS most similar articles
+are worked out ahead of time, so a lookup is a binary search for the
+article's row and one read of its neighbour list.
+
+update() indexes the articles stored since the last update; the scraper calls
+it after every scrape. Each batch of new vectors is multiplied with the
+indexed ones CHUNK_ROWS rows at a time. The same product gives the new
+articles' neighbours and tells which existing articles should list a new
+one among theirs. Memory use depends on the batch and chunk sizes, not on
+how many articles are indexed. IDF weights use the document frequencies at
+the time an article is indexed; `python related.py rebuild` recomputes them
+all.
+
+The index is a directory next to the database (news.db -> news.related/):
+
+- ids.i64: the article id of each row, ascending
+- vectors.f16: one DIMENSIONS-wide vector per row
+- neighbors.i32, scores.f16: each row's NEIGHBORS neighbour rows (-1 for
+  none) and their similarities, best first
+- df.i32: the document frequency of each hashed term
+- state.json: how many rows are complete, and the last indexed article id
+
+The files are memory-mapped, so API workers share them through the page
+cache. Rows are appended before state.json is replaced, and readers only map
+the rows it counts. Only the writer worker (see workers.py) updates the
+index.
+
+From the backend directory:
+    python related.py status
+    python related.py rebuild
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import database
+from local_classifier import article_text, tokenize
+
+DIMENSIONS = 512
+NEIGHBORS = 20
+# Hash collisions add noise of about 1/sqrt(DIMENSIONS) to every similarity,
+# so weaker neighbours are mostly noise and are not returned
+MIN_SCORE = 0.2
+DF_BUCKETS = 1 << 20
+# New articles vectorized per batch, and indexed rows multiplied with them at a time
+UPDATE_BATCH = 512
+CHUNK_ROWS = 8192
+DEFAULT_LIMIT = 10
+
+FILES = ("ids.i64", "vectors.f16", "neighbors.i32", "scores.f16", "df.i32", "state.json")
+
+
+def index_dir(db_file: Optional[str] = None) -> str:
+    """The related-articles index directory for `db_file` (news.db -> news.related)."""
+    root, _ = os.path.splitext(db_file or database.DB_FILE)
+    return f"{root}.related"
+
+
+def hashed_terms(text: str) -> Counter:
+    """Counts of the terms of `text`, keyed by their 32-bit hashes."""
+    return Counter(zlib.crc32(term.encode()) for term in tokenize(text))
+
+
+def vectorize(counts: Sequence[Counter], df: np.ndarray, documents: int) -> np.ndarray:
+    """
+    L2-normalized TF-IDF vectors, one row per text. The low bits of a term's
+    hash pick its document frequency bucket and sign, the high bits its
+    dimension.
+    """
+    rows = np.repeat(np.arange(len(counts)), [len(counter) for counter in counts])
+    hashes = np.fromiter((h for counter in counts for h in counter), dtype=np.uint32, count=len(rows))
+    tf = 1.0 + np.log(np.fromiter((c for counter in counts for c in counter.values()), dtype=np.float32, count=len(rows)))
+    idf = np.log((1.0 + documents) / (1.0 + df[hashes & (DF_BUCKETS - 1)])) + 1.0
+    signs = np.where(hashes & 1, -1.0, 1.0)
+    vectors = np.zeros((len(counts), DIMENSIONS), dtype=np.float32)
+    np.add.at(vectors, (rows, (hashes >> 20) % DIMENSIONS), signs * tf * idf)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def merge_top(rows: np.ndarray, scores: np.ndarray, candidate_rows: np.ndarray,
+              candidate_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merges each line's current neighbours with its candidates (candidate_rows
+    is broadcast to candidate_scores' shape) and keeps the NEIGHBORS best,
+    best first.
+    """
+    rows = np.concatenate([rows, np.broadcast_to(candidate_rows, candidate_scores.shape)], axis=1)
+    scores = np.concatenate([scores, candidate_scores], axis=1)
+    if scores.shape[1] > NEIGHBORS:
+        top = np.argpartition(-scores, NEIGHBORS - 1, axis=1)[:, :NEIGHBORS]
+        rows, scores = np.take_along_axis(rows, top, axis=1), np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+class RelatedIndex:
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._view: Optional[Dict[str, Any]] = None
+        self._view_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return self._directory or index_dir()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path("state.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_state(self, state: Dict[str, Any]):
+        temporary = self._path("state.json.tmp")
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self._path("state.json"))
+
+    # --- Lookups ---
+
+    def _current_view(self) -> Optional[Dict[str, Any]]:
+        """Memory maps of the complete rows, reopened whenever state.json has been replaced."""
+        try:
+            stat = os.stat(self._path("state.json"))
+        except OSError:
+            return None
+        version = (stat.st_ino, stat.st_mtime_ns)
+        with self._view_lock:
+            if self._view is None or self._view["version"] != version:
+                state = self._read_state()
+                rows = state["rows"] if state else 0
+                self._view = {"version": version, "rows": rows}
+                if rows:
+                    self._view.update(
+                        ids=np.memmap(self._path("ids.i64"), dtype=np.int64, mode="r", shape=(rows,)),
+                        neighbors=np.memmap(self._path("neighbors.i32"), dtype=np.int32, mode="r", shape=(rows, state["neighbors"])),
+                        scores=np.memmap(self._path("scores.f16"), dtype=np.float16, mode="r", shape=(rows, state["neighbors"])),
+                    )
+            return self._view
+
+    def related(self, article_id: int, limit: int = DEFAULT_LIMIT) -> Optional[List[Tuple[int, float]]]:
+        """
+        Up to `limit` (article id, similarity) pairs for the articles most
+        similar to `article_id`, best first, or None if it is not indexed.
+        Only similarities of at least MIN_SCORE count.
+        """
+        view = self._current_view()
+        if view is None or not view["rows"]:
+            return None
+        ids = view["ids"]
+        row = int(np.searchsorted(ids, article_id))
+        if row >= view["rows"] or ids[row] != article_id:
+            return None
+        neighbors = np.array(view["neighbors"][row])
+        scores = np.array(view["scores"][row], dtype=np.float32)
+        # Rows past the complete ones belong to an update still being written
+        keep = (neighbors >= 0) & (neighbors < view["rows"]) & (scores >= MIN_SCORE)
+        return list(zip(ids[neighbors[keep][:limit]].tolist(), scores[keep][:limit].tolist()))
+
+    # --- Updates ---
+
+    def _reset(self) -> Dict[str, Any]:
+        """Starts an empty index. Files are unlinked rather than truncated, since other workers may have them mapped."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in FILES:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+        for name in FILES[:4]:
+            open(self._path(name), "wb").close()
+        np.zeros(DF_BUCKETS, dtype=np.int32).tofile(self._path("df.i32"))
+        state = {"rows": 0, "last_id": 0, "documents": 0, "dimensions": DIMENSIONS, "neighbors": NEIGHBORS}
+        self._write_state(state)
+        return state
+
+    def _open_state(self) -> Dict[str, Any]:
+        """
+        The index state, after checking the files against it. Rows appended by
+        an update that never replaced state.json are cut off, and neighbour
+        entries pointing at them cleared. An index built with other settings,
+        or with rows missing, is started again.
+        """
+        state = self._read_state()
+        if state is None or state.get("dimensions") != DIMENSIONS or state.get("neighbors") != NEIGHBORS:
+            return self._reset()
+        rows = state["rows"]
+        sizes = {"ids.i64": 8, "vectors.f16": 2 * DIMENSIONS, "neighbors.i32": 4 * NEIGHBORS, "scores.f16": 2 * NEIGHBORS}
+        try:
+            lengths = {name: os.path.getsize(self._path(name)) for name in sizes}
+            df_ok = os.path.getsize(self._path("df.i32")) == 4 * DF_BUCKETS
+        except OSError:
+            return self._reset()
+        if not df_ok or any(lengths[name] < rows * size for name, size in sizes.items()):
+            print("Related-articles index is incomplete; rebuilding it.")
+            return self._reset()
+        if any(lengths[name] > rows * size for name, size in sizes.items()):
+            # Safe while other workers have the files mapped: they only map the first `rows` rows
+            for name, size in sizes.items():
+                os.truncate(self._path(name), rows * size)
+            if rows:
+                neighbors = np.memmap(self._path("neighbors.i32"), dtype=np.int32, mode="r+", shape=(rows, NEIGHBORS))
+                scores = np.memmap(self._path("scores.f16"), dtype=np.float16, mode="r+", shape=(rows, NEIGHBORS))
+                for start in range(0, rows, CHUNK_ROWS):
+                    stale = neighbors[start:start + CHUNK_ROWS] >= rows
+                    neighbors[start:start + CHUNK_ROWS][stale] = -1
+                    scores[start:start + CHUNK_ROWS][stale] = -np.inf
+                neighbors.flush()
+                scores.flush()
+        return state
+
+    def _add_batch(self, state: Dict[str, Any], df: np.ndarray, ids: List[int], texts: List[str]):
+        counts = [hashed_terms(text) for text in texts]
+        np.add.at(df, np.fromiter((h & (DF_BUCKETS - 1) for counter in counts for h in counter), dtype=np.int64), 1)
+        state["documents"] += len(texts)
+        # Compare in the precision the vectors are stored in
+        new = vectorize(counts, df, state["documents"]).astype(np.float16)
+        new32 = new.astype(np.float32)
+        count, existing = len(ids), state["rows"]
+        new_rows = np.arange(existing, existing + count, dtype=np.int32)
+
+        best_rows = np.full((count, NEIGHBORS), -1, dtype=np.int32)
+        best_scores = np.full((count, NEIGHBORS), -np.inf, dtype=np.float32)
+        if existing:
+            vectors = np.memmap(self._path("vectors.f16"), dtype=np.float16, mode="r", shape=(existing, DIMENSIONS))
+            neighbors = np.memmap(self._path("neighbors.i32"), dtype=np.int32, mode="r+", shape=(existing, NEIGHBORS))
+            scores = np.memmap(self._path("scores.f16"), dtype=np.float16, mode="r+", shape=(existing, NEIGHBORS))
+            for start in range(0, existing, CHUNK_ROWS):
+                stop = min(existing, start + CHUNK_ROWS)
+                similarity = np.asarray(vectors[start:stop], dtype=np.float32) @ new32.T
+                best_rows, best_scores = merge_top(best_rows, best_scores, np.arange(start, stop, dtype=np.int32), similarity.T)
+                # Existing articles that one of the new ones beats their weakest neighbour
+                chunk_scores = np.asarray(scores[start:stop], dtype=np.float32)
+                improved = np.flatnonzero(similarity.max(axis=1) > chunk_scores[:, -1])
+                if improved.size:
+                    merged_rows, merged_scores = merge_top(
+                        np.asarray(neighbors[start:stop])[improved], chunk_scores[improved], new_rows, similarity[improved]
+                    )
+                    neighbors[start + improved] = merged_rows
+                    scores[start + improved] = merged_scores
+            neighbors.flush()
+            scores.flush()
+
+        within = new32 @ new32.T
+        np.fill_diagonal(within, -np.inf)
+        best_rows, best_scores = merge_top(best_rows, best_scores, new_rows, within)
+
+        for name, values in (("ids.i64", np.asarray(ids, dtype=np.int64)), ("vectors.f16", new),
+                             ("neighbors.i32", best_rows), ("scores.f16", best_scores.astype(np.float16))):
+            with open(self._path(name), "ab") as f:
+                f.write(values.tobytes())
+        df.flush()
+        state["rows"] += count
+        state["last_id"] = ids[-1]
+        self._write_state(state)
+
+    def _articles_after(self, conn, after_id: int) -> List[Tuple[int, str]]:
+        """The next UPDATE_BATCH articles above `after_id`, oldest first, from both tiers."""
+        schemas = ["main"]
+        if database.get_archive_boundary(conn) is not None:
+            database.attach_archive(conn)
+            schemas.append("archive")
+        union = " UNION ALL ".join(
+            f"SELECT * FROM (SELECT id, title, description FROM {schema}.articles WHERE id > ? ORDER BY id LIMIT ?)"
+            for schema in schemas
+        )
+        rows = conn.execute(f"{union} ORDER BY id LIMIT ?", [after_id, UPDATE_BATCH] * len(schemas) + [UPDATE_BATCH]).fetchall()
+        return [(row["id"], article_text(row["title"], row["description"])) for row in rows]
+
+    def update(self, conn=None) -> int:
+        """Indexes every article stored since the last update. Returns how many were added."""
+        with self._update_lock:
+            state = self._open_state()
+            own_connection = conn is None
+            conn = conn or database.get_db_connection()
+            added = 0
+            try:
+                df = np.memmap(self._path("df.i32"), dtype=np.int32, mode="r+", shape=(DF_BUCKETS,))
+                while True:
+                    batch = self._articles_after(conn, state["last_id"])
+                    if not batch:
+                        break
+                    self._add_batch(state, df, [article_id for article_id, _ in batch], [text for _, text in batch])
+                    added += len(batch)
+            finally:
+                if own_connection:
+                    conn.close()
+            return added
+
+    def rebuild(self, conn=None) -> int:
+        """Indexes every stored article from scratch. Returns how many were indexed."""
+        with self._update_lock:
+            self._reset()
+        return self.update(conn)
+
+    def status(self) -> Dict[str, Any]:
+        state = self._read_state() or {}
+        try:
+            size = sum(os.path.getsize(self._path(name)) for name in FILES)
+        except OSError:
+            size = None
+        return {"directory": self.directory, "rows": state.get("rows", 0), "last_id": state.get("last_id", 0),
+                "dimensions": state.get("dimensions"), "neighbors": state.get("neighbors"), "bytes": size}
+
+
+def related_articles(article_id: int, limit: int = DEFAULT_LIMIT,
+                     fields: Optional[Sequence[str]] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    The articles most similar to `article_id`, best first, each with its
+    similarity as 'score', or None if the article is not indexed (yet).
+    `fields` works as in database.get_articles and may also name 'score'.
+    Raises ValueError for unknown fields.
+    """
+    neighbours = get_related_index().related(article_id, limit)
+    if neighbours is None:
+        return None
+    wanted = list(fields) if fields else None
+    article_fields = [field for field in wanted if field != "score"] if wanted else None
+    found = database.get_articles_by_ids([neighbour for neighbour, _ in neighbours], article_fields or ["id"])
+    articles = []
+    for neighbour, score in neighbours:
+        article = found.get(neighbour)
+        if article is None:
+            continue  # deleted since it was indexed
+        article["score"] = round(score, 4)
+        articles.append({field: article[field] for field in wanted} if wanted else article)
+    return articles
+
+
+# Global instance
+related_index_instance = None
+
+def get_related_index() -> RelatedIndex:
+    """Get the related-articles index of database.DB_FILE."""
+    global related_index_instance
+    if related_index_instance is None:
+        related_index_instance = RelatedIndex()
+    return related_index_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the related-articles index.")
+    parser.add_argument("command", choices=["status", "rebuild"])
+    parser.add_argument("--db", default=database.DB_FILE, help="database whose index to use")
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    index = get_related_index()
+    if args.command == "rebuild":
+        started = time.perf_counter()
+        indexed = index.rebuild()
+        print(f"Indexed {indexed} articles in {time.perf_counter() - started:.1f}s.")
+    print(json.dumps(index.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
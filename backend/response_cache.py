@@ -0,0 +1,123 @@
+"""
+In-process LRU cache for read-only API responses.
+
+Cached bodies are keyed by path and query string and tagged with the database
+data generation they were built from (see database.get_data_generation). When a
+scrape commits new articles the generation moves on and every older entry
+becomes a miss, so nothing is ever served stale and no explicit purge is needed.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from compression import MIN_SIZE, compress
+
+# Maximum number of distinct responses kept in memory
+MAX_ENTRIES = 512
+
+
+class CachedResponse(NamedTuple):
+    generation: int
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    # Compressed bodies and their ETags, by Content-Encoding, built on first request
+    variants: Dict[str, Tuple[bytes, str]]
+
+    def encoded(self, encoding: Optional[str]) -> Tuple[bytes, str, Optional[str]]:
+        """
+        The body, ETag and Content-Encoding to send for the negotiated
+        `encoding`. Small bodies are always sent uncompressed.
+        """
+        if encoding is None or len(self.body) < MIN_SIZE:
+            return self.body, self.etag, None
+        variant = self.variants.get(encoding)
+        if variant is None:
+            # Each representation needs its own strong ETag
+            variant = (compress(self.body, encoding), self.etag[:-1] + f'-{encoding}"')
+            self.variants[encoding] = variant
+        return variant[0], variant[1], encoding
+
+
+def make_etag(body: bytes) -> str:
+    """A strong ETag derived from the exact response bytes."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Implements the (weak) comparison If-None-Match uses, including '*' and lists of tags."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """A thread-safe LRU of CachedResponse objects with hit/miss counters."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(path: str, query_items: Iterable[Tuple[str, str]]) -> Tuple:
+        # Parameter order does not change the response, so it must not change the key
+        return (path, tuple(sorted(query_items)))
+
+    def get(self, key: Tuple, generation: int) -> Optional[CachedResponse]:
+        """Returns the cached response if it was built from the current data generation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, generation: int, body: bytes, headers: Dict[str, str]) -> CachedResponse:
+        entry = CachedResponse(generation, body, make_etag(body), headers, {})
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cacheable_headers(raw_headers: List[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    """Keeps the headers worth replaying from a cached response (the length is recomputed)."""
+    skipped = {"content-length", "etag"}
+    return {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in raw_headers
+        if name.decode("latin-1").lower() not in skipped
+    }
@@ -0,0 +1,336 @@
+"""
+Retention tiers: keeps news.db down to the articles the API actually serves.
+
+news.db is the hot tier and holds the last HOT_DAYS days of articles. Older
+articles are moved in batches of BATCH_SIZE into an archive database next to
+it (news.archive.db, see database.archive_file). The archive has the same
+columns, indexes and full-text index. The pages the moved articles leave
+behind are handed back to the file system with PRAGMA incremental_vacuum, so
+list queries, searches and backups of news.db only pay for recent data.
+
+retention_state records the archive boundary. List and search queries whose
+from_date reaches back past it read both tiers (see database._tiers);
+everything else reads the hot tier only. Each batch is committed to the
+archive before it is deleted from news.db, so a crash can leave a batch in
+both tiers until the next run (which skips rows already copied), but never in
+neither.
+
+Every batch is its own short transaction and readers use WAL snapshots, so
+the API keeps serving while a run is in progress. RetentionJob runs
+archive_old_articles every RUN_INTERVAL seconds on a background thread; to
+run it once by hand:
+
+    python retention.py run
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import database
+from metrics import Counter
+from migrations import STATS_CATEGORY, STATS_DAY, epoch_seconds
+
+# Articles published within this many days stay in news.db
+HOT_DAYS = int(os.getenv("RETENTION_HOT_DAYS", "90"))
+# Seconds between scheduled runs, and before the first one after startup
+RUN_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "21600"))
+FIRST_RUN_DELAY = 60.0
+# Articles moved per transaction, and the pause between batches that lets the scraper's writes in
+BATCH_SIZE = 1000
+BATCH_PAUSE = 0.05
+# Free pages returned to the file system per incremental_vacuum transaction
+VACUUM_STEP_PAGES = 2000
+
+ARCHIVE_COLUMNS = "id, title, url, url_hash, source, category, imageUrl, description, publishedAt, published_ts, ai_categorized"
+ALIAS_COLUMNS = "url, url_hash, canonical_id, similarity, created_at"
+
+# The archive mirrors the hot tables the read queries use. Its FTS index is
+# kept in sync by the same triggers as the hot one.
+ARCHIVE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS archive.articles (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        url TEXT NOT NULL UNIQUE,
+        url_hash INTEGER,
+        source TEXT,
+        category TEXT,
+        imageUrl TEXT,
+        description TEXT,
+        publishedAt TEXT NOT NULL,
+        ai_categorized BOOLEAN DEFAULT 0,
+        published_ts INTEGER
+    )
+'''
+ARCHIVE_SCHEMA = (
+    "CREATE INDEX IF NOT EXISTS archive.idx_articles_published_ts ON articles (published_ts)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_articles_category_published_ts ON articles (category, published_ts)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_articles_title ON articles (title)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_articles_category_title ON articles (category, title)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_articles_url_hash ON articles (url_hash)",
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS archive.articles_fts USING fts5(
+        title,
+        description,
+        content='articles',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS archive.articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS archive.articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (articles_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS archive.article_aliases (
+        url TEXT PRIMARY KEY,
+        url_hash INTEGER NOT NULL,
+        canonical_id INTEGER NOT NULL,
+        similarity REAL NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS archive.idx_article_aliases_url_hash ON article_aliases (url_hash)",
+)
+
+ARTICLES_ARCHIVED = Counter("articles_archived_total", "Articles moved from news.db to the archive database.")
+
+
+def ensure_archive(conn: sqlite3.Connection):
+    """Attaches the archive database to `conn`, creating its schema if needed."""
+    database.attach_archive(conn)
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    conn.execute(ARCHIVE_TABLE)
+    if conn.execute("SELECT 1 FROM archive.pragma_table_info('articles') WHERE name = 'published_ts'").fetchone() is None:
+        # Archived before published_ts existed: backfill it as migrations.add_published_ts does for news.db
+        conn.execute("ALTER TABLE archive.articles ADD COLUMN published_ts INTEGER")
+        conn.create_function("epoch_seconds", 1, epoch_seconds, deterministic=True)
+        conn.execute("UPDATE archive.articles SET published_ts = epoch_seconds(publishedAt)")
+        conn.execute("DROP INDEX IF EXISTS archive.idx_articles_published")
+        conn.execute("DROP INDEX IF EXISTS archive.idx_articles_category_published")
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+
+
+def add_archive_stats(conn: sqlite3.Connection, ids: Optional[List[int]] = None):
+    """
+    Adds archived articles (those in `ids`, or all of them) back into
+    article_stats, which counts both tiers. Deleting them from the hot table
+    has just subtracted them through its triggers.
+    """
+    id_filter = f"a.id IN ({', '.join('?' * len(ids))})" if ids is not None else "1"
+    conn.execute(f'''
+        INSERT INTO main.article_stats (category, day, articles, ai_categorized)
+        SELECT {STATS_CATEGORY.format('a')}, {STATS_DAY.format('a')}, COUNT(*), COALESCE(SUM(a.ai_categorized), 0)
+        FROM archive.articles a
+        WHERE {id_filter}
+        GROUP BY 1, 2
+        ON CONFLICT (category, day) DO UPDATE SET
+            articles = articles + excluded.articles,
+            ai_categorized = ai_categorized + excluded.ai_categorized
+    ''', ids or ())
+
+
+def _move_batch(conn: sqlite3.Connection, cutoff: str, now: str) -> int:
+    """Moves up to BATCH_SIZE of the oldest articles published before `cutoff` to the archive."""
+    ids = [row[0] for row in conn.execute(
+        "SELECT id FROM main.articles WHERE published_ts < ? ORDER BY published_ts LIMIT ?",
+        (epoch_seconds(cutoff), BATCH_SIZE)
+    )]
+    if not ids:
+        return 0
+    placeholders = ', '.join('?' * len(ids))
+
+    # Copy first, in its own transaction on the archive file...
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"INSERT OR IGNORE INTO archive.articles ({ARCHIVE_COLUMNS}) "
+                     f"SELECT {ARCHIVE_COLUMNS} FROM main.articles WHERE id IN ({placeholders})", ids)
+        conn.execute(f"INSERT OR IGNORE INTO archive.article_aliases ({ALIAS_COLUMNS}) "
+                     f"SELECT {ALIAS_COLUMNS} FROM main.article_aliases WHERE canonical_id IN ({placeholders})", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    # ...then move the boundary and delete from the hot tier in one transaction,
+    # so no reader ever sees the rows in neither tier
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute('''
+            INSERT INTO main.retention_state (id, archived_before, last_run_at) VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                archived_before = max(archived_before, excluded.archived_before),
+                last_run_at = excluded.last_run_at
+        ''', (cutoff, now))
+        conn.execute(f"DELETE FROM main.articles WHERE id IN ({placeholders})", ids)
+        add_archive_stats(conn, ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    database.bump_data_generation()
+    return len(ids)
+
+
+def vacuum_hot_tier(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Returns news.db's free pages to the file system, VACUUM_STEP_PAGES at a
+    time. The first time, converts the file to auto_vacuum=INCREMENTAL, which
+    takes one full VACUUM. Returns the pages freed and whether a full VACUUM ran.
+    """
+    free_pages = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM main")
+        return {"freed_pages": free_pages, "full_vacuum": True}
+    freed = 0
+    remaining = free_pages
+    while remaining:
+        # incremental_vacuum frees one page per step and returns no rows, so
+        # execute() would stop after the first; executescript() steps it to the end
+        conn.executescript(f"PRAGMA main.incremental_vacuum({VACUUM_STEP_PAGES});")
+        left = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+        if left >= remaining:
+            # No progress, e.g. another connection holds the write lock
+            break
+        freed += remaining - left
+        remaining = left
+    # Copy the truncation back into the database file without waiting on readers
+    conn.execute("PRAGMA main.wal_checkpoint(PASSIVE)")
+    return {"freed_pages": freed, "full_vacuum": False}
+
+
+def archive_old_articles(hot_days: int = HOT_DAYS, now: Optional[datetime.datetime] = None,
+                         stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Moves every article published more than `hot_days` days ago to the archive,
+    then vacuums news.db. Stops early, between batches, if `stop` is set.
+    Returns what was done.
+    """
+    started = time.time()
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = (now - datetime.timedelta(days=hot_days)).isoformat()
+    conn = database.get_db_connection()
+    archived = 0
+    try:
+        ensure_archive(conn)
+        while stop is None or not stop.is_set():
+            moved = _move_batch(conn, cutoff, now.isoformat())
+            if not moved:
+                break
+            archived += moved
+            ARTICLES_ARCHIVED.inc(moved)
+            time.sleep(BATCH_PAUSE)
+        vacuum = vacuum_hot_tier(conn) if archived else {"freed_pages": 0, "full_vacuum": False}
+    finally:
+        conn.close()
+    return {
+        "archived": archived,
+        "archived_before": cutoff,
+        **vacuum,
+        "seconds": round(time.time() - started, 2),
+    }
+
+
+class RetentionJob:
+    """Runs archive_old_articles every RUN_INTERVAL seconds on a background thread."""
+
+    def __init__(self, hot_days: int = HOT_DAYS, interval: float = RUN_INTERVAL):
+        self.hot_days = hot_days
+        self.interval = interval
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run_forever(self):
+        delay = FIRST_RUN_DELAY
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.last_run = {**archive_old_articles(self.hot_days, stop=self._stop), "error": None}
+                if self.last_run["archived"]:
+                    print(f"Archived {self.last_run['archived']} articles published before "
+                          f"{self.last_run['archived_before']} in {self.last_run['seconds']}s"
+                          + (" (converted news.db to incremental auto-vacuum)." if self.last_run['full_vacuum'] else "."))
+            except Exception as e:
+                self.last_run = {"archived": 0, "error": str(e)}
+                print(f"Archiving old articles failed: {e}")
+            self.last_run["finished_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_forever, name="retention", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops the job, waiting up to `timeout` for a run in progress to finish its current batch."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with database.get_read_pool().connection() as conn:
+            archived_before = database.get_archive_boundary(conn)
+        return {
+            "hot_days": self.hot_days,
+            "interval_s": round(self.interval),
+            "archived_before": archived_before,
+            "last_run": self.last_run,
+        }
+
+
+# Global instance
+retention_job_instance = None
+
+def get_retention_job() -> RetentionJob:
+    """Get the global retention job."""
+    global retention_job_instance
+    if retention_job_instance is None:
+        retention_job_instance = RetentionJob()
+    return retention_job_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move articles older than the hot window to the archive database.")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--db", default=database.DB_FILE, help="database to use")
+    parser.add_argument("--hot-days", type=int, default=HOT_DAYS, help="days of articles to keep in the hot tier")
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    database.init_db()
+    if args.command == "run":
+        result = archive_old_articles(args.hot_days)
+        print(f"Archived {result['archived']} articles published before {result['archived_before']} "
+              f"and freed {result['freed_pages']} pages in {result['seconds']}s"
+              + (" (converted to incremental auto-vacuum with a full VACUUM)." if result['full_vacuum'] else "."))
+        return
+    conn = database.get_db_connection()
+    try:
+        boundary = database.get_archive_boundary(conn)
+        hot = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        archived = 0
+        if boundary is not None:
+            database.attach_archive(conn)
+            archived = conn.execute("SELECT COUNT(*) FROM archive.articles").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"{hot} articles in {args.db}, {archived} in {database.archive_file()}"
+          + (f" (archived before {boundary})." if boundary else "."))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Scrape scheduling.
+
+Every scrape goes through one ScrapeScheduler, which runs at most one scrape
+at a time on its own thread. A trigger that arrives while a scrape is running
+joins it if the running scrape already covers what was asked for; otherwise
+the request is queued, and all queued requests are coalesced into the next
+run.
+
+Each section (the homepage and every category) has its own refresh interval
+that adapts to how often the section actually yields new articles: a scrape
+that finds new articles shortens it by ADAPT_FACTOR, one that finds nothing
+lengthens it by the same factor, within [MIN_INTERVAL, MAX_INTERVAL]. Only
+the sections that are due are scraped on each scheduled run.
+"""
+import datetime
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import scraper
+
+MIN_INTERVAL = float(os.getenv("SCRAPE_MIN_INTERVAL", "300"))
+MAX_INTERVAL = float(os.getenv("SCRAPE_MAX_INTERVAL", "7200"))
+DEFAULT_INTERVAL = float(os.getenv("SCRAPE_DEFAULT_INTERVAL", "900"))
+ADAPT_FACTOR = 1.5
+# A section whose page could not be fetched is retried after this long, whatever its interval
+ERROR_RETRY_INTERVAL = MIN_INTERVAL
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat()
+
+
+class ScrapeScheduler:
+    def __init__(self, sections: Iterable[str], use_ai_categorization: bool = True,
+                 run_scrape: Callable[..., List[Dict[str, Any]]] = scraper.run_full_scrape):
+        self.use_ai_categorization = use_ai_categorization
+        self.run_scrape = run_scrape
+        now = time.time()
+        # Every section starts out due, so the first run after start() is a full scrape
+        self.sections: Dict[str, Dict[str, Any]] = {
+            name: {'interval': DEFAULT_INTERVAL, 'next_due': now, 'last_scraped': None, 'last_new': None}
+            for name in sections
+        }
+        self._condition = threading.Condition()
+        self._pending: Set[str] = set()
+        self._pending_trigger: Optional[str] = None
+        self._running: Optional[Dict[str, Any]] = None
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._started_runs = 0
+        self._finished_runs = 0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Triggers ---
+
+    def trigger(self, sections: Optional[Iterable[str]] = None, reason: str = 'manual') -> Dict[str, Any]:
+        """
+        Asks for a scrape of `sections` (all of them if None) without waiting for it.
+
+        Returns the run that will cover the request and whether it 'joined' a
+        running scrape, was 'queued' behind one, or 'started' a new one.
+        """
+        wanted = set(sections) if sections else set(self.sections)
+        unknown = wanted - set(self.sections)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        with self._condition:
+            if self._running and wanted <= self._running['sections']:
+                return {'status': 'joined', 'run': self._running['id']}
+            status = 'queued' if self._running else 'started'
+            if not self._pending:
+                self._pending_trigger = reason
+            self._pending |= wanted
+            self._condition.notify_all()
+            return {'status': status, 'run': self._started_runs + 1}
+
+    def wait(self, run: int, timeout: Optional[float] = None) -> bool:
+        """Blocks until run number `run` has finished. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._finished_runs >= run, timeout)
+
+    # --- Worker ---
+
+    def _due_sections(self, now: float) -> Set[str]:
+        return {name for name, section in self.sections.items() if section['next_due'] <= now}
+
+    def _next_run(self) -> Optional[Dict[str, Any]]:
+        """Waits until something is queued or due, then claims it as the running scrape."""
+        with self._condition:
+            while not self._stopping:
+                now = time.time()
+                due = self._due_sections(now)
+                if self._pending or due:
+                    trigger = self._pending_trigger if self._pending else 'schedule'
+                    self._started_runs += 1
+                    self._running = {
+                        'id': self._started_runs,
+                        'sections': self._pending | due,
+                        'trigger': trigger,
+                        'started_at': now,
+                    }
+                    self._pending, self._pending_trigger = set(), None
+                    return self._running
+                next_due = min(section['next_due'] for section in self.sections.values())
+                self._condition.wait(timeout=max(0.0, next_due - now))
+            return None
+
+    def _adapt(self, reports: List[Dict[str, Any]], finished_at: float):
+        """Moves each scraped section's interval towards how often it actually changes."""
+        for report in reports:
+            section = self.sections.get(report.get('category'))
+            if section is None:
+                continue
+            if report.get('status') in (None, 'error'):
+                section['next_due'] = finished_at + ERROR_RETRY_INTERVAL
+                continue
+            new_articles = report.get('articles', 0)
+            if new_articles:
+                section['interval'] = max(MIN_INTERVAL, section['interval'] / ADAPT_FACTOR)
+            else:
+                section['interval'] = min(MAX_INTERVAL, section['interval'] * ADAPT_FACTOR)
+            section['last_scraped'] = finished_at
+            section['last_new'] = new_articles
+            section['next_due'] = finished_at + section['interval']
+
+    def _run_forever(self):
+        while True:
+            run = self._next_run()
+            if run is None:
+                return
+            sections = None if run['sections'] == set(self.sections) else sorted(run['sections'])
+            reports, error = [], None
+            try:
+                reports = self.run_scrape(self.use_ai_categorization, categories=sections) or []
+            except Exception as e:
+                error = str(e)
+                print(f"Scheduled scrape failed: {e}")
+            finished_at = time.time()
+            with self._condition:
+                self._adapt(reports, finished_at)
+                # Sections the scrape never reported on are retried soon rather than immediately
+                reported = {report.get('category') for report in reports}
+                for name in run['sections'] - reported:
+                    self.sections[name]['next_due'] = finished_at + ERROR_RETRY_INTERVAL
+                self._last_run = {
+                    'id': run['id'],
+                    'trigger': run['trigger'],
+                    'sections': sorted(run['sections']),
+                    'started_at': run['started_at'],
+                    'finished_at': finished_at,
+                    'new_articles': sum(report.get('articles', 0) for report in reports),
+                    'error': error,
+                }
+                self._running = None
+                self._finished_runs = run['id']
+                self._condition.notify_all()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_forever, name="scrape-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops scheduling new runs and waits up to `timeout` for a running scrape to finish."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # --- Status ---
+
+    def status(self) -> Dict[str, Any]:
+        with self._condition:
+            running = None
+            if self._running:
+                running = {
+                    'id': self._running['id'],
+                    'trigger': self._running['trigger'],
+                    'sections': sorted(self._running['sections']),
+                    'started_at': _iso(self._running['started_at']),
+                    'elapsed_s': round(time.time() - self._running['started_at'], 1),
+                }
+            last_run = None
+            if self._last_run:
+                last_run = {
+                    **self._last_run,
+                    'started_at': _iso(self._last_run['started_at']),
+                    'finished_at': _iso(self._last_run['finished_at']),
+                    'duration_s': round(self._last_run['finished_at'] - self._last_run['started_at'], 1),
+                }
+            return {
+                'running': running,
+                'pending': sorted(self._pending),
+                'last_run': last_run,
+                'sections': {
+                    name: {
+                        'interval_s': round(section['interval']),
+                        'next_due': _iso(section['next_due']),
+                        'last_scraped': _iso(section['last_scraped']),
+                        'last_new': section['last_new'],
+                    }
+                    for name, section in self.sections.items()
+                },
+            }
+
+
+# Global instance
+scheduler_instance = None
+
+def get_scheduler() -> ScrapeScheduler:
+    """Get the global scrape scheduler, covering the homepage and every category."""
+    global scheduler_instance
+    if scheduler_instance is None:
+        scheduler_instance = ScrapeScheduler([scraper.HOMEPAGE_CATEGORY] + list(scraper.CATEGORIES))
+    return scheduler_instance
@@ -1,9 +1,13 @@
-import requests
-from bs4 import BeautifulSoup
+import hashlib
 import json
-import re
-from typing import List, Dict, Any
+import queue
+import time
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Set
 from ai_categorizer import get_ai_categorizer
+from extraction import extract_article_details, extract_listing_links
+from fetcher import FetchResult, get_fetcher
+from metrics import Counter, Histogram
+from near_duplicates import PendingIndex, band_keys, tokens
 import datetime
 import database
 import threading
@@ -27,88 +31,224 @@ CATEGORIES = {
     'health': '/health'
 }
 
+# The homepage is scraped as its own pseudo-category
+HOMEPAGE_CATEGORY = 'top-stories'
+
+# Streaming ingestion: articles are categorized and committed in micro-batches
+# of up to WRITE_BATCH_SIZE, or whatever has arrived after WRITE_BATCH_SECONDS,
+# so they become visible while the rest of the scrape is still running.
+WRITE_BATCH_SIZE = 25
+WRITE_BATCH_SECONDS = 2.0
+# Bound on articles waiting between stages; a slow stage holds back the one before it
+STAGE_QUEUE_SIZE = 100
+# A new headline is only matched against stories stored within this many days,
+# so recurring headlines ("World's best restaurant for 2025") stay separate
+NEAR_DUPLICATE_DAYS = 7
+
+# --- Metrics ---
+SCRAPE_PAGES = Counter("scrape_pages_total", "Listing pages processed, by outcome.", ["status"])
+SCRAPE_LINKS_SEEN = Counter("scrape_links_seen_total", "Article links found on listing pages.")
+SCRAPE_NEW_LINKS = Counter("scrape_new_links_total", "Article links not already stored.")
+SCRAPE_DETAIL_FETCHES = Counter("scrape_detail_fetches_total", "Article page fetches, by result.", ["result"])
+SCRAPE_NEAR_DUPLICATES = Counter("scrape_near_duplicates_total", "New links skipped as near-duplicates of a known story.")
+SCRAPE_SKIPPED_NO_IMAGE = Counter("scrape_skipped_no_image_total", "New articles skipped because their page had no lead image.")
+SCRAPE_NEW_ARTICLES = Counter("scrape_new_articles_total", "New articles sent down the ingestion pipeline.")
+SCRAPE_ARTICLES_WRITTEN = Counter("scrape_articles_written_total", "Articles committed by the write stage.")
+SCRAPE_STAGE_SECONDS = Histogram("scrape_stage_duration_seconds", "Time per page, article or micro-batch in each scrape stage.", ["stage"])
+SCRAPE_RUN_SECONDS = Histogram("scrape_run_duration_seconds", "Wall time of whole scrape runs.",
+                               buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600))
+
+def parse_article_details(html: bytes) -> Dict[str, Any]:
+    """
+    Extracts the main image and description from an article page.
+    """
+    return extract_article_details(html)
+
 def get_article_details(article_url: str) -> Dict[str, Any]:
     """
     Fetches an article page and extracts the main image and description.
     """
     print(f"  -> Fetching details for {article_url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    details = {'imageUrl': None, 'description': None}
-    try:
-        response = requests.get(article_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        article_soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # --- Find Image ---
-        # CNN often wraps the main image in a picture element within a container
-        # that has 'image' in its class name. This is a more robust selector.
-        image_container = article_soup.find(class_=re.compile(r'image__container'))
-        if image_container:
-            image_tag = image_container.find('img')
-            if image_tag and image_tag.get('src'):
-                details['imageUrl'] = image_tag['src']
-
-        # --- Find Description ---
-        # The first paragraph of text is usually a good summary.
-        first_paragraph = article_soup.find('p', class_=re.compile(r'paragraph'))
-        if first_paragraph:
-            details['description'] = first_paragraph.get_text(strip=True)
-
-    except requests.RequestException as e:
-        print(f"    -> Error fetching article details for {article_url}: {e}")
-    
-    return details
+    result = get_fetcher().fetch(article_url, timeout=10)
+    if not result.ok:
+        print(f"    -> Error fetching article details for {article_url}: {result.error}")
+        return {'imageUrl': None, 'description': None}
+    return parse_article_details(result.content)
 
-def scrape_cnn_page(url: str, category: str, conn) -> List[Dict[str, Any]]:
+def conditional_headers(validators: Dict[str, Any]) -> Dict[str, str]:
+    """Builds If-None-Match / If-Modified-Since headers from a page's stored validators."""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def link_set_hash(urls: List[str]) -> str:
+    """Fingerprints the set of article links on a listing page, ignoring order and repeats."""
+    return hashlib.sha256('\n'.join(sorted(set(urls))).encode()).hexdigest()
+
+def scrape_cnn_page(url: str, category: str, conn, listing: Optional[FetchResult] = None,
+                    page_report: Optional[Dict[str, Any]] = None, seen_urls: Optional[Set[str]] = None,
+                    pending_headlines: Optional[PendingIndex] = None,
+                    stored_validators: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Scrapes a single CNN page (e.g., a category page) for articles.
 
+    The page is skipped without fetching any article details if the server
+    answers 304 Not Modified, or if it links to exactly the same articles as
+    on the last scrape. New links whose headline is a near-duplicate of a
+    recently stored story, or of one claimed earlier in the same scrape, are
+    not fetched either; they are listed in the report's 'duplicates'. If the
+    claimed story's article is not stored after all, they are fetched instead.
+
     Args:
         url: The full URL of the page to scrape.
         category: The category name to tag the articles with.
+        listing: The already-fetched page, if the caller fetched it in advance.
+        page_report: If given, filled in with what happened to the page,
+            including the 'validators' to save once its articles are stored.
+        seen_urls: URLs already handled earlier in the same scrape; updated
+            with this page's new URLs.
+        pending_headlines: Headlines claimed earlier in the same scrape;
+            updated with this page's new headlines.
+        stored_validators: The page's saved validators, if the caller already
+            loaded them; read from the database otherwise.
 
     Returns:
         A list of scraped article data.
     """
+    return list(iter_page_articles(url, category, conn, listing, page_report, seen_urls, pending_headlines,
+                                   stored_validators))
+
+def iter_page_articles(url: str, category: str, conn, listing: Optional[FetchResult] = None,
+                       page_report: Optional[Dict[str, Any]] = None, seen_urls: Optional[Set[str]] = None,
+                       pending_headlines: Optional[PendingIndex] = None,
+                       stored_validators: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    The generator behind scrape_cnn_page: yields each new article as soon as
+    its details page has been fetched and parsed, in completion order.
+    """
     print(f"Scraping {category} from {url}...")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    report = page_report if page_report is not None else {}
+    report.update({'category': category, 'status': 'error', 'links': 0, 'new': 0, 'articles': 0, 'failed': 0,
+                   'validators': None, 'duplicates': []})
+
+    fetcher = get_fetcher()
+    if stored_validators is None:
+        stored_validators = database.get_page_validators(url, conn)
+    if listing is None:
+        listing = fetcher.fetch(url, headers=conditional_headers(stored_validators))
+    SCRAPE_STAGE_SECONDS.labels("listing_fetch").observe(listing.elapsed)
+    if not listing.ok:
+        print(f"Error fetching {url}: {listing.error}")
+        return
+    if listing.status == 304:
+        print(f"Page for '{category}' not modified since the last scrape, skipping.")
+        report.update({'status': 'skipped', 'reason': 'not modified'})
+        return
+
+    with SCRAPE_STAGE_SECONDS.labels("listing_parse").time():
+        article_links = [
+            (CNN_BASE_URL + href, headline)
+            for href, headline in extract_listing_links(listing.content)
+            if href and href.startswith('/')
+        ]
+    SCRAPE_LINKS_SEEN.inc(len(article_links))
+    link_hash = link_set_hash([full_url for full_url, _ in article_links])
+    report['links'] = len(article_links)
+    report['validators'] = (listing.headers.get('ETag'), listing.headers.get('Last-Modified'), link_hash)
+    if link_hash == stored_validators.get('link_hash'):
+        print(f"Links for '{category}' unchanged since the last scrape, skipping.")
+        report.update({'status': 'skipped', 'reason': 'same links'})
+        return
 
-    try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        return []
-
-    soup = BeautifulSoup(response.content, 'html.parser')
-    page_articles = []
-    
     # --- Filter for new articles before detailed scraping ---
-    article_links = soup.select('a[data-link-type="article"]')
+    # One set-based lookup for the whole page; `seen_urls` also skips links
+    # another page already claimed during this scrape.
+    known_urls = database.find_existing_urls([full_url for full_url, _ in article_links], conn)
+    if seen_urls is not None:
+        known_urls |= seen_urls
     new_article_urls = []
-    for link in article_links:
-        href = link.get('href')
-        if not href or not href.startswith('/'):
-            continue
-        full_url = CNN_BASE_URL + href
-        if not database.article_exists(full_url, conn):
-            new_article_urls.append((full_url, link))
+    for full_url, headline in article_links:
+        if full_url not in known_urls:
+            known_urls.add(full_url)
+            new_article_urls.append((full_url, headline))
+    if seen_urls is not None:
+        seen_urls.update(full_url for full_url, _ in new_article_urls)
     
     print(f"Found {len(article_links)} links, {len(new_article_urls)} are new for category '{category}'.")
+    report.update({'status': 'changed', 'new': len(new_article_urls)})
+    SCRAPE_NEW_LINKS.inc(len(new_article_urls))
+
+    headlines = {}
+    for full_url, headline in new_article_urls:
+        if not headline or len(headline) < 20:
+            continue
+        headlines[full_url] = headline
+
+    # --- Skip near-duplicates of known stories ---
+    # Duplicates of a headline claimed in this scrape are held back until we
+    # know whether its article was stored; if it was not, they are fetched.
+    window_start = int(time.time()) - NEAR_DUPLICATE_DAYS * 86400
+    claimed_duplicates = []
+    for full_url, headline in list(headlines.items()):
+        words = tokens(headline)
+        keys = band_keys(words)
+        if not keys:
+            continue
+        match = pending_headlines.find(words, keys) if pending_headlines is not None else None
+        if match is not None:
+            claimed_duplicates.append((full_url, headline, words, keys, match))
+        else:
+            stored = database.find_near_duplicate(headline, conn, since_ts=window_start)
+            match = (stored[1], stored[2]) if stored else None
+            if match:
+                report['duplicates'].append((full_url, match[0], match[1]))
+                SCRAPE_NEAR_DUPLICATES.inc()
+        if match:
+            del headlines[full_url]
+            print(f"  -> Skipping near-duplicate ({match[1]:.2f}) of {match[0]}: {headline}")
+        elif pending_headlines is not None:
+            pending_headlines.add(full_url, words, keys)
 
-    # --- Scrape details for new articles only ---
-    for full_url, link in new_article_urls:
-        headline_element = link.find('span', class_='container__headline-text')
-        headline = headline_element.get_text(strip=True) if headline_element else "Title not found"
+    # --- Scrape details for new articles only, concurrently ---
+    yield from fetch_article_details(fetcher, headlines, category, report, pending_headlines)
 
-        if headline == "Title not found" or len(headline) < 20:
+    # --- Fall back to near-duplicates whose original was not stored ---
+    fallbacks = {}
+    for full_url, headline, words, keys, (canonical_url, similarity) in claimed_duplicates:
+        if pending_headlines.released(canonical_url):
+            fallbacks[full_url] = headline
+            pending_headlines.add(full_url, words, keys)
+        else:
+            report['duplicates'].append((full_url, canonical_url, similarity))
+            SCRAPE_NEAR_DUPLICATES.inc()
+    if fallbacks:
+        print(f"Fetching {len(fallbacks)} near-duplicates whose original article was not stored.")
+        yield from fetch_article_details(fetcher, fallbacks, category, report, pending_headlines)
+
+def fetch_article_details(fetcher, headlines: Dict[str, str], category: str, report: Dict[str, Any],
+                          pending_headlines: Optional[PendingIndex] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Fetches the details page of each url in `headlines` concurrently and
+    yields the articles that have an image, counting them in `report`.
+    Headlines whose article is not stored are released from `pending_headlines`.
+    """
+    for detail_page in fetcher.fetch_iter(list(headlines), timeout=10):
+        full_url, headline = detail_page.url, headlines[detail_page.url]
+        print(f"  -> Fetched details for {full_url} in {detail_page.elapsed:.2f}s")
+        SCRAPE_STAGE_SECONDS.labels("detail_fetch").observe(detail_page.elapsed)
+        SCRAPE_DETAIL_FETCHES.labels("ok" if detail_page.ok else "error").inc()
+        if not detail_page.ok:
+            print(f"    -> Error fetching article details for {full_url}: {detail_page.error}")
+            # Not saving the page's validators makes the next scrape retry this link
+            report['failed'] += 1
+            if pending_headlines is not None:
+                pending_headlines.release(full_url)
             continue
-        
-        article_details = get_article_details(full_url)
+        with SCRAPE_STAGE_SECONDS.labels("detail_parse").time():
+            article_details = parse_article_details(detail_page.content)
 
         if article_details.get('imageUrl'):
             article_data = {
@@ -120,70 +260,214 @@ def scrape_cnn_page(url: str, category: str, conn) -> List[Dict[str, Any]]:
                 'description': article_details.get('description'),
                 'publishedAt': datetime.datetime.now(datetime.timezone.utc).isoformat()
             }
-            page_articles.append(article_data)
+            report['articles'] += 1
+            SCRAPE_NEW_ARTICLES.inc()
+            yield article_data
         else:
+            SCRAPE_SKIPPED_NO_IMAGE.inc()
             print(f"  -> Skipping article, no image found: {headline}")
-        
-    return page_articles
+            if pending_headlines is not None:
+                pending_headlines.release(full_url)
 
 
-def run_full_scrape(use_ai_categorization: bool = False):
+def save_page_reports(page_reports: List[Dict[str, Any]], conn):
     """
-    Runs the scraper for all defined categories and saves the combined results to the database.
+    Stores each page's validators and link hash. Only called once the scrape's
+    articles are committed; saving them earlier could make the next scrape skip
+    a page whose articles were never stored. Pages where an article's details
+    could not be fetched are not saved either, so their links are retried.
     """
-    print("Starting full CNN scrape for all categories...")
-    
-    conn = database.get_db_connection()
-    all_new_articles = []
+    for report in page_reports:
+        if report.get('validators') and not report.get('failed'):
+            etag, last_modified, link_hash = report['validators']
+            database.save_page_validators(report['url'], etag, last_modified, link_hash, conn)
+
+def print_page_summary(page_reports: List[Dict[str, Any]]):
+    """Prints which listing pages changed and which were skipped on this scrape."""
+    if not page_reports:
+        return
+    print("\nPage summary:")
+    for report in page_reports:
+        status = report.get('status', 'error')
+        if status == 'skipped':
+            detail = f"skipped ({report['reason']})"
+        elif status == 'changed':
+            detail = f"changed ({report['links']} links, {report['new']} new, {len(report['duplicates'])} near-duplicates"
+            detail += f", {report['failed']} failed, retried next time)" if report.get('failed') else ")"
+        else:
+            detail = "error"
+        print(f"  {report.get('category', report['url'])}: {detail}")
+    skipped = sum(1 for report in page_reports if report.get('status') == 'skipped')
+    changed = sum(1 for report in page_reports if report.get('status') == 'changed')
+    print(f"  {changed} changed, {skipped} skipped, {len(page_reports) - changed - skipped} failed")
 
+class PageDone(NamedTuple):
+    """Passed down the pipeline after a page's last article, so its validators are saved once they are stored."""
+    report: Dict[str, Any]
+
+class Aliases(NamedTuple):
+    """A page's near-duplicate links as (url, canonical_url, similarity), recorded once their canonical articles are stored."""
+    items: List[Any]
+
+def micro_batches(source: queue.Queue, size: int = WRITE_BATCH_SIZE, max_wait: float = WRITE_BATCH_SECONDS) -> Iterator[Any]:
+    """
+    Groups the articles arriving on `source` into lists of up to `size`,
+    yielding a partial list once its first article has waited `max_wait`
+    seconds. PageDone and Aliases markers flush the current list and are then
+    yielded on their own, in order. Stops at None.
+    """
+    batch, deadline = [], None
+    while True:
+        try:
+            item = source.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+        except queue.Empty:
+            yield batch
+            batch = []
+            continue
+        if item is None or isinstance(item, (PageDone, Aliases)):
+            if batch:
+                yield batch
+                batch = []
+            if item is None:
+                return
+            yield item
+            continue
+        if not batch:
+            deadline = time.monotonic() + max_wait
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+def categorize_stage(source: queue.Queue, sink: queue.Queue, use_ai_categorization: bool):
+    """Categorizes each micro-batch and passes it on, along with the page markers."""
+    ai_categorizer = get_ai_categorizer() if use_ai_categorization else None
     try:
-        # First, scrape the homepage for top stories
-        homepage_articles = scrape_cnn_page(CNN_BASE_URL, 'top-stories', conn)
-        all_new_articles.extend(homepage_articles)
-
-        # Then, scrape each category page
-        for category, path in CATEGORIES.items():
-            category_url = CNN_BASE_URL + path
-            category_articles = scrape_cnn_page(category_url, category, conn)
-            all_new_articles.extend(category_articles)
-        
-        # Create a final list with no duplicates
-        final_unique_articles = list({article['url']: article for article in all_new_articles}.values())
-        print(f"\nTotal new unique articles to process: {len(final_unique_articles)}")
-
-        if not final_unique_articles:
-            print("No new articles found. Scrape complete.")
-            return
-
-        # Apply AI categorization if requested
-        if use_ai_categorization:
-            print("Applying AI categorization to new articles...")
-            ai_categorizer = get_ai_categorizer()
-            if ai_categorizer:
+        for item in micro_batches(source):
+            if isinstance(item, list) and ai_categorizer:
                 try:
-                    final_unique_articles = ai_categorizer.categorize_articles_batch(final_unique_articles)
+                    with SCRAPE_STAGE_SECONDS.labels("categorize").time():
+                        ai_categorizer.categorize_articles_batch(item)
                 except Exception as e:
                     print(f"Error during AI categorization: {e}")
-            else:
-                print("AI categorizer not available.")
-        
-        # Add all new articles to the database in a single transaction
-        database.add_article_batch(final_unique_articles, conn)
-        print(f"Successfully added {len(final_unique_articles)} new articles to the database.")
+            sink.put(item)
+    finally:
+        sink.put(None)
+
+def write_stage(source: queue.Queue, totals: Dict[str, int]):
+    """
+    Commits each micro-batch, then saves a page's validators once all of its
+    articles are stored. If the scrape dies midway, the pages already saved
+    are skipped next time and the rest are scraped again. After a failed
+    write, or a near-duplicate whose canonical article is missing, no more
+    validators are saved, since a batch can hold articles of several pages.
+    """
+    conn = database.get_db_connection()
+    incomplete = False
+    try:
+        for item in iter(source.get, None):
+            try:
+                if isinstance(item, PageDone):
+                    if not incomplete:
+                        save_page_reports([item.report], conn)
+                elif isinstance(item, Aliases):
+                    recorded = database.add_article_aliases(item.items, conn)
+                    if recorded < len(item.items):
+                        # Their canonical articles were not stored, so the page is scraped again next time
+                        incomplete = True
+                        print(f"{len(item.items) - recorded} near-duplicates lost their canonical article.")
+                elif item:
+                    with SCRAPE_STAGE_SECONDS.labels("write").time():
+                        database.add_article_batch(item, conn)
+                    SCRAPE_ARTICLES_WRITTEN.inc(len(item))
+                    totals['written'] += len(item)
+                    print(f"Committed {len(item)} articles ({totals['written']} so far).")
+            except Exception as e:
+                incomplete = True
+                print(f"Error writing to the database: {e}")
+    finally:
+        conn.close()
+
+def update_related_index():
+    """Adds the articles stored since the last scrape to the related-articles index (see related.py)."""
+    try:
+        # Imported here so that importing the scraper doesn't load numpy
+        import related
+        indexed = related.get_related_index().update()
+        print(f"Indexed {indexed} articles for related-article lookups.")
+    except Exception as e:
+        print(f"Error updating the related-articles index: {e}")
+
+def run_full_scrape(use_ai_categorization: bool = False, categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Runs the scraper for all defined categories (or only `categories`) and
+    streams the results into the database.
+
+    Pages are fetched and parsed on this thread; new articles flow through
+    bounded queues to a categorization stage and a write stage, each on its
+    own thread, and are committed in micro-batches as they arrive.
+
+    Returns:
+        One report per listing page (see scrape_cnn_page).
+    """
+    print("Starting CNN scrape for " + (", ".join(categories) if categories else "all categories") + "...")
+    
+    conn = database.get_db_connection()
+    fetcher = get_fetcher()
+    fetcher.reset_stats()
+    page_reports = []
+    seen_urls = set()
+    pending_headlines = PendingIndex()
+    totals = {'written': 0}
+    started = time.perf_counter()
+
+    parsed = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+    categorized = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+    stages = [
+        threading.Thread(target=categorize_stage, args=(parsed, categorized, use_ai_categorization), daemon=True),
+        threading.Thread(target=write_stage, args=(categorized, totals), daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    try:
+        # The homepage for top stories, then each category page
+        pages = [(CNN_BASE_URL, HOMEPAGE_CATEGORY)]
+        pages += [(CNN_BASE_URL + path, category) for category, path in CATEGORIES.items()]
+        if categories:
+            pages = [(page_url, category) for page_url, category in pages if category in categories]
+
+        # Fetch every listing page concurrently up front, as conditional GETs, then process them in order
+        validators = {page_url: database.get_page_validators(page_url, conn) for page_url, _ in pages}
+        listings = fetcher.fetch_many([page_url for page_url, _ in pages],
+                                      headers={page_url: conditional_headers(stored) for page_url, stored in validators.items()})
+        for (page_url, category), listing in zip(pages, listings):
+            report = {'url': page_url}
+            page_reports.append(report)
+            # seen_urls keeps a page from re-queueing an article an earlier page already sent down the pipeline
+            for article in iter_page_articles(page_url, category, conn, listing=listing, page_report=report,
+                                              seen_urls=seen_urls, pending_headlines=pending_headlines,
+                                              stored_validators=validators[page_url]):
+                parsed.put(article)
+            if report['duplicates']:
+                parsed.put(Aliases(report['duplicates']))
+            parsed.put(PageDone(report))
+            SCRAPE_PAGES.labels(report['status']).inc()
 
     except Exception as e:
         print(f"An error occurred during the scrape process: {e}")
     finally:
+        parsed.put(None)
+        for stage in stages:
+            stage.join()
         conn.close()
+        SCRAPE_RUN_SECONDS.observe(time.perf_counter() - started)
+        print(f"\nTotal new articles stored: {totals['written']}")
+        print_page_summary(page_reports)
+        print(f"Fetch stats: {fetcher.stats()}")
         print("Scrape process finished.")
-
-
-def run_scrape_in_background():
-    """Wrapper to run the scrape function in a background thread."""
-    print("Triggering background scrape...")
-    scraper_thread = threading.Thread(target=run_full_scrape, args=(True,))
-    scraper_thread.daemon = True # Allows main program to exit even if thread is running
-    scraper_thread.start()
+    update_related_index()
+    return page_reports
 
 
 if __name__ == "__main__":
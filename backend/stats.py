@@ -0,0 +1,122 @@
+"""
+Article counts for dashboards, read from the article_stats summary table.
+
+article_stats holds one row per (category, UTC day) with the number of
+articles and how many of them were categorized by the AI. Triggers on
+`articles` keep it current on every insert, delete and update (see
+migrations.add_article_stats), so reading it costs the same however many
+articles are stored. Articles moved to the archive by retention.py stay
+counted. If it ever drifts, rebuild it from the articles of both tiers:
+
+    python stats.py rebuild
+"""
+import argparse
+import datetime
+from typing import Any, Dict, Optional
+
+import database
+from metrics import timed
+from migrations import rebuild_article_stats
+from retention import add_archive_stats
+
+# Days in the histogram when the client does not ask for a number, and the most it may ask for
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+def _percentage(part: int, whole: int) -> float:
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+
+@timed(database.DB_QUERY_SECONDS)
+def get_stats(days: int = DEFAULT_DAYS, category: Optional[str] = None,
+              today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Returns overall and per-category article counts with their AI-categorized
+    share, each category's count for the last 7 days, and a per-day histogram
+    of the last `days` days (for one category if given). Days are UTC.
+    """
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    week_start = (today - datetime.timedelta(days=6)).isoformat()
+    histogram_start = (today - datetime.timedelta(days=days - 1)).isoformat()
+
+    with database.get_read_pool().connection() as conn:
+        by_category = conn.execute('''
+            SELECT category, SUM(articles), SUM(ai_categorized),
+                   SUM(CASE WHEN day >= ? THEN articles ELSE 0 END)
+            FROM article_stats
+            GROUP BY category
+            ORDER BY SUM(articles) DESC
+        ''', (week_start,)).fetchall()
+        if category:
+            histogram = conn.execute('''
+                SELECT day, articles, ai_categorized FROM article_stats
+                WHERE category = ? AND day >= ? ORDER BY day
+            ''', (category, histogram_start)).fetchall()
+        else:
+            histogram = conn.execute('''
+                SELECT day, SUM(articles), SUM(ai_categorized) FROM article_stats
+                WHERE day >= ? GROUP BY day ORDER BY day
+            ''', (histogram_start,)).fetchall()
+
+    total = sum(row[1] for row in by_category)
+    ai_total = sum(row[2] for row in by_category)
+    return {
+        "total_articles": total,
+        "ai_categorized_count": ai_total,
+        "ai_categorized_percentage": _percentage(ai_total, total),
+        "categories": {row[0]: row[1] for row in by_category},
+        "category_details": {
+            row[0]: {
+                "articles": row[1],
+                "ai_categorized": row[2],
+                "ai_categorized_percentage": _percentage(row[2], row[1]),
+                "last_7_days": row[3],
+            }
+            for row in by_category
+        },
+        "days": [{"day": row[0], "articles": row[1], "ai_categorized": row[2]} for row in histogram],
+    }
+
+
+def rebuild_stats() -> int:
+    """Recomputes article_stats from the articles of both tiers. Returns the number of summary rows written."""
+    conn = database.get_db_connection()
+    try:
+        archived = database.get_archive_boundary(conn) is not None
+        if archived:
+            database.attach_archive(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        rebuild_article_stats(conn)
+        if archived:
+            add_archive_stats(conn)
+        rows = conn.execute("SELECT COUNT(*) FROM article_stats").fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    database.bump_data_generation()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the article_stats summary table.")
+    parser.add_argument("command", choices=["show", "rebuild"])
+    parser.add_argument("--db", default=database.DB_FILE, help="database to use")
+    parser.add_argument("--days", type=int, default=7, help="days of histogram to show")
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    database.init_db()
+    if args.command == "rebuild":
+        print(f"Rebuilt article_stats: {rebuild_stats()} (category, day) rows.")
+        return
+    stats = get_stats(days=args.days)
+    print(f"{stats['total_articles']} articles, {stats['ai_categorized_percentage']}% AI categorized")
+    for category, details in stats["category_details"].items():
+        print(f"  {category:<16} {details['articles']:>8} ({details['last_7_days']} in the last 7 days)")
+    for day in stats["days"]:
+        print(f"  {day['day']}  {day['articles']:>6}")
+
+
+if __name__ == "__main__":
+    main()
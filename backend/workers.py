@@ -0,0 +1,190 @@
+"""
+Running the API as several worker processes (`uvicorn main:app --workers N`).
+
+Every worker serves reads from the same SQLite file in WAL mode, but only one
+of them, the writer, runs the scrape scheduler and the retention job. The
+writer is whichever worker holds an exclusive flock on the lock file next to
+the database (news.db -> news.writer.lock). The OS releases the lock when its
+holder exits or crashes, and the other workers try to take it every
+LEASE_RETRY_INTERVAL seconds, so one of them takes over.
+
+The other workers notice the writer's commits through `PRAGMA data_version`,
+which changes for a connection whenever any other connection commits. Each
+of them polls it every POLL_INTERVAL seconds and bumps its own data
+generation, which invalidates its response cache and wakes its live stream
+broadcaster. Scrapes requested from them are queued in the scrape_requests
+table; the writer picks them up when it sees that commit.
+"""
+import datetime
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; run a single worker there
+    fcntl = None
+
+import database
+
+# Seconds between checks for commits made by other workers
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "0.5"))
+# Seconds between a reader worker's attempts to become the writer
+LEASE_RETRY_INTERVAL = float(os.getenv("WRITER_LEASE_RETRY", "5"))
+
+
+def writer_lock_file(db_file: Optional[str] = None) -> str:
+    """The lock file whose holder is the writer worker for `db_file`."""
+    root, _ = os.path.splitext(db_file or database.DB_FILE)
+    return f"{root}.writer.lock"
+
+
+def take_scrape_requests(conn) -> Optional[List[Optional[List[str]]]]:
+    """
+    Removes and returns the queued scrape requests, each a list of sections or
+    None for a full scrape. Returns None if nothing was queued.
+    """
+    with conn:
+        rows = conn.execute("DELETE FROM scrape_requests RETURNING sections").fetchall()
+    if not rows:
+        return None
+    return [row[0].split(",") if row[0] else None for row in rows]
+
+
+class WorkerCoordinator:
+    def __init__(self):
+        self.pid = os.getpid()
+        self._lock_fd: Optional[int] = None
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._on_scrape_request: Optional[Callable[[Optional[List[str]]], Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_fd is not None
+
+    # --- Writer Lease ---
+
+    def _try_become_writer(self) -> bool:
+        if fcntl is None:
+            self._lock_fd = -1
+            return True
+        fd = os.open(writer_lock_file(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Record who holds it, for the status endpoints of the other workers
+        os.ftruncate(fd, 0)
+        os.write(fd, b"%d\n" % self.pid)
+        self._lock_fd = fd
+        print(f"Worker {self.pid} is now the writer: it runs the scrapes and archiving.")
+        return True
+
+    def writer_pid(self) -> Optional[int]:
+        if self.is_writer:
+            return self.pid
+        try:
+            with open(writer_lock_file()) as lock:
+                return int(lock.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    # --- Lifecycle ---
+
+    def start(self, on_elected: Callable[[], None], on_scrape_request: Callable[[Optional[List[str]]], Any]):
+        """
+        Tries to become the writer, calling `on_elected` right away if it
+        succeeds, and starts watching for other workers' commits. A reader
+        keeps trying to take over; `on_elected` runs on the watcher thread if
+        it does. The writer calls `on_scrape_request` with the sections of
+        each scrape requested through another worker.
+        """
+        if self._thread is not None:
+            return
+        self._on_elected, self._on_scrape_request = on_elected, on_scrape_request
+        if self._try_become_writer():
+            on_elected()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_forever, name="worker-coordinator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops watching and gives up the writer lock. Stop the writer's jobs first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._lock_fd is not None and self._lock_fd >= 0:
+            os.close(self._lock_fd)
+        self._lock_fd = None
+
+    def _watch_forever(self):
+        conn = database.get_db_connection()
+        try:
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            next_attempt = time.monotonic() + LEASE_RETRY_INTERVAL
+            # Pick up requests queued while no worker was the writer
+            changed = True
+            while True:
+                if not self.is_writer and time.monotonic() >= next_attempt:
+                    next_attempt = time.monotonic() + LEASE_RETRY_INTERVAL
+                    if self._try_become_writer():
+                        self._on_elected()
+                        changed = True
+                try:
+                    if self.is_writer and changed:
+                        for sections in take_scrape_requests(conn) or ():
+                            self._on_scrape_request(sections)
+                    changed = False
+                    if self._stop.wait(POLL_INTERVAL):
+                        return
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current != data_version:
+                        data_version, changed = current, True
+                        # The writer bumps its own generation when it writes
+                        if not self.is_writer:
+                            database.bump_data_generation()
+                except Exception as e:
+                    print(f"Worker coordination check failed: {e}")
+                    if self._stop.wait(POLL_INTERVAL):
+                        return
+        finally:
+            conn.close()
+
+    # --- Requests ---
+
+    def forward_scrape(self, sections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Queues a scrape of `sections` (all of them if None) for the writer worker."""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        conn = database.get_db_connection()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO scrape_requests (sections, requested_at) VALUES (?, ?)",
+                    (",".join(sections) if sections else None, now),
+                )
+        finally:
+            conn.close()
+        return {'status': 'forwarded', 'writer_pid': self.writer_pid()}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pid': self.pid,
+            'role': 'writer' if self.is_writer else 'reader',
+            'writer_pid': self.writer_pid(),
+        }
+
+
+# Global instance
+coordinator_instance = None
+
+def get_coordinator() -> WorkerCoordinator:
+    """Get this process's worker coordinator."""
+    global coordinator_instance
+    if coordinator_instance is None:
+        coordinator_instance = WorkerCoordinator()
+    return coordinator_instance
@@ -92,7 +92,7 @@ export default function AdminPage() {
   const fetchCategoryStats = async () => {
     try {
       const response = await fetch(
-        "http://localhost:8000/api/categories/stats"
+        "http://localhost:8000/api/stats"
       );
       const data = await response.json();
       setCategoryStats(data);
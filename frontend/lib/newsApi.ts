@@ -11,6 +11,7 @@ const NEWS_API_URL = 'https://newsapi.org/v2';
 const SCRAPER_API_URL = 'http://localhost:8000/api'; // Our Python backend
 
 export interface NewsArticle {
+  id?: number; // Set for scraped articles; used to look up related articles
   title: string;
   description: string | null;
   url: string;
@@ -41,6 +42,7 @@ const transformApiArticle = (article: any): NewsArticle => ({
 });
 
 const transformScrapedArticle = (article: any): NewsArticle => ({
+  id: article.id,
   title: article.title,
   description: article.description,
   url: article.url,
@@ -162,6 +164,80 @@ async function getNewsByCategory(category: string, options: FetchOptions = {}):
   }
 }
 
+/**
+ * Fetches the newest articles of several categories in a single request,
+ * e.g. for pages that render one section per category.
+ * @param categories - The categories to fetch; all of them when empty.
+ * @param limit - Articles per category.
+ */
+async function getFeed(categories: string[] = [], limit: number = 10): Promise<Record<string, NewsArticle[]>> {
+  try {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (categories.length > 0) params.append('categories', categories.join(','));
+
+    const response = await fetch(`${SCRAPER_API_URL}/feed?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error(`Scraper API feed responded with status: ${response.status}`);
+    }
+    const data: Record<string, any[]> = await response.json();
+    // The feed maps each category to its array of articles
+    return Object.fromEntries(
+      Object.entries(data).map(([category, articles]) => [category, articles.map(transformScrapedArticle)])
+    );
+  } catch (error) {
+    console.error("Failed to fetch feed from scraper API:", error);
+    return {};
+  }
+}
+
+/**
+ * Fetches the articles most similar to a scraped article, best first, for a
+ * "more like this" section. Empty if there are none or the article is too new
+ * to have been indexed yet.
+ * @param id - The scraped article's id.
+ * @param limit - At most this many articles (up to 20).
+ */
+async function getRelatedNews(id: number, limit: number = 5): Promise<NewsArticle[]> {
+  try {
+    const response = await fetch(`${SCRAPER_API_URL}/news/${id}/related?limit=${limit}`);
+    if (response.status === 404) {
+      return [];
+    }
+    if (!response.ok) {
+      throw new Error(`Scraper API related responded with status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.map(transformScrapedArticle);
+  } catch (error) {
+    console.error(`Failed to fetch articles related to ${id} from scraper API:`, error);
+    return [];
+  }
+}
+
+/**
+ * Subscribes to articles as the scraper stores them, over Server-Sent Events.
+ * The browser reconnects on its own and resumes after the last article it saw.
+ * @param onArticle - Called with each new article.
+ * @param categories - The categories to receive; all of them when empty.
+ * @param onReset - Called when the client was too far behind to catch up and should reload.
+ * @returns A function that closes the stream.
+ */
+function subscribeToNews(
+  onArticle: (article: NewsArticle) => void,
+  categories: string[] = [],
+  onReset?: () => void,
+): () => void {
+  const params = new URLSearchParams();
+  if (categories.length > 0) params.append('categories', categories.join(','));
+
+  const source = new EventSource(`${SCRAPER_API_URL}/stream?${params.toString()}`);
+  source.addEventListener('article', (event) => {
+    onArticle(transformScrapedArticle(JSON.parse((event as MessageEvent).data)));
+  });
+  source.addEventListener('reset', () => onReset?.());
+  return () => source.close();
+}
+
 /**
  * Searches for news articles using our backend scraper.
  * @param query - The search term.
@@ -243,6 +319,9 @@ export const newsService = {
   getScrapedNews,
   getAllScrapedNews,
   getNewsByCategory,
+  getFeed,
+  getRelatedNews,
+  subscribeToNews,
   searchNews,
   // getNewsFromApi,
   // getSources,